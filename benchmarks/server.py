@@ -0,0 +1,203 @@
+"""Benchmark server: seeds the database, then serves one of the apps with per-request query counts.
+
+Started by benchmarks/run.py in a separate process so the load generator does not share
+the server's GIL. Prints a single ``BENCH_READY {json}`` line once it accepts requests.
+With ``--workers N`` the server forks N processes that accept on one listening socket,
+like gunicorn workers writing to the same database.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import sys
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PEED_PROJECT = os.path.join(ROOT, 'peed-project')
+
+# Users whose ids are handed to the load generator
+MAX_SAMPLE_USERS = 1000
+
+def install_query_counter(app, db):
+    """Count SQL statements per request and report them in the X-Query-Count header."""
+    from flask import g, has_request_context
+    from sqlalchemy import event
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.bench_queries = g.get('bench_queries', 0) + 1
+
+    @app.after_request
+    def add_query_count(response):
+        response.headers['X-Query-Count'] = str(g.get('bench_queries', 0))
+        return response
+
+def load_main(database_url):
+    if database_url.startswith('sqlite:///'):
+        os.environ['SQLITE_DATABASE_PATH'] = database_url[len('sqlite:///'):]
+    else:
+        os.environ['USE_POSTGRES'] = 'true'
+        os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, ROOT)
+    import main
+    from src.models.user import db
+    return main.app, db
+
+def seed_main(app, db, users, sessions, seed):
+    from src.models.user import User
+    from src.services.synthetic_data import SyntheticPopulation, load_population
+    from src.services.training_summary import rebuild_training_summaries
+    from src.services.daily_stats import rebuild_daily_stats
+    from src.services.leaderboard import rebuild_leaderboards
+    from src.services.global_stats import reconcile_global_stats
+
+    prefix = f'bench{seed}'
+    with app.app_context():
+        if User.query.filter(User.username == f'{prefix}_0').first() is None:
+            load_population(SyntheticPopulation(users, sessions, seed=seed, prefix=prefix))
+            rebuild_training_summaries()
+            rebuild_daily_stats()
+            rebuild_leaderboards()
+            reconcile_global_stats()
+        user_ids = [uid for uid, in db.session.query(User.id)
+                    .filter(User.username.like(f'{prefix}_%')).order_by(User.id).limit(MAX_SAMPLE_USERS)]
+        db.session.remove()
+    return user_ids
+
+def load_peed_project(database_url):
+    os.environ['DATABASE_URL'] = database_url
+    # peed-project/main.py puts the repository root first on sys.path; importing its own
+    # `src` package beforehand keeps that package bound in sys.modules
+    sys.path.insert(0, PEED_PROJECT)
+    import src.models.tigang  # noqa: F401
+    import main
+    from src.models.user import db
+    return main.app, db
+
+def seed_peed_project(app, db, users, sessions, seed):
+    from src.models.tigang import TigangUser, ExerciseRecord, DailyStats, CommunityPost, Leaderboard
+
+    prefix = f'bench{seed}'
+    rng = random.Random(seed)
+    today = date.today()
+    with app.app_context():
+        if TigangUser.query.filter(TigangUser.username == f'{prefix}_0').first() is None:
+            now = datetime.utcnow()
+            db.session.execute(TigangUser.__table__.insert(), [
+                {'username': f'{prefix}_{index}', 'avatar_emoji': '💪', 'is_verified': False,
+                 'created_at': now, 'last_active': now, 'total_exercises': 0, 'current_streak': 0,
+                 'longest_streak': 0, 'total_time_minutes': 0}
+                for index in range(users)
+            ])
+            ids = [uid for uid, in db.session.query(TigangUser.id)
+                   .filter(TigangUser.username.like(f'{prefix}_%')).order_by(TigangUser.id)]
+
+            records, daily, posts = [], [], []
+            for user_id in ids:
+                days = {}
+                for _ in range(sessions):
+                    exercise_date = today - timedelta(days=rng.randrange(90))
+                    duration = rng.randint(60, 600)
+                    records.append({'user_id': user_id, 'exercise_date': exercise_date,
+                                    'exercise_time': datetime.combine(exercise_date, datetime.min.time())
+                                    + timedelta(seconds=rng.randrange(86400)),
+                                    'duration_seconds': duration, 'repetitions': rng.randint(8, 60),
+                                    'phase_type': 'contract'})
+                    count, minutes = days.get(exercise_date, (0, 0))
+                    days[exercise_date] = (count + 1, minutes + duration // 60)
+                daily.extend({'user_id': user_id, 'stat_date': d, 'daily_count': c, 'daily_time_minutes': m,
+                              'goal_achieved': c >= 3, 'shared_to_twitter': False} for d, (c, m) in days.items())
+                posts.append({'user_id': user_id, 'content': f'Day {len(days)}', 'post_type': 'general',
+                              'exercise_count': sessions, 'streak_days': 0, 'likes_count': 0,
+                              'retweets_count': 0, 'created_at': now})
+                if len(records) >= 50000:
+                    db.session.execute(ExerciseRecord.__table__.insert(), records)
+                    records = []
+            if records:
+                db.session.execute(ExerciseRecord.__table__.insert(), records)
+            db.session.execute(DailyStats.__table__.insert(), daily)
+            db.session.execute(CommunityPost.__table__.insert(), posts)
+            db.session.execute(Leaderboard.__table__.insert(), [
+                {'user_id': user_id, 'period_type': 'weekly', 'period_date': today, 'rank_position': rank,
+                 'score': sessions, 'badge_emoji': '⭐'}
+                for rank, user_id in enumerate(ids[:100], 1)
+            ])
+            db.session.execute(TigangUser.__table__.update().values(
+                total_exercises=sessions, total_time_minutes=sessions * 5
+            ))
+            db.session.commit()
+        user_ids = [uid for uid, in db.session.query(TigangUser.id)
+                    .filter(TigangUser.username.like(f'{prefix}_%')).order_by(TigangUser.id).limit(MAX_SAMPLE_USERS)]
+        db.session.remove()
+    return user_ids
+
+APPS = {
+    'main': (load_main, seed_main),
+    'peed-project': (load_peed_project, seed_peed_project),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--app', choices=APPS, default='main')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1, help='forked server processes')
+    args = parser.parse_args()
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    load_app, seed_app = APPS[args.app]
+    app, db = load_app(args.database_url)
+    user_ids = seed_app(app, db, args.users, args.sessions, args.seed)
+    install_query_counter(app, db)
+
+    if args.workers <= 1:
+        server = make_server('127.0.0.1', args.port, app, threaded=True, request_handler=QuietHandler)
+        print('BENCH_READY ' + json.dumps({'port': server.server_port, 'user_ids': user_ids}), flush=True)
+        server.serve_forever()
+        return
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('127.0.0.1', args.port))
+    listener.listen(128)
+    # connections opened while seeding must not be shared with the forked workers
+    with app.app_context():
+        db.engine.dispose()
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            server = make_server('127.0.0.1', listener.getsockname()[1], app, threaded=True,
+                                 request_handler=QuietHandler, fd=listener.fileno())
+            server.serve_forever()
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+        for pid in children:
+            os.waitpid(pid, 0)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    print('BENCH_READY ' + json.dumps({'port': listener.getsockname()[1], 'user_ids': user_ids}), flush=True)
+    signal.pause()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from src.models.user import db, User, Achievement, TrainingRecord
+from src.routes.user import user_bp
+from src.routes.tigang import tigang_bp
+from src.services.achievements import invalidate_achievement_catalogue
+from src.services.serialization import FastJSONProvider
+from src.services.training_jobs import run_pending_jobs
+
+ACHIEVEMENTS = [
+    ('初试身手', 'First Steps', 'Play', 'session_count', 1),
+    ('坚持一周', '7-Day Streak', 'Flame', 'streak_days', 7),
+    ('百次达人', '100 Sessions', 'Trophy', 'session_count', 100),
+    ('马拉松选手', 'Marathon Trainer', 'Clock', 'training_time', 10),
+]
+
+# 记录训练接口的默认参数：一次新手级训练
+TRAINING_PAYLOAD = {'difficulty': 'beginner', 'sets_completed': 2, 'reps_completed': 16,
+                    'total_duration': 160, 'contract_time': 5, 'relax_time': 5}
+
+class DrainingClient(FlaskClient):
+    """异步模式下每个写请求返回后处理完队列中的任务，相当于worker在下一个请求之前完成汇总
+
+    drain_jobs设为False时由测试自己处理队列。
+    """
+    drain_jobs = True
+
+    def open(self, *args, **kwargs):
+        response = super().open(*args, **kwargs)
+        if self.drain_jobs and self.application.config['ASYNC_TRAINING_JOBS'] and response.request.method != 'GET':
+            run_pending_jobs()
+        return response
+
+@pytest.fixture(params=['sync', 'async'])
+def app(request, tmp_path):
+    """内存SQLite上的测试应用，同步与异步（ASYNC_TRAINING_JOBS）两种模式各运行一次"""
+    app = Flask(__name__)
+    app.test_client_class = DrainingClient
+    app.json = FastJSONProvider(app)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite://',
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        AVATAR_STORAGE_DIR=str(tmp_path / 'avatars'),
+        ASYNC_TRAINING_JOBS=request.param == 'async',
+    )
+    db.init_app(app)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(tigang_bp, url_prefix='/api/tigang')
+
+    with app.app_context():
+        db.create_all()
+        for name, name_en, icon, category, target in ACHIEVEMENTS:
+            db.session.add(Achievement(
+                name=name, name_en=name_en, description=name, description_en=name_en,
+                icon=icon, category=category, target_value=target
+            ))
+        db.session.commit()
+        invalidate_achievement_catalogue()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def make_user(client):
+    """通过注册接口创建用户，返回用户ID"""
+    def _make_user(username):
+        response = client.post('/api/auth/register', json={'username': username})
+        assert response.status_code == 201
+        return response.get_json()['id']
+    return _make_user
+
+@pytest.fixture
+def training_payload():
+    """记录训练接口的默认参数（副本，可在测试中修改）"""
+    return dict(TRAINING_PAYLOAD)
+
+@pytest.fixture
+def record_training():
+    """通过记录训练接口为用户记录times次训练（fields覆盖默认参数），返回最后一次的响应"""
+    def _record_training(client, user_id, times=1, **fields):
+        for _ in range(times):
+            response = client.post('/api/tigang/training/record', json={'user_id': user_id, **TRAINING_PAYLOAD, **fields})
+            assert response.status_code == 201, response.get_json()
+        return response
+    return _record_training
+
+@pytest.fixture
+def record_batch():
+    """通过批量接口记录训练（每项至少包含user_id，其余字段默认取训练参数），返回响应"""
+    def _record_batch(client, sessions):
+        response = client.post('/api/tigang/training/records/batch', json={
+            'sessions': [{**TRAINING_PAYLOAD, **session} for session in sessions]
+        })
+        assert response.status_code == 201, response.get_json()
+        return response
+    return _record_batch
+
+@pytest.fixture
+def seed_records(app):
+    """直接写入count条训练记录（不经过接口，不更新汇总）
+
+    从2024-01-01起每两条一天，每两条记录共用一个created_at（覆盖游标中的id兜底排序），
+    每三条中一条为advanced。
+    """
+    def _seed_records(user_id, count):
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        for index in range(count):
+            db.session.add(TrainingRecord(
+                user_id=user_id, **{**TRAINING_PAYLOAD, 'difficulty': 'beginner' if index % 3 else 'advanced'},
+                session_date=(base + timedelta(days=index // 2)).date(),
+                created_at=base + timedelta(hours=index // 2)
+            ))
+        db.session.commit()
+    return _seed_records
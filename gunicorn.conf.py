@@ -0,0 +1,96 @@
+"""
+Gunicorn configuration for PEED (prefork workers, optional threads/green threads)
+
+Environment variables:
+    PORT                   - listen port (default 5000)
+    WEB_CONCURRENCY        - worker processes (default 2 * CPU cores + 1)
+    GUNICORN_THREADS       - threads per worker (default 1; >1 selects the gthread worker)
+    GUNICORN_WORKER_CLASS  - override worker class, e.g. gevent (requires gevent + psycogreen)
+    GUNICORN_TIMEOUT       - worker timeout in seconds (default 30)
+    PROMETHEUS_MULTIPROC_DIR - directory the workers share for /metrics (default: a new temp dir per server)
+"""
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+os.environ.setdefault('PEED_SKIP_STARTUP_INIT', 'true')
+# Must be set before prometheus_client is imported so every worker writes to the shared directory.
+# A private directory per server keeps two servers on one host from mixing (or wiping) each other's files.
+# (The marker survives config reloads on SIGHUP, which re-read this file with the variable already set.)
+if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='peed-prometheus-')
+    os.environ['PEED_PROMETHEUS_TEMP_DIR'] = os.environ['PROMETHEUS_MULTIPROC_DIR']
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))  # gevent only
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = 200
+
+# Workers import the app themselves so each one gets a fresh connection pool.
+# The master never imports main: the once-per-deploy init runs in a child process.
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+def on_starting(server):
+    """Check the schema version (and migrate if outdated) once per deploy, before any worker forks
+
+    Runs `flask --app main init-db` in a separate process so the master never imports
+    the app or opens a connection pool that workers would inherit. If it fails the master
+    exits with its status instead of starting workers against a half-initialized database.
+    """
+    # Metrics from a previous run of the server must not be aggregated into this one
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+    result = subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'main', 'init-db'],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        server.log.error('Database initialization exited with status %s', result.returncode)
+        raise SystemExit(result.returncode)
+
+def post_fork(server, worker):
+    """Drop pooled connections inherited from the master; only relevant if preload_app is turned on"""
+    import sys
+    if 'main' in sys.modules:
+        from main import app
+        from src.models.user import db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+def post_worker_init(worker):
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            worker.log.warning('psycogreen not installed; psycopg2 calls will block the gevent loop')
+
+def on_exit(server):
+    """Remove the metrics directory this config created"""
+    if os.getenv('PEED_PROMETHEUS_TEMP_DIR'):
+        shutil.rmtree(os.environ['PEED_PROMETHEUS_TEMP_DIR'], ignore_errors=True)
+
+def child_exit(server, worker):
+    """Drop the exited worker's live gauges; its counters/histograms stay in the aggregate"""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -13,8 +13,9 @@ CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 -- Grant privileges
 GRANT ALL PRIVILEGES ON DATABASE peed_db TO postgres;
 
--- Create indexes for better performance
--- These will be created after tables are created by SQLAlchemy
+-- Indexes are declared on the SQLAlchemy models (see src/models/user.py) and
+-- created together with the tables by db.create_all(). For databases created
+-- before an index was added run: flask --app main create-indexes
 
 -- Success message
 SELECT 'PEED Database initialized successfully!' AS message; 
\ No newline at end of file
@@ -5,168 +5,24 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory, jsonify
 from flask_cors import CORS
-from src.models.user import db, User, TrainingRecord, Achievement, UserAchievement
+from src.models.user import db
 from src.routes.user import user_bp
 from src.routes.tigang import tigang_bp
-from datetime import datetime, date, timedelta
-from sqlalchemy import text
+from src.services.bootstrap import SCHEMA_VERSION, SEED_VERSION, get_schema_state, is_up_to_date, run_migrations
+from src.services.response_cache import get_cache_stats
+from src.services.health_stats import check_database, get_cached_queue_stats, get_health_stats
+from src.services.training_jobs import init_training_jobs
+from src.services.serialization import FastJSONProvider
+from src.services.metrics import init_metrics
+from src.services.replicas import get_replica_stats, init_replicas, replica_binds
+from src.services.sqlite_profile import DEFAULT_BUSY_TIMEOUT_MS, DEFAULT_POOL_SIZE, configure_sqlite_engine, sqlite_engine_options
+from src.cli import register_commands
+from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-def init_achievements():
-    """初始化成就数据"""
-    achievements_data = [
-        {
-            'name': '初试身手',
-            'name_en': 'First Steps',
-            'description': '完成你的第一次训练',
-            'description_en': 'Complete your first training session',
-            'icon': 'Play',
-            'category': 'session_count',
-            'target_value': 1
-        },
-        {
-            'name': '坚持一周',
-            'name_en': '7-Day Streak',
-            'description': '连续训练7天',
-            'description_en': 'Train for 7 consecutive days',
-            'icon': 'Flame',
-            'category': 'streak_days',
-            'target_value': 7
-        },
-        {
-            'name': '百次达人',
-            'name_en': '100 Sessions',
-            'description': '完成100次训练',
-            'description_en': 'Complete 100 training sessions',
-            'icon': 'Trophy',
-            'category': 'session_count',
-            'target_value': 100
-        },
-        {
-            'name': '千次专家',
-            'name_en': '1000 Sessions',
-            'description': '完成1000次训练',
-            'description_en': 'Complete 1000 training sessions',
-            'icon': 'Star',
-            'category': 'session_count',
-            'target_value': 1000
-        },
-        {
-            'name': '马拉松选手',
-            'name_en': 'Marathon Trainer',
-            'description': '累计训练时间达到10小时',
-            'description_en': 'Accumulate 10 hours of training',
-            'icon': 'Clock',
-            'category': 'training_time',
-            'target_value': 10
-        },
-        {
-            'name': '完美一月',
-            'name_en': '30-Day Streak',
-            'description': '连续训练30天',
-            'description_en': 'Train for 30 consecutive days',
-            'icon': 'Target',
-            'category': 'streak_days',
-            'target_value': 30
-        }
-    ]
-    
-    try:
-        for achievement_data in achievements_data:
-            existing = Achievement.query.filter_by(name=achievement_data['name']).first()
-            if not existing:
-                achievement = Achievement(**achievement_data)
-                db.session.add(achievement)
-        
-        db.session.commit()
-        print("✅ Achievements initialized successfully")
-    except Exception as e:
-        db.session.rollback()
-        print(f"❌ Failed to initialize achievements: {e}")
-
-def init_sample_users():
-    """初始化示例用户"""
-    if not User.query.first():
-        sample_users = [
-            {
-                'username': 'demo_user',
-                'nickname': 'PEED演示用户',
-                'bio': '欢迎使用PEED健康训练系统！',
-                'email': 'demo@peed.com'
-            },
-            {
-                'username': 'trainer_pro',
-                'nickname': '专业训练师',
-                'bio': '健康生活从提肛训练开始',
-                'email': 'trainer@peed.com'
-            }
-        ]
-        
-        try:
-            for user_data in sample_users:
-                user = User(**user_data)
-                db.session.add(user)
-                db.session.flush()  # 获取用户ID
-                
-                # 为用户初始化成就
-                achievements = Achievement.query.all()
-                for achievement in achievements:
-                    user_achievement = UserAchievement(
-                        user_id=user.id,
-                        achievement_id=achievement.id,
-                        progress=0,
-                        unlocked=False
-                    )
-                    db.session.add(user_achievement)
-                
-                # 为演示用户添加一些示例训练记录
-                if user.username == 'demo_user':
-                    sample_training = [
-                        {
-                            'difficulty': 'beginner',
-                            'sets_completed': 2,
-                            'reps_completed': 16,
-                            'total_duration': 160,  # 约2.7分钟
-                            'contract_time': 5,
-                            'relax_time': 5,
-                            'session_date': date.today() - timedelta(days=2)
-                        },
-                        {
-                            'difficulty': 'intermediate',
-                            'sets_completed': 3,
-                            'reps_completed': 36,
-                            'total_duration': 576,  # 约9.6分钟
-                            'contract_time': 8,
-                            'relax_time': 8,
-                            'session_date': date.today() - timedelta(days=1)
-                        },
-                        {
-                            'difficulty': 'beginner',
-                            'sets_completed': 2,
-                            'reps_completed': 16,
-                            'total_duration': 160,
-                            'contract_time': 5,
-                            'relax_time': 5,
-                            'session_date': date.today()
-                        }
-                    ]
-                    
-                    for training_data in sample_training:
-                        training_record = TrainingRecord(
-                            user_id=user.id,
-                            **training_data
-                        )
-                        db.session.add(training_record)
-            
-            db.session.commit()
-            print("✅ Sample users initialized successfully")
-        except Exception as e:
-            db.session.rollback()
-            print(f"❌ Failed to initialize sample users: {e}")
-
 def get_database_config():
     """Get database configuration, fallback to SQLite if PostgreSQL not available"""
     # Default to SQLite for more reliable deployment
@@ -198,26 +54,65 @@ def get_database_config():
         }
         db_type = 'PostgreSQL'
     else:
-        # SQLite configuration (fallback)
-        database_dir = os.path.join(os.path.dirname(__file__), 'database')
+        # SQLite configuration (fallback); SQLITE_DATABASE_PATH points benchmarks/tests at a separate file
+        database_path = os.getenv('SQLITE_DATABASE_PATH') or os.path.join(os.path.dirname(__file__), 'database', 'peed.db')
+        database_dir = os.path.dirname(os.path.abspath(database_path))
         if not os.path.exists(database_dir):
             os.makedirs(database_dir)
         
-        database_uri = f"sqlite:///{os.path.join(database_dir, 'peed.db')}"
-        engine_options = {
-            'pool_pre_ping': True,
-            'pool_recycle': 300,
-        }
+        database_uri = f"sqlite:///{database_path}"
+        if sqlite_tuning_enabled():
+            # WAL, synchronous=NORMAL, busy_timeout... applied per connection (see src/services/sqlite_profile.py)
+            engine_options = sqlite_engine_options(
+                busy_timeout_ms=int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', DEFAULT_BUSY_TIMEOUT_MS)),
+                pool_size=int(os.getenv('SQLITE_POOL_SIZE', DEFAULT_POOL_SIZE))
+            )
+        else:
+            engine_options = {
+                'pool_pre_ping': True,
+                'pool_recycle': 300,
+            }
         db_type = 'SQLite'
     
     return database_uri, engine_options, db_type
 
+def sqlite_tuning_enabled():
+    return os.getenv('SQLITE_TUNING', 'true').lower() == 'true'
+
+def init_sqlite_profile(app):
+    """Register the tuned SQLite connect hooks; must run before the first connection is opened"""
+    if not app.config['DB_TYPE'].startswith('SQLite') or not sqlite_tuning_enabled():
+        return
+    with app.app_context():
+        app.extensions['sqlite_writer'] = configure_sqlite_engine(
+            db.engine, busy_timeout_ms=int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', DEFAULT_BUSY_TIMEOUT_MS))
+        )
+
 def create_app():
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'src', 'static'))
     
+    # jsonify output encoded with orjson when installed (byte-identical to the stdlib encoder)
+    app.json = FastJSONProvider(app)
+    
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'peed_secret_key_2024_postgresql')
     
+    # Avatar storage (content-addressed, see src/services/avatar_store.py)
+    app.config['AVATAR_STORAGE_BACKEND'] = os.getenv('AVATAR_STORAGE_BACKEND', 'local')
+    app.config['AVATAR_STORAGE_DIR'] = os.getenv('AVATAR_STORAGE_DIR', os.path.join(os.path.dirname(__file__), 'database', 'avatars'))
+    
+    # Response cache for shared public read endpoints (see src/services/response_cache.py)
+    app.config['RESPONSE_CACHE_ENABLED'] = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    
+    # Post-commit training aggregation via the durable job queue (see src/services/training_jobs.py)
+    app.config['ASYNC_TRAINING_JOBS'] = os.getenv('ASYNC_TRAINING_JOBS', 'false').lower() == 'true'
+    app.config['TRAINING_JOB_WORKERS'] = int(os.getenv('TRAINING_JOB_WORKERS', 2))
+    
+    # Per-request SQL/serialization timing: Server-Timing headers and /metrics (see src/services/metrics.py)
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    # /metrics is only served to scrapers presenting this bearer token (unset: not exposed)
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+    
     # Database Configuration with fallback
     try:
         database_uri, engine_options, db_type = get_database_config()
@@ -226,12 +121,24 @@ def create_app():
         app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
         app.config['DB_TYPE'] = db_type
         
+        # Optional read replicas for read-only endpoints (see src/services/replicas.py)
+        replica_urls = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+        if replica_urls:
+            app.config['SQLALCHEMY_BINDS'] = replica_binds(replica_urls, {
+                **engine_options,
+                **({'connect_args': {'connect_timeout': 3}} if db_type == 'PostgreSQL' else {})
+            })
+            app.config['REPLICA_MAX_LAG_SECONDS'] = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+            app.config['REPLICA_CHECK_INTERVAL'] = float(os.getenv('REPLICA_CHECK_INTERVAL', 5))
+        
         # Initialize database
         db.init_app(app)
+        init_sqlite_profile(app)
         
-        # Test database connection
+        # Test database connection (returned to the pool for the schema check below)
         with app.app_context():
-            db.engine.connect()
+            with db.engine.connect():
+                pass
             print(f"✅ Database connection successful: {db_type}")
             
     except Exception as e:
@@ -245,11 +152,13 @@ def create_app():
         
         app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(database_dir, 'peed.db')}"
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_pre_ping': True, 'pool_recycle': 300}
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options() if sqlite_tuning_enabled() else {'pool_pre_ping': True, 'pool_recycle': 300}
         app.config['DB_TYPE'] = 'SQLite (fallback)'
+        app.config.pop('SQLALCHEMY_BINDS', None)
         
         # Re-initialize with SQLite
         db.init_app(app)
+        init_sqlite_profile(app)
         print("✅ SQLite fallback initialized successfully")
     
     # CORS Configuration
@@ -260,107 +169,161 @@ def create_app():
     app.register_blueprint(user_bp, url_prefix='/api')
     app.register_blueprint(tigang_bp, url_prefix='/api/tigang')
     
+    # Register SPA / health / info routes
+    register_routes(app)
+    
+    # Register CLI commands
+    register_commands(app)
+    
+    # Training job workers start lazily in each serving process
+    init_training_jobs(app)
+    
+    # Replica router (no-op without DATABASE_REPLICA_URLS)
+    init_replicas(app)
+    
+    # Request instrumentation (engine events + request hooks)
+    init_metrics(app)
+    
     return app
 
-app = create_app()
+def init_database(app):
+    """Bring the database up to date (run once per deploy, not per worker)
 
-# Create database tables and initialize data
-with app.app_context():
-    try:
-        print(f"🔧 Creating database tables... (Using {app.config['DB_TYPE']})")
-        db.create_all()
-        print("✅ Database tables created successfully")
-        
-        # Initialize achievements
-        try:
-            init_achievements()
-        except NameError:
-            print("⚠️  Achievement initialization skipped (function not found)")
-        
-        # Create sample users (if not exists)
+    An up-to-date database costs a single SELECT on the schema_meta table.
+    Otherwise the migrations run here unless PEED_AUTO_MIGRATE=false, in which
+    case run `flask --app main migrate` explicitly.
+    """
+    with app.app_context():
         try:
-            init_sample_users()
-        except NameError:
-            print("⚠️  Sample user initialization skipped (function not found)")
-        
-        print("✅ Database initialization completed")
-    except Exception as e:
-        print(f"❌ Database initialization failed: {e}")
-        if app.config['DB_TYPE'] == 'PostgreSQL':
-            print("💡 PostgreSQL connection failed, consider:")
-            print("   1. Run: docker-compose up -d postgres")
-            print("   2. Or set USE_POSTGRES=false in .env to use SQLite")
-        else:
-            print("💡 Database setup failed, check file permissions")
+            state = get_schema_state()
+            if is_up_to_date(state):
+                print(f"✅ Database schema up to date (schema v{SCHEMA_VERSION}, seed v{SEED_VERSION})")
+                return True
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
+            if os.getenv('PEED_AUTO_MIGRATE', 'true').lower() != 'true':
+                print(f"⚠️  Database schema outdated ({state or 'not initialized'}); run: flask --app main migrate")
+                return False
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+            print(f"🔧 Migrating database... (Using {app.config['DB_TYPE']})")
+            timings = run_migrations()
+            total = sum(seconds for _, _, seconds in timings)
+            print(f"✅ Database initialization completed in {total * 1000:.0f} ms")
+            return True
+        except Exception as e:
+            print(f"❌ Database initialization failed: {e}")
+            if app.config['DB_TYPE'] == 'PostgreSQL':
+                print("💡 PostgreSQL connection failed, consider:")
+                print("   1. Run: docker-compose up -d postgres")
+                print("   2. Or set USE_POSTGRES=false in .env to use SQLite")
+            else:
+                print("💡 Database setup failed, check file permissions")
+            return False
+
+def register_routes(app):
+    """Register non-blueprint routes: SPA static files, health check, API info"""
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
+            return "Static folder not configured", 404
+
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_from_directory(static_folder_path, 'index.html')
+            else:
+                return "index.html not found", 404
 
-# 健康检查端点
-@app.route('/health')
-def health_check():
-    try:
-        # 检查数据库连接
-        db.session.execute(text('SELECT 1')).fetchone()
-        
-        # 获取基本统计
-        total_users = User.query.count()
-        total_training_records = TrainingRecord.query.count()
-        total_achievements = Achievement.query.count()
-        
+    # 存活检查：常数时间，不访问数据库（Render健康检查每隔几秒调用）
+    @app.route('/health')
+    def health_check():
         return jsonify({
             'status': 'healthy',
             'service': 'PEED Backend',
             'version': '1.0.0',
-            'database': f"{app.config['DB_TYPE']} - connected",
-            'stats': {
-                'total_users': total_users,
-                'total_training_records': total_training_records,
-                'total_achievements': total_achievements
-            },
             'timestamp': datetime.utcnow().isoformat()
         }), 200
-    except Exception as e:
+
+    # 就绪检查：验证连接池可用，统计来自定期刷新的计数/估算值
+    @app.route('/health/ready')
+    def readiness_check():
+        try:
+            pool_status = check_database()
+            stats = get_health_stats()
+            jobs = get_cached_queue_stats()
+            replicas = get_replica_stats()
+        
+            return jsonify({
+                'status': 'ready',
+                'service': 'PEED Backend',
+                'version': '1.0.0',
+                'database': f"{app.config['DB_TYPE']} - connected",
+                'pool': pool_status,
+                'stats': stats,
+                'training_jobs': jobs,
+                'replicas': replicas,
+                'timestamp': datetime.utcnow().isoformat()
+            }), 200
+        except Exception as e:
+            return jsonify({
+                'status': 'unavailable',
+                'service': 'PEED Backend',
+                'database': f"{app.config.get('DB_TYPE', 'Unknown')} - connection failed",
+                'error': str(e),
+                'timestamp': datetime.utcnow().isoformat()
+            }), 503
+
+    # 响应缓存命中统计（本进程）
+    @app.route('/api/cache/stats')
+    def cache_stats():
+        return jsonify(get_cache_stats())
+
+    # API信息端点
+    @app.route('/api/info')
+    def api_info():
         return jsonify({
-            'status': 'unhealthy',
-            'service': 'PEED Backend',
-            'database': f"{app.config.get('DB_TYPE', 'Unknown')} - connection failed",
-            'error': str(e),
-            'timestamp': datetime.utcnow().isoformat()
-        }), 500
+            'service': 'PEED API',
+            'version': '1.0.0',
+            'description': 'PEED健康训练系统API',
+            'database': app.config.get('DB_TYPE', 'Unknown'),
+            'endpoints': {
+                'auth': '/api/auth/*',
+                'profile': '/api/profile/*',
+                'wallet': '/api/wallet/*',
+                'stats': '/api/stats/*',
+                'training': '/api/tigang/training/*',
+                'achievements': '/api/tigang/achievements/*',
+                'leaderboard': '/api/tigang/training/leaderboard',
+                'cache_stats': '/api/cache/stats',
+                'metrics': '/metrics',
+                'health': '/health',
+                'readiness': '/health/ready'
+            },
+            'documentation': 'https://github.com/your-repo/peed-api-docs'
+        })
+
+# CLI commands that bring the database up to date themselves
+DATABASE_COMMANDS = ('migrate', 'init-db')
+
+def startup_init_enabled(argv=None):
+    """Whether importing this module should run init_database
+
+    WSGI workers (see wsgi.py / gunicorn.conf.py) set PEED_SKIP_STARTUP_INIT; the server
+    runs it once per deploy. `flask migrate` / `flask init-db` do it themselves. Everything
+    else, including `flask run` on a fresh checkout, initializes the database on import.
+    """
+    if os.getenv('PEED_SKIP_STARTUP_INIT', 'false').lower() == 'true':
+        return False
+    argv = sys.argv[1:] if argv is None else argv
+    return not any(arg in DATABASE_COMMANDS for arg in argv)
+
+app = create_app()
 
-# API信息端点
-@app.route('/api/info')
-def api_info():
-    return jsonify({
-        'service': 'PEED API',
-        'version': '1.0.0',
-        'description': 'PEED健康训练系统API',
-        'database': app.config.get('DB_TYPE', 'Unknown'),
-        'endpoints': {
-            'auth': '/api/auth/*',
-            'profile': '/api/profile/*',
-            'wallet': '/api/wallet/*',
-            'stats': '/api/stats/*',
-            'training': '/api/tigang/training/*',
-            'achievements': '/api/tigang/achievements/*',
-            'leaderboard': '/api/tigang/training/leaderboard'
-        },
-        'documentation': 'https://github.com/your-repo/peed-api-docs'
-    })
+if startup_init_enabled():
+    init_database(app)
 
 if __name__ == '__main__':
     print("🚀 Starting PEED Backend Server...")
@@ -21,13 +21,22 @@ app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(tigang_bp, url_prefix='/api/tigang')
 
 # 数据库配置
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or \
+    f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
-# 创建数据库表
+# 表结构版本：新增表时加1。版本记录在SQLite的 PRAGMA user_version 中，
+# 已是当前版本的启动只读取一次该值，不再执行 create_all；其他数据库（DATABASE_URL）每次检查表是否存在
+SCHEMA_VERSION = 1
+
 with app.app_context():
-    db.create_all()
+    with db.engine.begin() as connection:
+        if connection.dialect.name != 'sqlite':
+            db.metadata.create_all(connection)
+        elif connection.exec_driver_sql('PRAGMA user_version').scalar() < SCHEMA_VERSION:
+            db.metadata.create_all(connection)
+            connection.exec_driver_sql(f'PRAGMA user_version = {SCHEMA_VERSION}')
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
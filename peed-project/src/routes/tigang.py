@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime, date
+from sqlalchemy.orm import joinedload
 from src.models.tigang import TigangUser, ExerciseRecord, DailyStats, CommunityPost, Leaderboard, db
 
 tigang_bp = Blueprint('tigang', __name__)
@@ -104,7 +105,8 @@ def record_exercise():
         today = date.today()
         daily_stat = DailyStats.query.filter_by(user_id=data['user_id'], stat_date=today).first()
         if not daily_stat:
-            daily_stat = DailyStats(user_id=data['user_id'], stat_date=today)
+            daily_stat = DailyStats(user_id=data['user_id'], stat_date=today,
+                                    daily_count=0, daily_time_minutes=0)
             db.session.add(daily_stat)
         
         daily_stat.daily_count += 1
@@ -172,9 +174,10 @@ def get_community_posts():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     
-    posts = CommunityPost.query.order_by(CommunityPost.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # 作者随动态一次JOIN读取，to_dict() 不再逐条懒加载用户
+    posts = CommunityPost.query.options(joinedload(CommunityPost.user)).order_by(
+        CommunityPost.created_at.desc()
+    ).paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
         'posts': [post.to_dict() for post in posts.items],
@@ -222,9 +225,9 @@ def get_leaderboard(period_type):
         return jsonify({'error': 'Invalid period type'}), 400
     
     today = date.today()
-    rankings = Leaderboard.query.filter_by(period_type=period_type, period_date=today).order_by(
-        Leaderboard.rank_position
-    ).all()
+    rankings = Leaderboard.query.options(joinedload(Leaderboard.user)).filter_by(
+        period_type=period_type, period_date=today
+    ).order_by(Leaderboard.rank_position).all()
     
     return jsonify([ranking.to_dict() for ranking in rankings])
 
@@ -0,0 +1,127 @@
+import time
+from datetime import date, timedelta
+import click
+from src.services.training_summary import backfill_streaks, rebuild_training_summaries
+from src.services.leaderboard import PERIODS, rebuild_leaderboards
+from src.services.avatar_store import migrate_inline_avatars
+from src.services.daily_stats import rebuild_daily_stats
+from src.services.global_stats import reconcile_global_stats
+from src.services.training_jobs import retry_failed_jobs, run_pending_jobs
+from src.services.synthetic_data import DEFAULT_BATCH_SIZE, SyntheticPopulation, load_population
+from src.services.bootstrap import SCHEMA_VERSION, SEED_VERSION, ensure_indexes, get_schema_state, is_up_to_date, run_migrations
+
+def register_commands(app):
+    """注册运维命令（flask --app main <command>）"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """启动时的数据库检查：已是当前版本只做一次查询，否则执行迁移"""
+        from main import init_database
+        init_database(app)
+
+    @app.cli.command('migrate')
+    @click.option('--force', is_flag=True, help='版本标记已是最新时也重新执行')
+    def migrate_command(force):
+        """建表、补索引、批量初始化种子数据并写入版本标记，输出各步骤耗时"""
+        started = time.perf_counter()
+        state = get_schema_state()
+        if is_up_to_date(state) and not force:
+            click.echo(f"✅ Already at schema v{SCHEMA_VERSION}, seed v{SEED_VERSION} "
+                       f"(checked in {(time.perf_counter() - started) * 1000:.1f} ms)")
+            return
+
+        click.echo(f"🔧 Migrating from {state or 'empty database'} to schema v{SCHEMA_VERSION}, seed v{SEED_VERSION}")
+        for name, result, seconds in run_migrations():
+            detail = f' ({result})' if result is not None else ''
+            click.echo(f"   {name:<20} {seconds * 1000:8.1f} ms{detail}")
+        click.echo(f"✅ Migration completed in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    @app.cli.command('rebuild-summaries')
+    @click.option('--user-id', type=int, default=None, help='只重建指定用户')
+    def rebuild_summaries_command(user_id):
+        """从训练记录重建用户训练汇总表"""
+        count = rebuild_training_summaries(user_id)
+        click.echo(f"✅ Rebuilt training summaries for {count} users")
+
+    @app.cli.command('rebuild-daily-stats')
+    @click.option('--user-id', type=int, default=None, help='只重建指定用户')
+    def rebuild_daily_stats_command(user_id):
+        """从训练记录重建用户每日训练汇总"""
+        count = rebuild_daily_stats(user_id)
+        click.echo(f"✅ Rebuilt {count} daily stats rows")
+
+    @app.cli.command('backfill-streaks')
+    @click.option('--user-id', type=int, default=None, help='只回填指定用户')
+    def backfill_streaks_command(user_id):
+        """为已有训练汇总回填当前/最长连续天数"""
+        count = backfill_streaks(user_id)
+        click.echo(f"✅ Backfilled streaks for {count} users")
+
+    @app.cli.command('create-indexes')
+    def create_indexes_command():
+        """为已存在的表补建模型中声明的索引（db.create_all不会修改已有表）"""
+        created = ensure_indexes()
+        click.echo(f"✅ Ensured {created} indexes")
+
+    @app.cli.command('rebuild-leaderboards')
+    @click.option('--period', type=click.Choice(PERIODS), default=None, help='只重建指定周期')
+    def rebuild_leaderboards_command(period):
+        """从训练记录重建排行榜周期汇总"""
+        count = rebuild_leaderboards(period)
+        click.echo(f"✅ Rebuilt {count} leaderboard rows")
+
+    @app.cli.command('reconcile-global-stats')
+    @click.option('--days', type=int, default=None, help='只重算最近N天（默认全部）')
+    def reconcile_global_stats_command(days):
+        """从原始数据对账全站每日汇总与全时段累计（建议定时执行）"""
+        start_date = date.today() - timedelta(days=days - 1) if days else None
+        count = reconcile_global_stats(start_date)
+        click.echo(f"✅ Reconciled global stats for {count} days")
+
+    @app.cli.command('run-jobs')
+    @click.option('--retry-failed', is_flag=True, help='先把超过重试次数的任务放回队列')
+    def run_jobs_command(retry_failed):
+        """处理训练任务队列中所有到期任务（重建汇总前先执行，避免任务重复计入）"""
+        if retry_failed:
+            click.echo(f"🔁 Requeued {retry_failed_jobs()} failed jobs")
+        count = run_pending_jobs()
+        click.echo(f"✅ Processed {count} training jobs")
+
+    @app.cli.command('generate-data')
+    @click.option('--users', type=int, default=1000, show_default=True, help='模拟用户数')
+    @click.option('--sessions', type=int, default=100, show_default=True, help='平均每个用户的训练次数')
+    @click.option('--days', type=int, default=365, show_default=True, help='训练记录覆盖的天数')
+    @click.option('--seed', type=int, default=0, show_default=True, help='随机种子（相同参数生成相同数据）')
+    @click.option('--prefix', default='synthetic', show_default=True, help='用户名前缀，重复生成时需更换')
+    @click.option('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, show_default=True)
+    @click.option('--skip-rollups', is_flag=True, help='只写入原始数据，不重建汇总表')
+    def generate_data_command(users, sessions, days, seed, prefix, batch_size, skip_rollups):
+        """生成模拟用户与训练记录并批量写入（PostgreSQL使用COPY），用于容量测试"""
+        started = time.perf_counter()
+        population = SyntheticPopulation(users, sessions, days=days, seed=seed, prefix=prefix)
+
+        def progress(count):
+            elapsed = time.perf_counter() - started
+            click.echo(f"   {count:>12,} records  {count / elapsed:>10,.0f} rows/s")
+
+        user_count, record_count = load_population(population, batch_size, progress)
+        click.echo(f"✅ Loaded {user_count:,} users and {record_count:,} training records "
+                   f"in {time.perf_counter() - started:.1f} s")
+        if skip_rollups:
+            click.echo("⚠️  Rollups not rebuilt; run rebuild-summaries, rebuild-daily-stats, "
+                       "rebuild-leaderboards and reconcile-global-stats before testing")
+            return
+
+        for name, rebuild in (('summaries', rebuild_training_summaries), ('daily_stats', rebuild_daily_stats),
+                              ('leaderboards', rebuild_leaderboards), ('global_stats', reconcile_global_stats)):
+            step_started = time.perf_counter()
+            result = rebuild()
+            click.echo(f"   {name:<20} {time.perf_counter() - step_started:8.1f} s ({result})")
+        click.echo(f"✅ Done in {time.perf_counter() - started:.1f} s")
+
+    @app.cli.command('migrate-avatars')
+    @click.option('--batch-size', type=int, default=100, show_default=True)
+    def migrate_avatars_command(batch_size):
+        """把用户表中的base64头像迁移到头像存储"""
+        migrated, failed = migrate_inline_avatars(batch_size)
+        click.echo(f"✅ Migrated {migrated} avatars ({failed} invalid left unchanged)")
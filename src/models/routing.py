@@ -0,0 +1,30 @@
+from flask_sqlalchemy.session import Session
+
+# session.info中保存当前只读范围选中的只读副本引擎
+REPLICA_INFO_KEY = 'replica_engine'
+
+def _is_read(clause):
+    if clause is None:
+        # session.connection() 等未给出语句的调用按写入处理
+        return False
+    if getattr(clause, 'is_select', False):
+        return True
+    if getattr(clause, 'is_text', False):
+        return clause.text.lstrip()[:6].upper() == 'SELECT'
+    return False
+
+class RoutingSession(Session):
+    """只读范围内把查询发往只读副本的Session
+
+    session.info[REPLICA_INFO_KEY] 为空时与默认Session完全相同。写入（flush、
+    INSERT/UPDATE/DELETE、非SELECT的文本语句）始终发往主库，并且本次会话之后的
+    读取也留在主库，保证读到自己刚写入的数据。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get(REPLICA_INFO_KEY)
+        if replica is not None and bind is None:
+            if not self._flushing and _is_read(clause):
+                return replica
+            self.info.pop(REPLICA_INFO_KEY, None)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from src.models.routing import RoutingSession
 
-db = SQLAlchemy()
+# 只读接口可把查询路由到只读副本（见 src/services/replicas.py）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,7 +12,7 @@ class User(db.Model):
     nickname = db.Column(db.String(100), nullable=True)
     bio = db.Column(db.Text, nullable=True)
     avatar_url = db.Column(db.Text, nullable=True)  # 支持base64或URL
-    wallet_address = db.Column(db.String(200), nullable=True)
+    wallet_address = db.Column(db.String(200), nullable=True, index=True)
     wallet_type = db.Column(db.String(50), nullable=True)  # phantom, solflare, etc.
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -19,6 +21,11 @@ class User(db.Model):
     # 关系
     training_records = db.relationship('TrainingRecord', backref='user', lazy=True, cascade='all, delete-orphan')
     user_achievements = db.relationship('UserAchievement', backref='user', lazy=True, cascade='all, delete-orphan')
+    training_summary = db.relationship('UserTrainingSummary', backref='user', uselist=False, lazy=True, cascade='all, delete-orphan')
+    difficulty_summaries = db.relationship('UserDifficultySummary', backref='user', lazy=True, cascade='all, delete-orphan')
+    leaderboard_scores = db.relationship('LeaderboardScore', backref='user', lazy=True, cascade='all, delete-orphan')
+    daily_stats = db.relationship('UserDailyStats', backref='user', lazy=True, cascade='all, delete-orphan')
+    achievement_notifications = db.relationship('AchievementNotification', backref='user', lazy=True, cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -58,6 +65,13 @@ class TrainingRecord(db.Model):
     contract_time = db.Column(db.Integer, nullable=False)  # 收缩时间（秒）
     relax_time = db.Column(db.Integer, nullable=False)  # 放松时间（秒）
 
+    # 索引：按用户+日期过滤、按用户+创建时间排序、按日期过滤（排行榜/全局统计）
+    __table_args__ = (
+        db.Index('ix_training_record_user_date', 'user_id', 'session_date'),
+        db.Index('ix_training_record_user_created', 'user_id', 'created_at'),
+        db.Index('ix_training_record_date_user', 'session_date', 'user_id'),
+    )
+
     def __repr__(self):
         return f'<TrainingRecord {self.id}>'
 
@@ -75,6 +89,141 @@ class TrainingRecord(db.Model):
             'relax_time': self.relax_time
         }
 
+class UserTrainingSummary(db.Model):
+    """用户训练汇总（随训练记录增量维护）"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_sessions = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)  # 秒
+    total_sets = db.Column(db.Integer, nullable=False, default=0)
+    total_reps = db.Column(db.Integer, nullable=False, default=0)
+    last_session_date = db.Column(db.Date, nullable=True)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)  # 截至last_session_date的连续天数
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserTrainingSummary {self.user_id}>'
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'total_sessions': self.total_sessions,
+            'total_duration': self.total_duration,
+            'total_sets': self.total_sets,
+            'total_reps': self.total_reps,
+            'last_session_date': self.last_session_date.isoformat() if self.last_session_date else None,
+            'current_streak': self.current_streak,
+            'longest_streak': self.longest_streak
+        }
+
+class UserDifficultySummary(db.Model):
+    """用户按难度的训练汇总"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    difficulty = db.Column(db.String(20), primary_key=True)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+    total_sets = db.Column(db.Integer, nullable=False, default=0)
+    total_reps = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)  # 秒
+
+    def __repr__(self):
+        return f'<UserDifficultySummary {self.user_id} - {self.difficulty}>'
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'difficulty': self.difficulty,
+            'session_count': self.session_count,
+            'total_sets': self.total_sets,
+            'total_reps': self.total_reps,
+            'total_duration': self.total_duration
+        }
+
+class UserDailyStats(db.Model):
+    """用户每日训练汇总（每个用户每天每个难度一行，随训练记录增量维护）
+
+    日期范围统计按 (user_id, stat_date) 主键范围读取，代价与天数成正比而非训练次数。
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    stat_date = db.Column(db.Date, primary_key=True)
+    difficulty = db.Column(db.String(20), primary_key=True)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)  # 秒
+    total_sets = db.Column(db.Integer, nullable=False, default=0)
+    total_reps = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserDailyStats {self.user_id} - {self.stat_date} - {self.difficulty}>'
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'stat_date': self.stat_date.isoformat() if self.stat_date else None,
+            'difficulty': self.difficulty,
+            'session_count': self.session_count,
+            'total_duration': self.total_duration,
+            'total_sets': self.total_sets,
+            'total_reps': self.total_reps
+        }
+
+class LeaderboardScore(db.Model):
+    """排行榜周期汇总（每个用户每个周期一行，随训练记录增量维护）"""
+    period_type = db.Column(db.String(20), primary_key=True)  # week, month, all_time
+    period_start = db.Column(db.Date, primary_key=True)  # 周一 / 月初 / 全时段固定日期
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    session_count = db.Column(db.Integer, nullable=False, default=0)  # 排名分数
+    total_duration = db.Column(db.Integer, nullable=False, default=0)  # 秒
+    total_sets = db.Column(db.Integer, nullable=False, default=0)
+    total_reps = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<LeaderboardScore {self.period_type} {self.period_start} - {self.user_id}>'
+
+    def to_dict(self):
+        return {
+            'period_type': self.period_type,
+            'period_start': self.period_start.isoformat() if self.period_start else None,
+            'user_id': self.user_id,
+            'session_count': self.session_count,
+            'total_duration': self.total_duration,
+            'total_sets': self.total_sets,
+            'total_reps': self.total_reps
+        }
+
+# Top-N读取按此索引顺序扫描，无需排序
+db.Index(
+    'ix_leaderboard_score_rank',
+    LeaderboardScore.period_type,
+    LeaderboardScore.period_start,
+    LeaderboardScore.session_count.desc(),
+    LeaderboardScore.user_id
+)
+
+class GlobalDailyStats(db.Model):
+    """全站每日汇总（随训练记录与注册增量维护，定期从原始数据对账）
+
+    stat_date为1970-01-01的行保存全时段累计值，其中new_users为当前用户总数。
+    """
+    stat_date = db.Column(db.Date, primary_key=True)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)  # 秒
+    active_users = db.Column(db.Integer, nullable=False, default=0)  # 当天有训练的用户数
+    new_users = db.Column(db.Integer, nullable=False, default=0)  # 当天注册的用户数
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<GlobalDailyStats {self.stat_date}>'
+
+    def to_dict(self):
+        return {
+            'date': self.stat_date.isoformat() if self.stat_date else None,
+            'session_count': self.session_count,
+            'total_duration': self.total_duration,
+            'active_users': self.active_users,
+            'new_users': self.new_users
+        }
+
 class Achievement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, unique=True)
@@ -124,4 +273,55 @@ class UserAchievement(db.Model):
             'achievement': self.achievement.to_dict() if self.achievement else None
         }
 
+class SchemaMeta(db.Model):
+    """部署元数据（表结构/种子数据版本），启动时一次查询判断是否需要迁移"""
+    __tablename__ = 'schema_meta'
+    key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.String(100), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SchemaMeta {self.key}={self.value}>'
 
+class AchievementNotification(db.Model):
+    """待下发的新解锁成就，读取个人资料/训练统计时返回，客户端确认后删除"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    achievement_id = db.Column(db.Integer, db.ForeignKey('achievement.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AchievementNotification {self.user_id} - {self.achievement_id}>'
+
+class TrainingJob(db.Model):
+    """训练写入后的异步汇总任务
+
+    与训练记录在同一事务内写入，worker在处理事务内删除任务行认领，保证每条记录只汇总一次。
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    record_ids = db.Column(db.Text, nullable=False)  # JSON数组
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Boolean, nullable=False, default=False)  # 超过重试次数后不再自动处理
+    last_error = db.Column(db.Text, nullable=True)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 重试退避
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_training_job_pending', 'failed', 'available_at'),
+    )
+
+    def __repr__(self):
+        return f'<TrainingJob {self.id} - user {self.user_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'record_ids': self.record_ids,
+            'attempts': self.attempts,
+            'failed': self.failed,
+            'last_error': self.last_error,
+            'available_at': self.available_at.isoformat() if self.available_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
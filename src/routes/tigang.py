@@ -1,10 +1,71 @@
-from flask import Blueprint, request, jsonify
-from datetime import datetime, date, timedelta
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from datetime import datetime, date, timedelta, timezone
 from src.models.user import User, TrainingRecord, Achievement, UserAchievement, db
-from sqlalchemy import func
+from src.services.training_summary import get_training_summary
+from src.services.training_jobs import notify_job_workers, record_sessions
+from src.services.leaderboard import get_leaderboard
+from src.services.daily_stats import load_daily_stats
+from src.services.global_stats import MAX_SERIES_DAYS, load_global_series, load_global_stats
+from src.services.achievements import (
+    acknowledge_achievement_notifications, achievement_metrics, evaluate_achievements,
+    load_achievement_notifications, load_user_achievements
+)
+from src.services.bootstrap import seed_achievements
+from src.services.response_cache import cached_response, invalidate_cached_responses
+from src.services.replicas import replica_reads
+from src.services.streaks import effective_streak
+from src.services.serialization import ACHIEVEMENT_COLUMNS, TRAINING_RECORD_COLUMNS, project, rows_to_dicts
+from src.services.training_export import EXPORT_FORMATS, export_training_records
+from src.services.avatar_store import thumbnail_url
+from sqlalchemy import and_, func, or_
+import base64
 
 tigang_bp = Blueprint('tigang', __name__)
 
+# 公共读接口的响应缓存时间（秒）；训练写入后主动失效统计与排行榜
+CONFIG_CACHE_TTL = 3600
+ACHIEVEMENTS_CACHE_TTL = 300
+GLOBAL_STATS_CACHE_TTL = 60
+LEADERBOARD_CACHE_TTL = 30
+TRAINING_WRITE_CACHES = ('global_stats', 'leaderboard')
+
+# 训练难度配置；批量记录的difficulty须为其中之一
+TRAINING_CONFIGS = {
+    'beginner': {
+        'name': '新手级',
+        'name_en': 'Beginner',
+        'contract_time': 5,
+        'relax_time': 5,
+        'reps_per_set': 8,
+        'sets_count': 2,
+        'daily_sessions': 2,
+        'description': '适合初学者的轻松训练',
+        'description_en': 'Easy training for beginners'
+    },
+    'intermediate': {
+        'name': '入门级',
+        'name_en': 'Intermediate',
+        'contract_time': 8,
+        'relax_time': 8,
+        'reps_per_set': 12,
+        'sets_count': 3,
+        'daily_sessions': 3,
+        'description': '中等强度的平衡训练',
+        'description_en': 'Moderate intensity balanced training'
+    },
+    'advanced': {
+        'name': '精通级',
+        'name_en': 'Advanced',
+        'contract_time': 12,
+        'relax_time': 6,
+        'reps_per_set': 15,
+        'sets_count': 4,
+        'daily_sessions': 3,
+        'description': '高强度的专业训练',
+        'description_en': 'High intensity professional training'
+    }
+}
+
 # 训练记录相关路由
 @tigang_bp.route('/training/record', methods=['POST'])
 def record_training():
@@ -35,19 +96,86 @@ def record_training():
     try:
         db.session.add(training_record)
         
+        # 更新训练汇总、排行榜与成就（异步模式下只在同一事务内写入任务）
+        record_sessions(training_record.user_id, [training_record])
+        
         # 更新用户最后活动时间
         user.last_login = datetime.utcnow()
         
-        # 检查并更新成就
-        update_user_achievements(data['user_id'])
-        
         db.session.commit()
+        invalidate_cached_responses(*TRAINING_WRITE_CACHES)
+        notify_job_workers()
         return jsonify(training_record.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to record training'}), 500
 
+# 批量写入单次请求的最大条数
+MAX_BATCH_SESSIONS = 500
+
+@tigang_bp.route('/training/records/batch', methods=['POST'])
+def record_training_batch():
+    """批量记录训练会话（离线同步）
+
+    请求体: {"sessions": [{user_id, difficulty, sets_completed, reps_completed, total_duration,
+    contract_time, relax_time, session_date?, created_at?}, ...]}
+    一次校验、一次批量插入，每个涉及的用户只更新一次汇总和成就。
+    """
+    data = request.get_json()
+    sessions = data.get('sessions') if isinstance(data, dict) else None
+    if not isinstance(sessions, list) or not sessions:
+        return jsonify({'error': 'Missing sessions'}), 400
+    if len(sessions) > MAX_BATCH_SESSIONS:
+        return jsonify({'error': f'Too many sessions (max {MAX_BATCH_SESSIONS})'}), 400
+    
+    # 一次查询确认所有用户存在
+    user_ids = {item.get('user_id') for item in sessions if isinstance(item, dict)}
+    users = {user.id: user for user in User.query.filter(User.id.in_(
+        [uid for uid in user_ids if isinstance(uid, int) and not isinstance(uid, bool)]
+    )).all()}
+    
+    results = []
+    records_by_user = {}
+    for index, item in enumerate(sessions):
+        training_record, error = build_training_record(item, users)
+        if error:
+            results.append({'index': index, 'status': 'error', 'error': error})
+            continue
+        results.append({'index': index, 'status': 'created', 'record': training_record})
+        records_by_user.setdefault(training_record.user_id, []).append(training_record)
+    
+    if not records_by_user:
+        return jsonify({'created': 0, 'failed': len(results), 'results': results}), 400
+    
+    try:
+        db.session.add_all([r for records in records_by_user.values() for r in records])
+        
+        # 每个用户只更新一次汇总、排行榜与成就（或写入一个异步任务）
+        now = datetime.utcnow()
+        for user_id, records in records_by_user.items():
+            record_sessions(user_id, records)
+            users[user_id].last_login = now
+        
+        db.session.commit()
+        invalidate_cached_responses(*TRAINING_WRITE_CACHES)
+        notify_job_workers()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to record training'}), 500
+    
+    for result in results:
+        if result['status'] == 'created':
+            result['id'] = result.pop('record').id
+    
+    created = sum(1 for result in results if result['status'] == 'created')
+    return jsonify({
+        'created': created,
+        'failed': len(results) - created,
+        'results': results
+    }), 201 if created == len(results) else 207
+
 @tigang_bp.route('/training/history/<int:user_id>', methods=['GET'])
+@replica_reads
 def get_training_history(user_id):
     """获取用户训练历史"""
     page = request.args.get('page', 1, type=int)
@@ -56,7 +184,10 @@ def get_training_history(user_id):
     end_date = request.args.get('end_date')
     difficulty = request.args.get('difficulty')
     
-    query = TrainingRecord.query.filter_by(user_id=user_id)
+    # 只查询返回的列，不构造ORM对象
+    query = db.session.query(*project(TrainingRecord, TRAINING_RECORD_COLUMNS))\
+        .filter(TrainingRecord.user_id == user_id)
+    start_date_obj = end_date_obj = None
     
     # 添加日期过滤
     if start_date:
@@ -77,67 +208,82 @@ def get_training_history(user_id):
     if difficulty:
         query = query.filter(TrainingRecord.difficulty == difficulty)
     
-    # 分页和排序
+    # 游标分页：传入cursor参数（首页为空字符串）时按 (created_at, id) 键集分页
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        return get_training_history_by_cursor(
+            query, user_id, cursor, per_page,
+            include_total=request.args.get('include_total', 'false').lower() == 'true',
+            start_date=start_date_obj,
+            end_date=end_date_obj,
+            difficulty=difficulty
+        )
+    
+    # 分页和排序；总数对返回的同一批记录精确计数（不读汇总表，避免与分页内容不一致）
     training_records = query.order_by(TrainingRecord.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+        page=page, per_page=per_page, error_out=False, count=False
     )
+    training_records.total = count_training_records(user_id, start_date_obj, end_date_obj, difficulty)
     
     return jsonify({
-        'training_records': [record.to_dict() for record in training_records.items],
+        'training_records': rows_to_dicts(training_records.items),
         'total': training_records.total,
         'page': page,
         'per_page': per_page,
         'pages': training_records.pages
     })
 
+@tigang_bp.route('/training/export/<int:user_id>', methods=['GET'])
+def export_training_history(user_id):
+    """流式导出用户全部训练记录（format=ndjson/csv，可按日期过滤），内存占用与记录数无关"""
+    User.query.get_or_404(user_id)  # 验证用户存在
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    try:
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+            if request.args.get('start_date') else None
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+            if request.args.get('end_date') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid date format (expected YYYY-MM-DD)'}), 400
+    
+    response = Response(
+        stream_with_context(export_training_records(user_id, export_format, start_date, end_date)),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename=training-{user_id}.{export_format}'
+    return response
+
 @tigang_bp.route('/training/stats/<int:user_id>', methods=['GET'])
+@replica_reads
 def get_training_stats(user_id):
     """获取用户训练统计"""
     User.query.get_or_404(user_id)  # 验证用户存在
     
-    # 基础统计
-    total_sessions = TrainingRecord.query.filter_by(user_id=user_id).count()
-    total_duration = db.session.query(func.sum(TrainingRecord.total_duration))\
-        .filter_by(user_id=user_id).scalar() or 0
-    
-    # 按难度统计
-    difficulty_stats = db.session.query(
-        TrainingRecord.difficulty,
-        func.count(TrainingRecord.id).label('session_count'),
-        func.sum(TrainingRecord.sets_completed).label('total_sets'),
-        func.sum(TrainingRecord.reps_completed).label('total_reps'),
-        func.sum(TrainingRecord.total_duration).label('total_time')
-    ).filter_by(user_id=user_id).group_by(TrainingRecord.difficulty).all()
-    
-    # 按日期统计（最近30天）
+    # 基础统计与按难度统计（读取汇总表）
+    summary, difficulty_stats = get_training_summary(user_id)
+    total_sessions = summary.total_sessions
+    total_duration = summary.total_duration
+    
+    # 按日期统计（最近30天，读取每日汇总表；本周、本月均在此范围内）
     thirty_days_ago = date.today() - timedelta(days=30)
-    daily_stats = db.session.query(
-        TrainingRecord.session_date,
-        func.count(TrainingRecord.id).label('session_count'),
-        func.sum(TrainingRecord.total_duration).label('total_time')
-    ).filter(
-        TrainingRecord.user_id == user_id,
-        TrainingRecord.session_date >= thirty_days_ago
-    ).group_by(TrainingRecord.session_date).order_by(TrainingRecord.session_date).all()
-    
-    # 连续天数计算
-    streak_days = calculate_training_streak(user_id)
+    daily_stats = load_daily_stats(user_id, thirty_days_ago)
+    
+    # 连续天数（汇总表增量维护，读取时惰性衰减）
+    streak_days = effective_streak(summary)
     
     # 本周统计
     week_start = date.today() - timedelta(days=date.today().weekday())
-    weekly_sessions = TrainingRecord.query.filter(
-        TrainingRecord.user_id == user_id,
-        TrainingRecord.session_date >= week_start
-    ).count()
+    weekly_sessions = sum(row.session_count for row in daily_stats if row.session_date >= week_start)
     
     # 本月统计
     month_start = date.today().replace(day=1)
-    monthly_sessions = TrainingRecord.query.filter(
-        TrainingRecord.user_id == user_id,
-        TrainingRecord.session_date >= month_start
-    ).count()
+    monthly_sessions = sum(row.session_count for row in daily_stats if row.session_date >= month_start)
     
-    return jsonify({
+    stats = {
         'total_sessions': total_sessions,
         'total_duration_minutes': round(total_duration / 60, 1),
         'streak_days': streak_days,
@@ -149,7 +295,7 @@ def get_training_stats(user_id):
                 'session_count': row.session_count,
                 'total_sets': row.total_sets or 0,
                 'total_reps': row.total_reps or 0,
-                'total_time_minutes': round((row.total_time or 0) / 60, 1)
+                'total_time_minutes': round((row.total_duration or 0) / 60, 1)
             } for row in difficulty_stats
         ],
         'daily_stats': [
@@ -159,44 +305,33 @@ def get_training_stats(user_id):
                 'total_time_minutes': round((row.total_time or 0) / 60, 1)
             } for row in daily_stats
         ]
-    })
+    }
+    
+    # 异步处理期间新解锁的成就，确认（POST .../ack）前每次读取都会返回
+    stats['new_achievements'] = load_achievement_notifications(user_id)
+    
+    return jsonify(stats)
 
 @tigang_bp.route('/training/leaderboard', methods=['GET'])
+@cached_response('leaderboard', LEADERBOARD_CACHE_TTL)
+@replica_reads
 def get_training_leaderboard():
     """获取训练排行榜"""
     period = request.args.get('period', 'week')  # week, month, all_time
     limit = request.args.get('limit', 10, type=int)
     
-    if period == 'week':
-        week_start = date.today() - timedelta(days=date.today().weekday())
-        date_filter = TrainingRecord.session_date >= week_start
-    elif period == 'month':
-        month_start = date.today().replace(day=1)
-        date_filter = TrainingRecord.session_date >= month_start
-    else:  # all_time
-        date_filter = True
-    
-    # 查询用户排行
-    leaderboard_query = db.session.query(
-        User.id,
-        User.username,
-        User.nickname,
-        User.avatar_url,
-        func.count(TrainingRecord.id).label('session_count'),
-        func.sum(TrainingRecord.total_duration).label('total_time'),
-        func.sum(TrainingRecord.sets_completed).label('total_sets'),
-        func.sum(TrainingRecord.reps_completed).label('total_reps')
-    ).join(TrainingRecord).filter(date_filter).group_by(User.id)\
-    .order_by(func.count(TrainingRecord.id).desc()).limit(limit)
+    # 查询用户排行（读取排行榜汇总表）
+    rows = get_leaderboard(period, limit)
     
     leaderboard = []
-    for rank, row in enumerate(leaderboard_query.all(), 1):
+    for rank, row in enumerate(rows, 1):
         leaderboard.append({
             'rank': rank,
             'user_id': row.id,
             'username': row.username,
             'nickname': row.nickname,
             'avatar_url': row.avatar_url,
+            'avatar_thumbnail_url': thumbnail_url(row.avatar_url),
             'session_count': row.session_count,
             'total_time_minutes': round((row.total_time or 0) / 60, 1),
             'total_sets': row.total_sets or 0,
@@ -210,19 +345,20 @@ def get_training_leaderboard():
 
 # 成就系统相关路由
 @tigang_bp.route('/achievements', methods=['GET'])
+@cached_response('achievements', ACHIEVEMENTS_CACHE_TTL)
+@replica_reads
 def get_achievements():
     """获取所有成就"""
-    achievements = Achievement.query.all()
-    return jsonify([achievement.to_dict() for achievement in achievements])
+    achievements = db.session.query(*project(Achievement, ACHIEVEMENT_COLUMNS)).all()
+    return jsonify(rows_to_dicts(achievements))
 
 @tigang_bp.route('/achievements/<int:user_id>', methods=['GET'])
+@replica_reads
 def get_user_achievements(user_id):
     """获取用户成就"""
     User.query.get_or_404(user_id)  # 验证用户存在
     
-    user_achievements = UserAchievement.query.filter_by(user_id=user_id)\
-        .join(Achievement)\
-        .order_by(UserAchievement.unlocked.desc(), Achievement.target_value).all()
+    user_achievements = load_user_achievements(user_id)
     
     return jsonify([ua.to_dict() for ua in user_achievements])
 
@@ -239,137 +375,169 @@ def check_achievements(user_id):
         'updated_achievements': updated_achievements
     })
 
+@tigang_bp.route('/achievements/notifications/<int:user_id>/ack', methods=['POST'])
+def acknowledge_notifications(user_id):
+    """确认已展示的新解锁成就通知（up_to为最大的notification_id，省略时确认全部）"""
+    User.query.get_or_404(user_id)  # 验证用户存在
+
+    up_to = (request.get_json(silent=True) or {}).get('up_to')
+    if up_to is not None and (not isinstance(up_to, int) or isinstance(up_to, bool)):
+        return jsonify({'error': 'Invalid up_to'}), 400
+
+    acknowledged = acknowledge_achievement_notifications(user_id, up_to)
+    db.session.commit()
+    return jsonify({'acknowledged': acknowledged})
+
 # 训练配置相关路由
 @tigang_bp.route('/training/config', methods=['GET'])
+@cached_response('training_config', CONFIG_CACHE_TTL)
 def get_training_configs():
     """获取训练配置"""
-    configs = {
-        'beginner': {
-            'name': '新手级',
-            'name_en': 'Beginner',
-            'contract_time': 5,
-            'relax_time': 5,
-            'reps_per_set': 8,
-            'sets_count': 2,
-            'daily_sessions': 2,
-            'description': '适合初学者的轻松训练',
-            'description_en': 'Easy training for beginners'
-        },
-        'intermediate': {
-            'name': '入门级',
-            'name_en': 'Intermediate',
-            'contract_time': 8,
-            'relax_time': 8,
-            'reps_per_set': 12,
-            'sets_count': 3,
-            'daily_sessions': 3,
-            'description': '中等强度的平衡训练',
-            'description_en': 'Moderate intensity balanced training'
-        },
-        'advanced': {
-            'name': '精通级',
-            'name_en': 'Advanced',
-            'contract_time': 12,
-            'relax_time': 6,
-            'reps_per_set': 15,
-            'sets_count': 4,
-            'daily_sessions': 3,
-            'description': '高强度的专业训练',
-            'description_en': 'High intensity professional training'
-        }
-    }
-    
-    return jsonify(configs)
+    return jsonify(TRAINING_CONFIGS)
 
 # 全局统计路由
 @tigang_bp.route('/stats/global', methods=['GET'])
+@cached_response('global_stats', GLOBAL_STATS_CACHE_TTL)
+@replica_reads
 def get_global_stats():
     """获取全局统计"""
-    total_users = User.query.count()
-    total_training_sessions = TrainingRecord.query.count()
-    total_duration = db.session.query(func.sum(TrainingRecord.total_duration)).scalar() or 0
-    
-    # 今日活跃用户
-    today = date.today()
-    today_active_users = db.session.query(User.id).join(TrainingRecord)\
-        .filter(TrainingRecord.session_date == today).distinct().count()
-    
-    # 本周统计
-    week_start = date.today() - timedelta(days=date.today().weekday())
-    weekly_sessions = TrainingRecord.query.filter(TrainingRecord.session_date >= week_start).count()
+    return jsonify(load_global_stats())
+
+@tigang_bp.route('/stats/global/daily', methods=['GET'])
+@cached_response('global_stats', GLOBAL_STATS_CACHE_TTL)
+@replica_reads
+def get_global_daily_stats():
+    """获取全站每日统计时间序列（默认最近30天）"""
+    try:
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+            if request.args.get('end_date') else date.today()
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+            if request.args.get('start_date') else end_date - timedelta(days=29)
+    except ValueError:
+        return jsonify({'error': 'Invalid date format (expected YYYY-MM-DD)'}), 400
+    
+    if start_date > end_date:
+        return jsonify({'error': 'start_date must not be after end_date'}), 400
+    if (end_date - start_date).days + 1 > MAX_SERIES_DAYS:
+        return jsonify({'error': f'Date range too large (max {MAX_SERIES_DAYS} days)'}), 400
     
     return jsonify({
-        'total_users': total_users,
-        'total_training_sessions': total_training_sessions,
-        'total_duration_hours': round(total_duration / 3600, 1),
-        'today_active_users': today_active_users,
-        'weekly_sessions': weekly_sessions
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'days': load_global_series(start_date, end_date)
     })
 
 # 辅助函数
-def calculate_training_streak(user_id):
-    """计算训练连续天数"""
-    # 获取按日期排序的训练记录
-    training_dates = db.session.query(TrainingRecord.session_date)\
-        .filter_by(user_id=user_id)\
-        .distinct()\
-        .order_by(TrainingRecord.session_date.desc()).all()
-    
-    if not training_dates:
-        return 0
-    
-    streak = 0
-    current_date = date.today()
-    
-    # 检查是否今天有训练
-    training_date_set = {td[0] for td in training_dates}
-    
-    for training_date in sorted(training_date_set, reverse=True):
-        if training_date == current_date or training_date == current_date - timedelta(days=1):
-            streak += 1
-            current_date = training_date - timedelta(days=1)
-        else:
-            break
-    
-    return streak
+TRAINING_RECORD_FIELDS = ['user_id', 'difficulty', 'sets_completed', 'reps_completed', 'total_duration', 'contract_time', 'relax_time']
+
+def build_training_record(item, users):
+    """校验一条批量训练数据，返回 (TrainingRecord, None) 或 (None, 错误信息)"""
+    if not isinstance(item, dict) or not all(field in item for field in TRAINING_RECORD_FIELDS):
+        return None, 'Missing required fields'
+    # bool是int的子类，true会被当作用户1
+    if not isinstance(item['user_id'], int) or isinstance(item['user_id'], bool):
+        return None, 'Invalid user_id'
+    if item['user_id'] not in users:
+        return None, 'User not found'
+    if not isinstance(item['difficulty'], str) or item['difficulty'] not in TRAINING_CONFIGS:
+        return None, 'Invalid difficulty'
+    
+    for field in TRAINING_RECORD_FIELDS[2:]:
+        value = item[field]
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            return None, f'Invalid {field}'
+    
+    session_date = date.today()
+    if item.get('session_date'):
+        try:
+            session_date = datetime.strptime(item['session_date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return None, 'Invalid session_date format. Use YYYY-MM-DD'
+        if session_date > date.today():
+            return None, 'session_date cannot be in the future'
+    
+    created_at = datetime.utcnow()
+    if item.get('created_at'):
+        try:
+            created_at = datetime.fromisoformat(item['created_at'])
+        except (TypeError, ValueError):
+            return None, 'Invalid created_at format. Use ISO 8601'
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return TrainingRecord(
+        user_id=item['user_id'],
+        difficulty=item['difficulty'],
+        sets_completed=item['sets_completed'],
+        reps_completed=item['reps_completed'],
+        total_duration=item['total_duration'],
+        contract_time=item['contract_time'],
+        relax_time=item['relax_time'],
+        session_date=session_date,
+        created_at=created_at
+    ), None
+
+def encode_history_cursor(record):
+    """把 (created_at, id) 编码为不透明游标"""
+    raw = f"{record.created_at.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_history_cursor(cursor):
+    """解析游标，格式错误时抛出ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, record_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(record_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def get_training_history_by_cursor(query, user_id, cursor, per_page, include_total=False, start_date=None, end_date=None, difficulty=None):
+    """按 (created_at, id) 倒序的键集分页，不执行COUNT和OFFSET"""
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_history_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(or_(
+            TrainingRecord.created_at < cursor_created_at,
+            and_(TrainingRecord.created_at == cursor_created_at, TrainingRecord.id < cursor_id)
+        ))
+    
+    # 多取一条判断是否还有下一页
+    records = query.order_by(TrainingRecord.created_at.desc(), TrainingRecord.id.desc())\
+        .limit(per_page + 1).all()
+    has_more = len(records) > per_page
+    records = records[:per_page]
+    
+    result = {
+        'training_records': rows_to_dicts(records),
+        'next_cursor': encode_history_cursor(records[-1]) if has_more else None,
+        'per_page': per_page
+    }
+    
+    if include_total:
+        result['total'] = count_training_records(user_id, start_date, end_date, difficulty)
+    
+    return jsonify(result)
+
+def count_training_records(user_id, start_date=None, end_date=None, difficulty=None):
+    """对原始训练记录精确计数（与历史接口的过滤条件一致）
+
+    没有难度过滤时只读 ix_training_record_user_date 索引（覆盖 user_id 与 session_date）。
+    """
+    query = db.session.query(func.count()).select_from(TrainingRecord).filter(TrainingRecord.user_id == user_id)
+    if start_date:
+        query = query.filter(TrainingRecord.session_date >= start_date)
+    if end_date:
+        query = query.filter(TrainingRecord.session_date <= end_date)
+    if difficulty:
+        query = query.filter(TrainingRecord.difficulty == difficulty)
+    return query.scalar()
 
 def update_user_achievements(user_id):
-    """更新用户成就"""
-    updated_achievements = []
-    
-    # 获取用户统计数据
-    total_sessions = TrainingRecord.query.filter_by(user_id=user_id).count()
-    total_duration = db.session.query(func.sum(TrainingRecord.total_duration))\
-        .filter_by(user_id=user_id).scalar() or 0
-    streak_days = calculate_training_streak(user_id)
-    
-    # 获取用户所有成就
-    user_achievements = UserAchievement.query.filter_by(user_id=user_id).all()
-    
-    for ua in user_achievements:
-        achievement = ua.achievement
-        old_progress = ua.progress
-        old_unlocked = ua.unlocked
-        
-        # 根据成就类型更新进度
-        if achievement.category == 'session_count':
-            ua.progress = min(total_sessions, achievement.target_value)
-        elif achievement.category == 'training_time':
-            # 时间成就：目标值为小时数
-            hours = total_duration / 3600
-            ua.progress = min(int(hours), achievement.target_value)
-        elif achievement.category == 'streak_days':
-            ua.progress = min(streak_days, achievement.target_value)
-        
-        # 检查是否解锁
-        if not ua.unlocked and ua.progress >= achievement.target_value:
-            ua.unlocked = True
-            ua.unlocked_at = datetime.utcnow()
-            updated_achievements.append(achievement.to_dict())
-        
-        # 如果有变化则记录
-        if ua.progress != old_progress or ua.unlocked != old_unlocked:
-            db.session.add(ua)
+    """全量评估并更新用户成就"""
+    summary, _ = get_training_summary(user_id)
+    updated_achievements = evaluate_achievements(user_id, achievement_metrics(summary))
     
     try:
         db.session.commit()
@@ -383,72 +551,10 @@ def update_user_achievements(user_id):
 @tigang_bp.route('/init-achievements', methods=['POST'])
 def init_achievements():
     """初始化成就数据"""
-    achievements_data = [
-        {
-            'name': '初试身手',
-            'name_en': 'First Steps',
-            'description': '完成你的第一次训练',
-            'description_en': 'Complete your first training session',
-            'icon': 'Play',
-            'category': 'session_count',
-            'target_value': 1
-        },
-        {
-            'name': '坚持一周',
-            'name_en': '7-Day Streak',
-            'description': '连续训练7天',
-            'description_en': 'Train for 7 consecutive days',
-            'icon': 'Flame',
-            'category': 'streak_days',
-            'target_value': 7
-        },
-        {
-            'name': '百次达人',
-            'name_en': '100 Sessions',
-            'description': '完成100次训练',
-            'description_en': 'Complete 100 training sessions',
-            'icon': 'Trophy',
-            'category': 'session_count',
-            'target_value': 100
-        },
-        {
-            'name': '千次专家',
-            'name_en': '1000 Sessions',
-            'description': '完成1000次训练',
-            'description_en': 'Complete 1000 training sessions',
-            'icon': 'Star',
-            'category': 'session_count',
-            'target_value': 1000
-        },
-        {
-            'name': '马拉松选手',
-            'name_en': 'Marathon Trainer',
-            'description': '累计训练时间达到10小时',
-            'description_en': 'Accumulate 10 hours of training',
-            'icon': 'Clock',
-            'category': 'training_time',
-            'target_value': 10
-        },
-        {
-            'name': '完美一月',
-            'name_en': '30-Day Streak',
-            'description': '连续训练30天',
-            'description_en': 'Train for 30 consecutive days',
-            'icon': 'Target',
-            'category': 'streak_days',
-            'target_value': 30
-        }
-    ]
-    
     try:
-        for achievement_data in achievements_data:
-            # 检查成就是否已存在
-            existing = Achievement.query.filter_by(name=achievement_data['name']).first()
-            if not existing:
-                achievement = Achievement(**achievement_data)
-                db.session.add(achievement)
-        
+        seed_achievements()
         db.session.commit()
+        invalidate_cached_responses('achievements')
         return jsonify({'message': 'Achievements initialized successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -1,5 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, abort, redirect
 from src.models.user import User, TrainingRecord, Achievement, UserAchievement, db
+from src.services.training_summary import get_training_summary
+from src.services.streaks import effective_streak
+from src.services.daily_stats import count_sessions
+from src.services.achievements import load_achievement_notifications, load_user_achievements
+from src.services.avatar_store import (
+    AVATAR_KEY_PATTERN, AvatarError, avatar_url, find_original_key, get_avatar_store, is_data_uri, mimetype_for_key,
+    save_avatar, thumbnail_url
+)
+from src.services.response_cache import invalidate_cached_responses
+from src.services.replicas import replica_reads
+from src.services.global_stats import record_deleted_user, record_new_users
+from src.services.serialization import USER_COLUMNS, project, rows_to_dicts
+from sqlalchemy.orm import joinedload
 from datetime import datetime, date, timedelta
 from sqlalchemy import func
 import base64
@@ -34,6 +47,7 @@ def register():
     try:
         db.session.add(user)
         db.session.flush()  # 获取用户ID
+        record_new_users([user])
         
         # 初始化用户成就
         achievements = Achievement.query.all()
@@ -47,6 +61,7 @@ def register():
             db.session.add(user_achievement)
         
         db.session.commit()
+        invalidate_cached_responses('global_stats')
         return jsonify(user.to_dict()), 201
     except Exception as e:
         db.session.rollback()
@@ -72,11 +87,15 @@ def login():
 
 @user_bp.route('/profile/<int:user_id>', methods=['GET'])
 def get_profile(user_id):
-    """获取用户完整个人资料"""
-    user = User.query.get_or_404(user_id)
+    """获取用户完整个人资料
+
+    固定查询次数：用户+汇总、难度明细、本周次数、最近训练、成就（含成就定义）、新成就通知。
+    """
+    user = User.query.options(joinedload(User.training_summary))\
+        .filter(User.id == user_id).first_or_404()
     
-    # 计算统计数据
-    stats = get_user_stats(user_id)
+    # 计算统计数据（复用已加载的汇总行）
+    stats = get_user_stats(user_id, summary=user.training_summary)
     
     # 获取最近训练记录
     recent_training = TrainingRecord.query.filter_by(user_id=user_id)\
@@ -84,17 +103,19 @@ def get_profile(user_id):
         .limit(10).all()
     
     # 获取用户成就
-    user_achievements = UserAchievement.query.filter_by(user_id=user_id)\
-        .join(Achievement)\
-        .order_by(UserAchievement.unlocked.desc(), Achievement.target_value).all()
+    user_achievements = load_user_achievements(user_id)
     
     profile_data = user.to_dict(include_wallet=True)
     profile_data.update({
+        'avatar_thumbnail_url': thumbnail_url(user.avatar_url),
         'stats': stats,
         'recent_training': [record.to_dict() for record in recent_training],
         'achievements': [ua.to_dict() for ua in user_achievements]
     })
     
+    # 异步处理期间新解锁的成就，确认（POST .../ack）前每次读取都会返回
+    profile_data['new_achievements'] = load_achievement_notifications(user_id)
+    
     return jsonify(profile_data), 200
 
 @user_bp.route('/profile/<int:user_id>', methods=['PUT'])
@@ -121,12 +142,19 @@ def update_profile(user_id):
                 existing_user = User.query.filter_by(username=data[field]).filter(User.id != user_id).first()
                 if existing_user:
                     return jsonify({'error': 'Username already exists'}), 400
+            elif field == 'avatar_url' and is_data_uri(data[field]):
+                # 旧客户端直接提交base64头像时转存到头像存储
+                try:
+                    data[field] = save_avatar(data[field])['avatar_url']
+                except AvatarError as e:
+                    return jsonify({'error': str(e)}), 400
             setattr(user, field, data[field])
     
     user.updated_at = datetime.utcnow()
     
     try:
         db.session.commit()
+        invalidate_cached_responses('leaderboard')
         return jsonify(user.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -141,21 +169,48 @@ def upload_avatar(user_id):
     if not data or 'avatar_data' not in data:
         return jsonify({'error': 'Missing avatar data'}), 400
     
+    # 验证base64数据并写入内容寻址的头像存储，用户表只保存短URL
     try:
-        # 验证base64数据
-        avatar_data = data['avatar_data']
-        if not avatar_data.startswith('data:image/'):
-            return jsonify({'error': 'Invalid image format'}), 400
-        
-        user.avatar_url = avatar_data
+        stored = save_avatar(data['avatar_data'])
+    except AvatarError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        user.avatar_url = stored['avatar_url']
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_cached_responses('leaderboard')
         
-        return jsonify({'avatar_url': user.avatar_url}), 200
+        return jsonify({'avatar_url': user.avatar_url, 'thumbnails': stored['thumbnails']}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to upload avatar'}), 500
 
+@user_bp.route('/avatars/<key>', methods=['GET'])
+def get_avatar(key):
+    """读取头像或缩略图（内容寻址，永久缓存）"""
+    if not AVATAR_KEY_PATTERN.match(key):
+        abort(404)
+    
+    # 内容不可变，ETag即存储键
+    if request.if_none_match.contains(key):
+        response = Response(status=304)
+    else:
+        store = get_avatar_store()
+        data = store.get(key)
+        if data is None:
+            # 缩略图未生成（如上传时未安装Pillow）时临时重定向到原图，不做永久缓存
+            original = find_original_key(store, key) if '_' in key else None
+            if original is None:
+                abort(404)
+            return redirect(avatar_url(original))
+        response = Response(data, mimetype=mimetype_for_key(key))
+    
+    response.set_etag(key)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
 @user_bp.route('/wallet/<int:user_id>', methods=['POST'])
 def connect_wallet(user_id):
     """连接钱包"""
@@ -202,42 +257,34 @@ def disconnect_wallet(user_id):
         return jsonify({'error': 'Failed to disconnect wallet'}), 500
 
 @user_bp.route('/stats/<int:user_id>', methods=['GET'])
+@replica_reads
 def get_user_stats_api(user_id):
     """获取用户统计数据"""
     User.query.get_or_404(user_id)  # 验证用户存在
     stats = get_user_stats(user_id)
     return jsonify(stats), 200
 
-def get_user_stats(user_id):
-    """计算用户统计数据的辅助函数"""
-    # 总训练次数
-    total_records = TrainingRecord.query.filter_by(user_id=user_id).count()
-    
-    # 总训练时间（分钟）
-    total_duration = db.session.query(func.sum(TrainingRecord.total_duration))\
-        .filter_by(user_id=user_id).scalar() or 0
+def get_user_stats(user_id, summary=None):
+    """计算用户统计数据的辅助函数，summary为已预加载的汇总行"""
+    # 总训练次数与总训练时间（读取汇总表）
+    summary, difficulty_stats = get_training_summary(user_id, summary=summary)
+    total_records = summary.total_sessions
+    total_duration = summary.total_duration
     total_time_hours = round(total_duration / 3600, 1)
     
-    # 计算连续天数
-    current_streak = calculate_streak(user_id)
+    # 连续天数（汇总表增量维护，读取时惰性衰减）
+    current_streak = effective_streak(summary)
     
     # 本周训练次数
     week_start = date.today() - timedelta(days=date.today().weekday())
-    weekly_count = TrainingRecord.query.filter_by(user_id=user_id)\
-        .filter(TrainingRecord.session_date >= week_start).count()
+    weekly_count = count_sessions(user_id, week_start)
     
     # 按难度统计
-    difficulty_stats = db.session.query(
-        TrainingRecord.difficulty,
-        func.count(TrainingRecord.id),
-        func.sum(TrainingRecord.total_duration)
-    ).filter_by(user_id=user_id).group_by(TrainingRecord.difficulty).all()
-    
     difficulty_breakdown = {}
-    for difficulty, count, duration in difficulty_stats:
-        difficulty_breakdown[difficulty] = {
-            'count': count,
-            'total_duration': duration or 0
+    for row in difficulty_stats:
+        difficulty_breakdown[row.difficulty] = {
+            'count': row.session_count,
+            'total_duration': row.total_duration or 0
         }
     
     return {
@@ -247,46 +294,15 @@ def get_user_stats(user_id):
         'weekly_progress': weekly_count,
         'weekly_goal': 21,  # 默认周目标
         'difficulty_breakdown': difficulty_breakdown,
-        'last_training': get_last_training_date(user_id)
+        'longest_streak': summary.longest_streak or 0,
+        'last_training': summary.last_session_date.isoformat() if summary.last_session_date else None
     }
 
-def calculate_streak(user_id):
-    """计算连续训练天数"""
-    # 获取按日期排序的训练记录
-    training_dates = db.session.query(TrainingRecord.session_date)\
-        .filter_by(user_id=user_id)\
-        .distinct()\
-        .order_by(TrainingRecord.session_date.desc()).all()
-    
-    if not training_dates:
-        return 0
-    
-    streak = 0
-    current_date = date.today()
-    
-    for (training_date,) in training_dates:
-        if training_date == current_date or training_date == current_date - timedelta(days=1):
-            streak += 1
-            current_date = training_date - timedelta(days=1)
-        else:
-            break
-    
-    return streak
-
-def get_last_training_date(user_id):
-    """获取最后训练日期"""
-    last_record = TrainingRecord.query.filter_by(user_id=user_id)\
-        .order_by(TrainingRecord.created_at.desc()).first()
-    
-    if last_record:
-        return last_record.session_date.isoformat()
-    return None
-
 @user_bp.route('/users', methods=['GET'])
 def get_users():
     """获取所有用户（管理功能）"""
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    users = db.session.query(*project(User, USER_COLUMNS)).all()
+    return jsonify(rows_to_dicts(users))
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
@@ -294,8 +310,10 @@ def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     
     try:
+        record_deleted_user(user_id)
         db.session.delete(user)
         db.session.commit()
+        invalidate_cached_responses('global_stats', 'leaderboard')
         return jsonify({'message': 'User deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
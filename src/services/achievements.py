@@ -0,0 +1,127 @@
+import threading
+import time
+from datetime import datetime
+from src.models.user import Achievement, AchievementNotification, UserAchievement, db
+from src.services.streaks import effective_streak
+from sqlalchemy import delete
+from sqlalchemy.orm import contains_eager
+
+# 成就目录进程内缓存的有效期（秒），兜底其他进程对成就表的修改
+CATALOGUE_TTL = 300
+
+_catalogue_lock = threading.Lock()
+_catalogue = {'by_category': None, 'loaded_at': 0}
+
+def get_achievement_catalogue():
+    """返回按类别索引的成就目录 {category: [成就字典, ...]}，按target_value升序"""
+    by_category = _catalogue['by_category']
+    if by_category is not None and time.monotonic() - _catalogue['loaded_at'] < CATALOGUE_TTL:
+        return by_category
+
+    with _catalogue_lock:
+        by_category = {}
+        for achievement in Achievement.query.order_by(Achievement.target_value).all():
+            by_category.setdefault(achievement.category, []).append(achievement.to_dict())
+        _catalogue['by_category'] = by_category
+        _catalogue['loaded_at'] = time.monotonic()
+    return by_category
+
+def invalidate_achievement_catalogue():
+    """成就表变更后清空本进程缓存"""
+    _catalogue['by_category'] = None
+
+def load_user_achievements(user_id):
+    """一次查询加载用户成就及其成就定义（已解锁在前，按目标值排序）"""
+    return UserAchievement.query.filter(UserAchievement.user_id == user_id)\
+        .join(UserAchievement.achievement)\
+        .options(contains_eager(UserAchievement.achievement))\
+        .order_by(UserAchievement.unlocked.desc(), Achievement.target_value).all()
+
+def achievement_metrics(summary):
+    """根据训练汇总计算各成就类别的当前数值"""
+    if summary is None:
+        return None
+    return {
+        'session_count': summary.total_sessions or 0,
+        # 时间成就：目标值为小时数
+        'training_time': int((summary.total_duration or 0) / 3600),
+        'streak_days': effective_streak(summary)
+    }
+
+def evaluate_achievements(user_id, current, previous=None):
+    """按事件前后的数值只更新进度发生变化的用户成就，返回新解锁的成就列表
+
+    previous为None时全量评估该用户所有类别（如手动检查或缺少事件前数据）。
+    """
+    catalogue = get_achievement_catalogue()
+
+    # 只有进度 min(value, target) 会变化的成就才需要处理
+    affected = {}
+    for category, value in current.items():
+        if previous is not None and previous.get(category) == value:
+            continue
+        floor = -1 if previous is None else min(value, previous.get(category, 0))
+        for achievement in catalogue.get(category, []):
+            if achievement['target_value'] > floor:
+                affected[achievement['id']] = (achievement, value)
+
+    if not affected:
+        return []
+
+    updated_achievements = []
+    user_achievements = UserAchievement.query.filter(
+        UserAchievement.user_id == user_id,
+        UserAchievement.achievement_id.in_(list(affected))
+    ).all()
+
+    for ua in user_achievements:
+        achievement, value = affected[ua.achievement_id]
+        progress = min(value, achievement['target_value'])
+        if ua.progress != progress:
+            ua.progress = progress
+
+        # 检查是否解锁
+        if not ua.unlocked and progress >= achievement['target_value']:
+            ua.unlocked = True
+            ua.unlocked_at = datetime.utcnow()
+            updated_achievements.append(achievement)
+
+    return updated_achievements
+
+def queue_achievement_notifications(user_id, unlocked):
+    """记录新解锁的成就，用户读取时下发，确认后删除"""
+    db.session.add_all([
+        AchievementNotification(user_id=user_id, achievement_id=achievement['id'])
+        for achievement in unlocked
+    ])
+
+def load_achievement_notifications(user_id):
+    """读取用户待下发的新解锁成就（不删除），返回成就字典列表
+
+    每项带notification_id（同一成就取最大值），客户端展示后以其中最大值调用
+    acknowledge_achievement_notifications确认；只读请求不写数据库，重试或预取不会丢失通知。
+    """
+    rows = db.session.query(AchievementNotification.id, AchievementNotification.achievement_id)\
+        .filter(AchievementNotification.user_id == user_id)\
+        .order_by(AchievementNotification.id).all()
+    if not rows:
+        return []
+
+    latest = {}
+    for notification_id, achievement_id in rows:
+        latest[achievement_id] = notification_id
+    by_id = {a['id']: a for achievements in get_achievement_catalogue().values() for a in achievements}
+    return [
+        {**by_id[achievement_id], 'notification_id': notification_id}
+        for achievement_id, notification_id in latest.items() if achievement_id in by_id
+    ]
+
+def acknowledge_achievement_notifications(user_id, up_to=None):
+    """删除用户已下发的通知（up_to为空时删除全部，否则只删除ID不大于up_to的），返回删除条数
+
+    调用方负责提交。
+    """
+    query = delete(AchievementNotification).where(AchievementNotification.user_id == user_id)
+    if up_to is not None:
+        query = query.where(AchievementNotification.id <= up_to)
+    return db.session.execute(query.execution_options(synchronize_session=False)).rowcount
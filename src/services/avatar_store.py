@@ -0,0 +1,257 @@
+import base64
+import binascii
+from abc import ABC, abstractmethod
+import hashlib
+import io
+import os
+import re
+import tempfile
+from flask import current_app
+from src.models.user import User, db
+from sqlalchemy.orm import load_only
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow为可选依赖，缺失时只保存原图
+    Image = None
+
+# 头像原图最大字节数（解码后）
+MAX_AVATAR_BYTES = 5 * 1024 * 1024
+
+# 解码前允许的最大像素数（宽×高），超过时拒绝上传，避免解压炸弹占满内存
+MAX_AVATAR_PIXELS = 4096 * 4096
+
+# 生成的缩略图边长（像素）
+THUMBNAIL_SIZES = (64, 256)
+
+# 排行榜、个人资料等接口返回的缩略图边长
+LIST_THUMBNAIL_SIZE = 64
+
+AVATAR_URL_PREFIX = '/api/avatars/'
+
+# data URI中的MIME类型 -> 文件扩展名
+IMAGE_TYPES = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+
+MIME_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+}
+
+PIL_FORMATS = {'png': 'PNG', 'jpg': 'JPEG', 'webp': 'WEBP'}
+
+# 文件头（magic bytes）校验：内容必须与声明的MIME类型一致，避免以image/*提供任意数据
+IMAGE_SIGNATURES = {
+    'png': lambda data: data.startswith(b'\x89PNG\r\n\x1a\n'),
+    'jpg': lambda data: data.startswith(b'\xff\xd8\xff'),
+    'gif': lambda data: data[:6] in (b'GIF87a', b'GIF89a'),
+    'webp': lambda data: data[:4] == b'RIFF' and data[8:12] == b'WEBP',
+}
+
+# 存储键：<sha256>[_<尺寸>].<扩展名>
+AVATAR_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}(_\d+)?\.(png|jpg|gif|webp)$')
+
+DATA_URI_PATTERN = re.compile(r'^data:(image/[a-z]+);base64,(.*)$', re.DOTALL)
+
+class AvatarError(ValueError):
+    """头像数据无效"""
+
+class AvatarStore(ABC):
+    """头像存储后端接口，按内容哈希寻址，写入后不可变"""
+
+    @abstractmethod
+    def exists(self, key):
+        ...
+
+    @abstractmethod
+    def put(self, key, data):
+        ...
+
+    @abstractmethod
+    def get(self, key):
+        """返回字节内容，不存在时返回None"""
+
+class LocalAvatarStore(AvatarStore):
+    """本地文件系统存储：<root>/<哈希前两位>/<key>"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, key, data):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，避免并发读到半个文件
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+# 可插拔后端：名称 -> 工厂函数(app)
+AVATAR_BACKENDS = {
+    'local': lambda app: LocalAvatarStore(
+        app.config.get('AVATAR_STORAGE_DIR') or os.path.join(app.instance_path, 'avatars')
+    ),
+}
+
+def register_avatar_backend(name, factory):
+    """注册自定义存储后端（如对象存储），通过 AVATAR_STORAGE_BACKEND 配置启用"""
+    AVATAR_BACKENDS[name] = factory
+
+def get_avatar_store():
+    """返回当前应用配置的头像存储（每个应用实例缓存一个）"""
+    app = current_app._get_current_object()
+    store = app.extensions.get('avatar_store')
+    if store is None:
+        backend = app.config.get('AVATAR_STORAGE_BACKEND', 'local')
+        if backend not in AVATAR_BACKENDS:
+            raise RuntimeError(f'Unknown avatar storage backend: {backend}')
+        store = AVATAR_BACKENDS[backend](app)
+        app.extensions['avatar_store'] = store
+    return store
+
+def is_data_uri(value):
+    return isinstance(value, str) and value.startswith('data:image/')
+
+def avatar_url(key):
+    return f'{AVATAR_URL_PREFIX}{key}'
+
+def mimetype_for_key(key):
+    return MIME_TYPES[key.rsplit('.', 1)[1]]
+
+def thumbnail_key(key, size):
+    """原图存储键对应的缩略图键，由内容哈希推导（无需另存）；PIL无法写出的格式（GIF）缩略图为PNG"""
+    content_hash, ext = key.rsplit('.', 1)
+    return f'{content_hash}_{size}.{ext if ext in PIL_FORMATS else "png"}'
+
+def thumbnail_url(url, size=LIST_THUMBNAIL_SIZE):
+    """头像存储中原图URL对应的缩略图URL；外部URL、内联data URI或空值返回None"""
+    if not url or not url.startswith(AVATAR_URL_PREFIX):
+        return None
+    key = url[len(AVATAR_URL_PREFIX):]
+    if not AVATAR_KEY_PATTERN.match(key) or '_' in key:
+        return None
+    return avatar_url(thumbnail_key(key, size))
+
+def find_original_key(store, key):
+    """缩略图键对应的原图键（缩略图未生成时用于回退），找不到时返回None"""
+    content_hash = key.split('_', 1)[0]
+    for ext in MIME_TYPES:
+        original = f'{content_hash}.{ext}'
+        if store.exists(original):
+            return original
+    return None
+
+def _make_thumbnail(data, size, ext):
+    """生成缩略图，返回 (字节, 扩展名)；无法处理时返回None，像素过多时抛出AvatarError"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # open只读取文件头；在解码像素之前按声明的尺寸拒绝
+            if image.width * image.height > MAX_AVATAR_PIXELS:
+                raise AvatarError('Image dimensions too large')
+            image.thumbnail((size, size))
+            thumb_ext = ext if ext in PIL_FORMATS else 'png'
+            if thumb_ext == 'jpg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            image.save(output, PIL_FORMATS[thumb_ext])
+            return output.getvalue(), thumb_ext
+    except AvatarError:
+        raise
+    except Image.DecompressionBombError:
+        raise AvatarError('Image dimensions too large')
+    except Exception:
+        return None
+
+def save_avatar(data_uri):
+    """保存base64 data URI头像，返回 {'avatar_url': ..., 'thumbnails': {尺寸: url}}"""
+    match = DATA_URI_PATTERN.match(data_uri or '')
+    if not match or match.group(1) not in IMAGE_TYPES:
+        raise AvatarError('Invalid image format')
+
+    try:
+        data = base64.b64decode(match.group(2), validate=True)
+    except (binascii.Error, ValueError):
+        raise AvatarError('Invalid base64 data')
+    if not data:
+        raise AvatarError('Empty image')
+    if len(data) > MAX_AVATAR_BYTES:
+        raise AvatarError('Image too large')
+
+    ext = IMAGE_TYPES[match.group(1)]
+    if not IMAGE_SIGNATURES[ext](data):
+        raise AvatarError('Image content does not match its type')
+    content_hash = hashlib.sha256(data).hexdigest()
+    store = get_avatar_store()
+    key = f'{content_hash}.{ext}'
+
+    # 先生成缺失的缩略图（尺寸过大时在写入任何内容之前拒绝），再写入原图
+    thumbnails = {}
+    generated = []
+    for size in THUMBNAIL_SIZES:
+        thumb_key = thumbnail_key(key, size)
+        if not store.exists(thumb_key):
+            thumbnail = _make_thumbnail(data, size, ext)
+            if not thumbnail:
+                continue
+            generated.append((thumb_key, thumbnail[0]))
+        thumbnails[str(size)] = avatar_url(thumb_key)
+
+    store.put(key, data)
+    for thumb_key, thumb_data in generated:
+        store.put(thumb_key, thumb_data)
+
+    return {'avatar_url': avatar_url(key), 'thumbnails': thumbnails}
+
+def migrate_inline_avatars(batch_size=100):
+    """把User.avatar_url中的base64头像分批迁移到头像存储，返回 (迁移数, 失败数)"""
+    migrated = 0
+    failed = 0
+    last_id = 0
+    while True:
+        # 按id键集分批，每批只加载id和头像列
+        users = User.query.options(load_only(User.id, User.avatar_url))\
+            .filter(User.id > last_id, User.avatar_url.like('data:image/%'))\
+            .order_by(User.id).limit(batch_size).all()
+        if not users:
+            break
+
+        for user in users:
+            try:
+                user.avatar_url = save_avatar(user.avatar_url)['avatar_url']
+                migrated += 1
+            except AvatarError:
+                failed += 1
+        last_id = users[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+
+    return migrated, failed
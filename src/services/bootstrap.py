@@ -0,0 +1,199 @@
+import time
+from datetime import date, timedelta
+from sqlalchemy import insert, text
+from sqlalchemy.exc import SQLAlchemyError
+from src.models.user import User, TrainingRecord, Achievement, UserAchievement, SchemaMeta, db
+from src.services.achievements import invalidate_achievement_catalogue
+from src.services.training_events import apply_recorded_sessions
+from src.services.daily_stats import ensure_daily_stats
+from src.services.leaderboard import ensure_leaderboards
+from src.services.global_stats import ensure_global_stats, record_new_users
+
+# 表结构版本：新增表/索引时加1，下次启动或 flask migrate 时补建
+SCHEMA_VERSION = 7
+
+# 种子数据版本：修改 DEFAULT_ACHIEVEMENTS / SAMPLE_USERS 时加1
+SEED_VERSION = 1
+
+DEFAULT_ACHIEVEMENTS = [
+    {
+        'name': '初试身手',
+        'name_en': 'First Steps',
+        'description': '完成你的第一次训练',
+        'description_en': 'Complete your first training session',
+        'icon': 'Play',
+        'category': 'session_count',
+        'target_value': 1
+    },
+    {
+        'name': '坚持一周',
+        'name_en': '7-Day Streak',
+        'description': '连续训练7天',
+        'description_en': 'Train for 7 consecutive days',
+        'icon': 'Flame',
+        'category': 'streak_days',
+        'target_value': 7
+    },
+    {
+        'name': '百次达人',
+        'name_en': '100 Sessions',
+        'description': '完成100次训练',
+        'description_en': 'Complete 100 training sessions',
+        'icon': 'Trophy',
+        'category': 'session_count',
+        'target_value': 100
+    },
+    {
+        'name': '千次专家',
+        'name_en': '1000 Sessions',
+        'description': '完成1000次训练',
+        'description_en': 'Complete 1000 training sessions',
+        'icon': 'Star',
+        'category': 'session_count',
+        'target_value': 1000
+    },
+    {
+        'name': '马拉松选手',
+        'name_en': 'Marathon Trainer',
+        'description': '累计训练时间达到10小时',
+        'description_en': 'Accumulate 10 hours of training',
+        'icon': 'Clock',
+        'category': 'training_time',
+        'target_value': 10
+    },
+    {
+        'name': '完美一月',
+        'name_en': '30-Day Streak',
+        'description': '连续训练30天',
+        'description_en': 'Train for 30 consecutive days',
+        'icon': 'Target',
+        'category': 'streak_days',
+        'target_value': 30
+    }
+]
+
+SAMPLE_USERS = [
+    {
+        'username': 'demo_user',
+        'nickname': 'PEED演示用户',
+        'bio': '欢迎使用PEED健康训练系统！',
+        'email': 'demo@peed.com'
+    },
+    {
+        'username': 'trainer_pro',
+        'nickname': '专业训练师',
+        'bio': '健康生活从提肛训练开始',
+        'email': 'trainer@peed.com'
+    }
+]
+
+# 演示用户的示例训练记录：(距今天数, 训练参数)
+SAMPLE_TRAINING = [
+    (2, {'difficulty': 'beginner', 'sets_completed': 2, 'reps_completed': 16,
+         'total_duration': 160, 'contract_time': 5, 'relax_time': 5}),  # 约2.7分钟
+    (1, {'difficulty': 'intermediate', 'sets_completed': 3, 'reps_completed': 36,
+         'total_duration': 576, 'contract_time': 8, 'relax_time': 8}),  # 约9.6分钟
+    (0, {'difficulty': 'beginner', 'sets_completed': 2, 'reps_completed': 16,
+         'total_duration': 160, 'contract_time': 5, 'relax_time': 5}),
+]
+
+def get_schema_state():
+    """一次查询读取 {key: value} 版本标记；标记表不存在时返回空字典"""
+    try:
+        rows = db.session.query(SchemaMeta.key, SchemaMeta.value)\
+            .filter(SchemaMeta.key.in_(('schema_version', 'seed_version'))).all()
+    except SQLAlchemyError:
+        # 全新数据库还没有标记表；回滚以免PostgreSQL事务停留在失败状态
+        db.session.rollback()
+        return {}
+    return {key: value for key, value in rows}
+
+def is_up_to_date(state=None):
+    """数据库的表结构与种子数据是否已是当前版本"""
+    state = get_schema_state() if state is None else state
+    return state.get('schema_version') == str(SCHEMA_VERSION) and \
+        state.get('seed_version') == str(SEED_VERSION)
+
+def ensure_indexes():
+    """为已存在的表补建模型中声明的索引（db.create_all不会修改已有表），返回索引数"""
+    count = 0
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+            count += 1
+    return count
+
+def drop_materialized_views():
+    """删除 schema v5/v6 在PostgreSQL上创建的排行榜与全站统计物化视图（已改为直接读取汇总表），返回删除语句数"""
+    if db.engine.dialect.name != 'postgresql':
+        return 0
+    for name in ('leaderboard_mv', 'global_stats_mv'):
+        db.session.execute(text(f'DROP MATERIALIZED VIEW IF EXISTS {name}'))
+    return 2
+
+def seed_achievements():
+    """批量补充缺失的默认成就（按名称判断，可重复执行），返回新增数量"""
+    existing = {name for (name,) in db.session.query(Achievement.name)}
+    missing = [data for data in DEFAULT_ACHIEVEMENTS if data['name'] not in existing]
+    if missing:
+        db.session.execute(insert(Achievement), missing)
+        invalidate_achievement_catalogue()
+    return len(missing)
+
+def seed_sample_users():
+    """空库时批量创建示例用户、成就进度与演示训练记录，返回新增用户数"""
+    if db.session.query(User.id).first() is not None:
+        return 0
+
+    users = [User(**data) for data in SAMPLE_USERS]
+    db.session.add_all(users)
+    db.session.flush()  # 获取用户ID
+    record_new_users(users)
+
+    achievement_ids = [achievement_id for (achievement_id,) in db.session.query(Achievement.id)]
+    db.session.execute(insert(UserAchievement), [
+        {'user_id': user.id, 'achievement_id': achievement_id, 'progress': 0, 'unlocked': False}
+        for user in users for achievement_id in achievement_ids
+    ])
+
+    demo_user = users[0]
+    training_records = [
+        TrainingRecord(user_id=demo_user.id, session_date=date.today() - timedelta(days=days_ago), **params)
+        for days_ago, params in SAMPLE_TRAINING
+    ]
+    db.session.add_all(training_records)
+    apply_recorded_sessions(demo_user.id, training_records)
+    return len(users)
+
+def _write_versions():
+    for key, value in (('schema_version', SCHEMA_VERSION), ('seed_version', SEED_VERSION)):
+        db.session.merge(SchemaMeta(key=key, value=str(value)))
+
+def run_migrations():
+    """建表、补索引、种子数据并写入版本标记，每一步都可重复执行
+
+    返回 [(步骤名, 结果, 耗时秒), ...]。
+    """
+    steps = [
+        ('create_tables', lambda: db.create_all()),
+        ('create_indexes', ensure_indexes),
+        ('daily_stats', ensure_daily_stats),
+        ('leaderboards', ensure_leaderboards),
+        ('global_stats', ensure_global_stats),
+        ('drop_materialized_views', drop_materialized_views),
+        ('seed_achievements', seed_achievements),
+        ('seed_sample_users', seed_sample_users),
+        ('write_versions', _write_versions),
+    ]
+
+    timings = []
+    try:
+        for name, step in steps:
+            started = time.perf_counter()
+            result = step()
+            timings.append((name, result, time.perf_counter() - started))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return timings
@@ -0,0 +1,140 @@
+from datetime import datetime
+from src.models.user import TrainingRecord, UserDailyStats, db
+from sqlalchemy import func
+
+def apply_daily_records(user_id, records, from_scratch=False):
+    """把同一用户的一批新训练记录计入每日汇总，需在记录所在事务内调用
+
+    from_scratch为True时（用户尚无训练汇总，如未回填的历史用户）从原始记录重建该用户的每日汇总。
+    返回该用户在本批之前没有任何训练的日期集合（用于全站活跃用户数）。
+    """
+    if from_scratch:
+        db.session.flush()
+        day_counts = {}
+        for row in _replace_daily_rows(user_id):
+            day_counts[row['stat_date']] = day_counts.get(row['stat_date'], 0) + row['session_count']
+        batch_counts = {}
+        for record in records:
+            batch_counts[record.session_date] = batch_counts.get(record.session_date, 0) + 1
+        return {d for d, count in batch_counts.items() if day_counts.get(d, 0) == count}
+
+    buckets = {}
+    for record in records:
+        bucket = buckets.setdefault((record.session_date, record.difficulty), [0, 0, 0, 0])
+        bucket[0] += 1
+        bucket[1] += record.total_duration
+        bucket[2] += record.sets_completed
+        bucket[3] += record.reps_completed
+
+    # 一次主键范围查询取出涉及日期的已有行
+    dates = {session_date for session_date, _ in buckets}
+    existing = {
+        (row.stat_date, row.difficulty): row
+        for row in UserDailyStats.query.filter(
+            UserDailyStats.user_id == user_id,
+            UserDailyStats.stat_date.in_(list(dates))
+        ).all()
+    }
+    first_active_dates = dates - {stat_date for stat_date, _ in existing}
+
+    for (stat_date, difficulty), (count, duration, sets, reps) in buckets.items():
+        row = existing.get((stat_date, difficulty))
+        if row is None:
+            db.session.add(UserDailyStats(
+                user_id=user_id,
+                stat_date=stat_date,
+                difficulty=difficulty,
+                session_count=count,
+                total_duration=duration,
+                total_sets=sets,
+                total_reps=reps
+            ))
+            continue
+
+        # 使用SQL表达式自增，避免并发写入时丢失更新
+        row.session_count = UserDailyStats.session_count + count
+        row.total_duration = UserDailyStats.total_duration + duration
+        row.total_sets = UserDailyStats.total_sets + sets
+        row.total_reps = UserDailyStats.total_reps + reps
+        row.updated_at = datetime.utcnow()
+
+    db.session.flush()
+    return first_active_dates
+
+def _range_filter(query, user_id, start_date=None, end_date=None, difficulty=None):
+    query = query.filter(UserDailyStats.user_id == user_id)
+    if start_date:
+        query = query.filter(UserDailyStats.stat_date >= start_date)
+    if end_date:
+        query = query.filter(UserDailyStats.stat_date <= end_date)
+    if difficulty:
+        query = query.filter(UserDailyStats.difficulty == difficulty)
+    return query
+
+def load_daily_stats(user_id, start_date=None, end_date=None):
+    """按日期汇总各难度，返回行 (session_date, session_count, total_time, total_sets, total_reps)"""
+    query = db.session.query(
+        UserDailyStats.stat_date.label('session_date'),
+        func.sum(UserDailyStats.session_count).label('session_count'),
+        func.sum(UserDailyStats.total_duration).label('total_time'),
+        func.sum(UserDailyStats.total_sets).label('total_sets'),
+        func.sum(UserDailyStats.total_reps).label('total_reps')
+    )
+    return _range_filter(query, user_id, start_date, end_date)\
+        .group_by(UserDailyStats.stat_date).order_by(UserDailyStats.stat_date).all()
+
+def count_sessions(user_id, start_date=None, end_date=None, difficulty=None):
+    """日期范围（及难度）内的训练次数"""
+    query = _range_filter(db.session.query(func.sum(UserDailyStats.session_count)),
+                          user_id, start_date, end_date, difficulty)
+    return query.scalar() or 0
+
+def _replace_daily_rows(user_id=None):
+    """删除并从原始记录重新写入每日汇总（不提交），返回写入的行"""
+    existing = UserDailyStats.query
+    grouped = db.session.query(
+        TrainingRecord.user_id,
+        TrainingRecord.session_date,
+        TrainingRecord.difficulty,
+        func.count(TrainingRecord.id),
+        func.sum(TrainingRecord.total_duration),
+        func.sum(TrainingRecord.sets_completed),
+        func.sum(TrainingRecord.reps_completed)
+    )
+    if user_id is not None:
+        existing = existing.filter(UserDailyStats.user_id == user_id)
+        grouped = grouped.filter(TrainingRecord.user_id == user_id)
+    existing.delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'user_id': uid,
+            'stat_date': session_date,
+            'difficulty': difficulty,
+            'session_count': count,
+            'total_duration': duration or 0,
+            'total_sets': sets or 0,
+            'total_reps': reps or 0,
+            'updated_at': now
+        } for uid, session_date, difficulty, count, duration, sets, reps in grouped.group_by(
+            TrainingRecord.user_id, TrainingRecord.session_date, TrainingRecord.difficulty
+        ).yield_per(5000)
+    ]
+    if rows:
+        db.session.execute(UserDailyStats.__table__.insert(), rows)
+    return rows
+
+def rebuild_daily_stats(user_id=None):
+    """从原始训练记录重建每日汇总，user_id为空时重建全部用户，返回写入行数"""
+    count = len(_replace_daily_rows(user_id))
+    db.session.commit()
+    return count
+
+def ensure_daily_stats():
+    """每日汇总为空但已有训练记录时（新建表的旧数据库）从原始数据初始化，返回写入行数"""
+    if db.session.query(UserDailyStats.user_id).first() is not None:
+        return 0
+    if db.session.query(TrainingRecord.id).first() is None:
+        return 0
+    return rebuild_daily_stats()
@@ -0,0 +1,210 @@
+from datetime import date, datetime, timedelta
+from src.models.user import User, TrainingRecord, UserTrainingSummary, GlobalDailyStats, db
+from src.services.leaderboard import ALL_TIME_START, get_period_start
+from src.services.training_summary import compute_training_summary
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+
+# 时间序列接口单次最多返回的天数
+MAX_SERIES_DAYS = 366
+
+def _upsert_insert():
+    """PostgreSQL/SQLite的 INSERT ... ON CONFLICT 语句构造器，其他数据库返回None"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+def _increment(stat_date, sessions=0, duration=0, active_users=0, new_users=0):
+    values = {
+        'session_count': sessions,
+        'total_duration': duration,
+        'active_users': active_users,
+        'new_users': new_users,
+        'updated_at': datetime.utcnow()
+    }
+    insert = _upsert_insert()
+    if insert is None:
+        _increment_portable(stat_date, values)
+        return
+
+    # 单条 INSERT ... ON CONFLICT DO UPDATE：并发写入同一天（或全时段行）时不会主键冲突，也不会丢失更新
+    statement = insert(GlobalDailyStats).values(stat_date=stat_date, **values)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[GlobalDailyStats.stat_date],
+        set_={
+            'session_count': GlobalDailyStats.session_count + statement.excluded.session_count,
+            'total_duration': GlobalDailyStats.total_duration + statement.excluded.total_duration,
+            'active_users': GlobalDailyStats.active_users + statement.excluded.active_users,
+            'new_users': GlobalDailyStats.new_users + statement.excluded.new_users,
+            'updated_at': statement.excluded.updated_at
+        }
+    ))
+
+def _increment_portable(stat_date, values):
+    # 没有 ON CONFLICT 的数据库：先自增已有行，没有行时插入；并发插入主键冲突时回到自增
+    table = GlobalDailyStats.__table__
+    increment = table.update().where(table.c.stat_date == stat_date).values(
+        session_count=table.c.session_count + values['session_count'],
+        total_duration=table.c.total_duration + values['total_duration'],
+        active_users=table.c.active_users + values['active_users'],
+        new_users=table.c.new_users + values['new_users'],
+        updated_at=values['updated_at']
+    )
+    if db.session.execute(increment).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(stat_date=stat_date, **values))
+    except IntegrityError:
+        db.session.execute(increment)
+
+def apply_global_records(records, first_active_dates):
+    """把同一用户的一批新训练记录计入全站每日汇总，需在记录所在事务内调用
+
+    first_active_dates为该用户在本批之前没有训练的日期（由apply_daily_records返回），计入活跃用户数。
+    """
+    by_date = {}
+    for record in records:
+        bucket = by_date.setdefault(record.session_date, [0, 0])
+        bucket[0] += 1
+        bucket[1] += record.total_duration
+
+    # 按日期顺序加行锁，全时段热点行放在最后，持锁时间最短且各事务加锁顺序一致
+    for session_date, (count, duration) in sorted(by_date.items()):
+        _increment(session_date, count, duration, active_users=1 if session_date in first_active_dates else 0)
+    _increment(ALL_TIME_START, len(records), sum(bucket[1] for bucket in by_date.values()))
+
+def record_new_users(users):
+    """用户注册后计入当天新用户数与用户总数"""
+    by_date = {}
+    for user in users:
+        created_date = (user.created_at or datetime.utcnow()).date()
+        by_date[created_date] = by_date.get(created_date, 0) + 1
+
+    for created_date, count in sorted(by_date.items()):
+        _increment(created_date, new_users=count)
+    _increment(ALL_TIME_START, new_users=len(users))
+
+def record_deleted_user(user_id):
+    """删除用户前调用：从全时段累计中扣除该用户及其训练（历史每日数据由对账任务修正）"""
+    summary = db.session.get(UserTrainingSummary, user_id)
+    if summary is None:
+        # 尚未回填汇总的历史用户：从原始记录计算（不写入）
+        summary, _ = compute_training_summary(user_id)
+    _increment(
+        ALL_TIME_START,
+        sessions=-summary.total_sessions,
+        duration=-summary.total_duration,
+        new_users=-1
+    )
+
+def load_global_stats(today=None):
+    """一次按主键范围查询读取全时段累计、今天与本周数据"""
+    today = today or date.today()
+    # 本周起始与排行榜共用同一个周期计算
+    week_start = get_period_start('week', today)
+
+    rows = GlobalDailyStats.query.filter(or_(
+        GlobalDailyStats.stat_date == ALL_TIME_START,
+        GlobalDailyStats.stat_date.between(week_start, today)
+    )).all()
+    by_date = {row.stat_date: row for row in rows}
+
+    totals = by_date.get(ALL_TIME_START)
+    today_row = by_date.get(today)
+    return {
+        'total_users': totals.new_users if totals else 0,
+        'total_training_sessions': totals.session_count if totals else 0,
+        'total_duration_hours': round((totals.total_duration if totals else 0) / 3600, 1),
+        'today_active_users': today_row.active_users if today_row else 0,
+        'weekly_sessions': sum(row.session_count for d, row in by_date.items() if d != ALL_TIME_START)
+    }
+
+def load_global_series(start_date, end_date):
+    """返回 [start_date, end_date] 内每天的汇总，没有数据的日期补零"""
+    rows = GlobalDailyStats.query.filter(
+        GlobalDailyStats.stat_date.between(max(start_date, ALL_TIME_START + timedelta(days=1)), end_date)
+    ).all()
+    by_date = {row.stat_date: row for row in rows}
+
+    series = []
+    day = start_date
+    while day <= end_date:
+        row = by_date.get(day)
+        series.append(row.to_dict() if row else {
+            'date': day.isoformat(),
+            'session_count': 0,
+            'total_duration': 0,
+            'active_users': 0,
+            'new_users': 0
+        })
+        day += timedelta(days=1)
+    return series
+
+def _as_date(value):
+    # SQLite的DATE()返回字符串，PostgreSQL返回date
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+def reconcile_global_stats(start_date=None, end_date=None):
+    """从原始数据重算全站每日汇总（日期范围为空时重算全部）与全时段累计，返回写入的日期行数"""
+    sessions = db.session.query(
+        TrainingRecord.session_date,
+        func.count(TrainingRecord.id),
+        func.sum(TrainingRecord.total_duration),
+        func.count(func.distinct(TrainingRecord.user_id))
+    )
+    created_date = func.date(User.created_at)
+    signups = db.session.query(created_date, func.count(User.id))
+    existing = GlobalDailyStats.query.filter(GlobalDailyStats.stat_date != ALL_TIME_START)
+
+    if start_date:
+        sessions = sessions.filter(TrainingRecord.session_date >= start_date)
+        signups = signups.filter(User.created_at >= datetime.combine(start_date, datetime.min.time()))
+        existing = existing.filter(GlobalDailyStats.stat_date >= start_date)
+    if end_date:
+        sessions = sessions.filter(TrainingRecord.session_date <= end_date)
+        signups = signups.filter(User.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        existing = existing.filter(GlobalDailyStats.stat_date <= end_date)
+
+    days = {}
+    for session_date, count, duration, active_users in sessions.group_by(TrainingRecord.session_date):
+        days[session_date] = {'session_count': count, 'total_duration': duration or 0,
+                              'active_users': active_users, 'new_users': 0}
+    for value, count in signups.group_by(created_date):
+        if value is None:
+            continue
+        day = days.setdefault(_as_date(value), {'session_count': 0, 'total_duration': 0,
+                                                'active_users': 0, 'new_users': 0})
+        day['new_users'] = count
+
+    existing.delete(synchronize_session=False)
+    GlobalDailyStats.query.filter(GlobalDailyStats.stat_date == ALL_TIME_START).delete(synchronize_session=False)
+
+    total_sessions, total_duration = db.session.query(
+        func.count(TrainingRecord.id), func.sum(TrainingRecord.total_duration)
+    ).one()
+    now = datetime.utcnow()
+    rows = [dict(values, stat_date=stat_date, updated_at=now) for stat_date, values in days.items()]
+    rows.append({
+        'stat_date': ALL_TIME_START,
+        'session_count': total_sessions,
+        'total_duration': total_duration or 0,
+        'active_users': 0,
+        'new_users': db.session.query(func.count(User.id)).scalar(),
+        'updated_at': now
+    })
+    db.session.execute(GlobalDailyStats.__table__.insert(), rows)
+    db.session.commit()
+
+    return len(days)
+
+def ensure_global_stats():
+    """全时段累计行不存在时（新建表或旧数据库）从原始数据初始化，返回写入的日期行数"""
+    if db.session.get(GlobalDailyStats, ALL_TIME_START) is not None:
+        return 0
+    return reconcile_global_stats()
@@ -0,0 +1,90 @@
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func, select, text
+from src.models.user import User, TrainingRecord, Achievement, db
+from src.services.training_jobs import get_queue_stats
+
+# 健康检查统计的刷新间隔（秒），期间直接返回缓存值
+STATS_REFRESH_SECONDS = 300
+
+STATS_TABLES = {
+    'total_users': User.__table__,
+    'total_training_records': TrainingRecord.__table__,
+    'total_achievements': Achievement.__table__,
+}
+
+_stats_lock = threading.Lock()
+_stats = {'values': None, 'training_jobs': None, 'estimated': False, 'refreshed_at': None, 'loaded_at': 0}
+
+def _postgres_estimates():
+    """一次查询读取pg_class.reltuples估算行数，不扫描任何数据表
+
+    从未ANALYZE过的表reltuples为-1（PostgreSQL 14+）或0，此时回退为精确计数。
+    """
+    names = {table.name: key for key, table in STATS_TABLES.items()}
+    rows = db.session.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relname = ANY(:names)"),
+        {'names': list(names)}
+    ).all()
+    values = {names[relname]: int(reltuples) for relname, reltuples in rows if reltuples > 0}
+    for key, table in STATS_TABLES.items():
+        if key not in values:
+            values[key] = db.session.execute(select(func.count()).select_from(table)).scalar()
+    return values
+
+def _exact_counts():
+    return {
+        key: db.session.execute(select(func.count()).select_from(table)).scalar()
+        for key, table in STATS_TABLES.items()
+    }
+
+def refresh_health_stats():
+    """重新计算统计：PostgreSQL用估算值，其他数据库用精确计数；训练任务队列计数一并缓存"""
+    estimated = db.engine.dialect.name == 'postgresql'
+    values = _postgres_estimates() if estimated else _exact_counts()
+    _stats.update(
+        values=values,
+        training_jobs=get_queue_stats(),
+        estimated=estimated,
+        refreshed_at=datetime.utcnow().isoformat(),
+        loaded_at=time.monotonic()
+    )
+    return values
+
+def _refresh_if_stale():
+    # 过期时由一个请求刷新，其他并发请求继续返回旧值
+    if _stats['values'] is None or time.monotonic() - _stats['loaded_at'] >= STATS_REFRESH_SECONDS:
+        if _stats_lock.acquire(blocking=_stats['values'] is None):
+            try:
+                refresh_health_stats()
+            finally:
+                _stats_lock.release()
+
+def get_health_stats():
+    """返回缓存的统计"""
+    _refresh_if_stale()
+    return {
+        **_stats['values'],
+        'estimated': _stats['estimated'],
+        'refreshed_at': _stats['refreshed_at']
+    }
+
+def get_cached_queue_stats():
+    """返回与统计一起缓存的训练任务队列计数（就绪检查不直接对任务表计数）"""
+    _refresh_if_stale()
+    return dict(_stats['training_jobs'])
+
+def invalidate_health_stats():
+    _stats['values'] = None
+
+def check_database():
+    """从连接池取一个连接执行 SELECT 1，返回连接池状态"""
+    with db.engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+    pool = db.engine.pool
+    status = {'pool': type(pool).__name__}
+    for name in ('size', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    return status
@@ -0,0 +1,150 @@
+from datetime import date, datetime, timedelta
+from src.models.user import User, TrainingRecord, LeaderboardScore, db
+from sqlalchemy import func
+
+PERIODS = ('week', 'month', 'all_time')
+
+# 全时段汇总使用的固定周期日期
+ALL_TIME_START = date(1970, 1, 1)
+
+def get_period_start(period, day=None):
+    """返回日期所在周期的起始日期"""
+    day = day or date.today()
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return ALL_TIME_START
+
+def apply_leaderboard_records(user_id, records, from_scratch=False):
+    """把同一用户的一批新训练记录计入各周期排行榜汇总，需在记录所在事务内调用
+
+    from_scratch为True时（用户尚无训练汇总，如未回填的历史用户）从原始记录重建该用户的各周期汇总。
+    """
+    if from_scratch:
+        db.session.flush()
+        _replace_leaderboard_rows(user_id=user_id)
+        return
+
+    buckets = {}
+    for record in records:
+        for period in PERIODS:
+            key = (period, get_period_start(period, record.session_date))
+            bucket = buckets.setdefault(key, [0, 0, 0, 0])
+            bucket[0] += 1
+            bucket[1] += record.total_duration
+            bucket[2] += record.sets_completed
+            bucket[3] += record.reps_completed
+
+    # 一次查询取出涉及周期的已有行
+    existing = {
+        (score.period_type, score.period_start): score
+        for score in LeaderboardScore.query.filter(
+            LeaderboardScore.period_type.in_({period for period, _ in buckets}),
+            LeaderboardScore.period_start.in_({period_start for _, period_start in buckets}),
+            LeaderboardScore.user_id == user_id
+        ).all()
+    }
+
+    for (period, period_start), (count, duration, sets, reps) in buckets.items():
+        score = existing.get((period, period_start))
+        if score is None:
+            db.session.add(LeaderboardScore(
+                period_type=period,
+                period_start=period_start,
+                user_id=user_id,
+                session_count=count,
+                total_duration=duration,
+                total_sets=sets,
+                total_reps=reps
+            ))
+            continue
+
+        # 使用SQL表达式自增，避免并发写入时丢失更新
+        score.session_count = LeaderboardScore.session_count + count
+        score.total_duration = LeaderboardScore.total_duration + duration
+        score.total_sets = LeaderboardScore.total_sets + sets
+        score.total_reps = LeaderboardScore.total_reps + reps
+        score.updated_at = datetime.utcnow()
+
+    db.session.flush()
+
+def get_leaderboard(period, limit=10, day=None):
+    """读取排行榜前N名，只访问汇总表与用户表"""
+    if period not in PERIODS:
+        period = 'all_time'
+    period_start = get_period_start(period, day)
+
+    return db.session.query(
+        User.id,
+        User.username,
+        User.nickname,
+        User.avatar_url,
+        LeaderboardScore.session_count,
+        LeaderboardScore.total_duration.label('total_time'),
+        LeaderboardScore.total_sets,
+        LeaderboardScore.total_reps
+    ).join(User, User.id == LeaderboardScore.user_id).filter(
+        LeaderboardScore.period_type == period,
+        LeaderboardScore.period_start == period_start
+    ).order_by(LeaderboardScore.session_count.desc(), LeaderboardScore.user_id)\
+        .limit(limit).all()
+
+def _replace_leaderboard_rows(periods=PERIODS, user_id=None):
+    """删除并从原始训练记录重新写入排行榜汇总（不提交），返回写入行数"""
+    existing = LeaderboardScore.query.filter(LeaderboardScore.period_type.in_(periods))
+    # 先按 (用户, 日期) 聚合，再在Python中归入各周期
+    daily_rows = db.session.query(
+        TrainingRecord.user_id,
+        TrainingRecord.session_date,
+        func.count(TrainingRecord.id),
+        func.sum(TrainingRecord.total_duration),
+        func.sum(TrainingRecord.sets_completed),
+        func.sum(TrainingRecord.reps_completed)
+    )
+    if user_id is not None:
+        existing = existing.filter(LeaderboardScore.user_id == user_id)
+        daily_rows = daily_rows.filter(TrainingRecord.user_id == user_id)
+    existing.delete(synchronize_session=False)
+
+    buckets = {}
+    for uid, session_date, count, duration, sets, reps in daily_rows.group_by(
+        TrainingRecord.user_id, TrainingRecord.session_date
+    ).yield_per(5000):
+        for p in periods:
+            key = (p, get_period_start(p, session_date), uid)
+            bucket = buckets.setdefault(key, [0, 0, 0, 0])
+            bucket[0] += count
+            bucket[1] += duration or 0
+            bucket[2] += sets or 0
+            bucket[3] += reps or 0
+
+    rows = [
+        {
+            'period_type': p,
+            'period_start': period_start,
+            'user_id': uid,
+            'session_count': count,
+            'total_duration': duration,
+            'total_sets': sets,
+            'total_reps': reps,
+            'updated_at': datetime.utcnow()
+        } for (p, period_start, uid), (count, duration, sets, reps) in buckets.items()
+    ]
+    if rows:
+        db.session.execute(LeaderboardScore.__table__.insert(), rows)
+    return len(rows)
+
+def rebuild_leaderboards(period=None):
+    """从原始训练记录重建排行榜汇总，period为空时重建全部周期，返回写入行数"""
+    count = _replace_leaderboard_rows([period] if period else list(PERIODS))
+    db.session.commit()
+    return count
+
+def ensure_leaderboards():
+    """排行榜汇总为空但已有训练记录时（新建表的旧数据库）从原始数据初始化，返回写入行数"""
+    if db.session.query(LeaderboardScore.user_id).first() is not None:
+        return 0
+    if db.session.query(TrainingRecord.id).first() is None:
+        return 0
+    return rebuild_leaderboards()
@@ -0,0 +1,124 @@
+import hmac
+import os
+import time
+from flask import Response, abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+from src.models.user import db
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+    from prometheus_client import multiprocess
+except ImportError:  # prometheus_client为可选依赖，缺失时只输出Server-Timing响应头
+    Histogram = None
+
+# 延迟类直方图的分桶（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 25, 50, 100)
+
+if Histogram is not None:
+    # 多进程（gunicorn）下设置 PROMETHEUS_MULTIPROC_DIR，各worker写入共享目录，/metrics汇总所有进程
+    REQUEST_LATENCY = Histogram(
+        'peed_request_duration_seconds', '请求处理总耗时', ('endpoint', 'method', 'status'),
+        buckets=LATENCY_BUCKETS
+    )
+    REQUEST_QUERIES = Histogram(
+        'peed_request_db_queries', '每个请求执行的SQL语句数', ('endpoint', 'method'),
+        buckets=QUERY_COUNT_BUCKETS
+    )
+    REQUEST_DB_TIME = Histogram(
+        'peed_request_db_duration_seconds', '每个请求在数据库中的耗时', ('endpoint', 'method'),
+        buckets=LATENCY_BUCKETS
+    )
+    REQUEST_SERIALIZATION_TIME = Histogram(
+        'peed_request_serialization_duration_seconds', '每个请求JSON序列化的耗时', ('endpoint', 'method'),
+        buckets=LATENCY_BUCKETS
+    )
+
+class RequestMetrics:
+    """单个请求的计量：SQL语句数、数据库耗时、序列化耗时"""
+    __slots__ = ('started', 'queries', 'db_seconds', 'serialization_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+
+def _current():
+    if has_request_context():
+        return g.get('request_metrics')
+    return None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 后台线程（训练任务worker等）没有请求上下文，不计入
+    metrics = _current()
+    if metrics is not None:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - conn.info.pop('query_started', time.perf_counter())
+
+def record_serialization(seconds):
+    """由JSON provider调用，累加本请求的序列化耗时"""
+    metrics = _current()
+    if metrics is not None:
+        metrics.serialization_seconds += seconds
+
+def _server_timing(metrics, total):
+    return (f'db;dur={metrics.db_seconds * 1000:.2f};desc="{metrics.queries} queries", '
+            f'serialize;dur={metrics.serialization_seconds * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}')
+
+def _start_request():
+    g.request_metrics = RequestMetrics()
+
+def _finish_request(response):
+    metrics = g.pop('request_metrics', None)
+    if metrics is None:
+        return response
+    total = time.perf_counter() - metrics.started
+    # 流式响应（如训练记录导出）在返回后才执行的查询不计入
+    response.headers['Server-Timing'] = _server_timing(metrics, total)
+
+    if Histogram is not None:
+        endpoint = request.endpoint or 'unmatched'
+        method = request.method
+        REQUEST_LATENCY.labels(endpoint, method, str(response.status_code)).observe(total)
+        REQUEST_QUERIES.labels(endpoint, method).observe(metrics.queries)
+        REQUEST_DB_TIME.labels(endpoint, method).observe(metrics.db_seconds)
+        REQUEST_SERIALIZATION_TIME.labels(endpoint, method).observe(metrics.serialization_seconds)
+    return response
+
+def render_metrics():
+    """Prometheus文本格式（需 Authorization: Bearer <METRICS_TOKEN>）；多进程模式下汇总共享目录中所有worker的数据"""
+    expected = f"Bearer {current_app.config['METRICS_TOKEN']}"
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+        abort(401)
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+def init_metrics(app):
+    """注册SQL计量（引擎事件）、请求钩子（Server-Timing响应头）与 /metrics 接口
+
+    /metrics 只在配置了METRICS_TOKEN时注册，抓取方需携带该令牌。
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    # 主库与只读副本的引擎都计入
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    if Histogram is not None and app.config.get('METRICS_TOKEN'):
+        app.add_url_rule('/metrics', 'metrics', render_metrics)
@@ -0,0 +1,76 @@
+import threading
+from collections import Counter
+from contextlib import ContextDecorator
+from sqlalchemy import event
+from src.models.user import db
+
+# 同一SELECT以不同参数执行达到该次数即视为N+1（按行懒加载、循环内查询）；
+# 写入按行各一条UPDATE属于正常的批量刷新，不计入
+N_PLUS_ONE_THRESHOLD = 3
+
+class QueryBudgetExceeded(AssertionError):
+    """超出查询预算或检测到N+1"""
+
+class QueryBudget(ContextDecorator):
+    """记录代码块（或被装饰函数）在当前线程执行的SQL语句，退出时检查预算
+
+        with QueryBudget(6):
+            client.get(f'/api/profile/{user_id}')
+
+    max_queries为None时只检查N+1；detect_n_plus_one=False时只检查总数。
+    代码块抛出异常时不再检查，直接传播原异常。
+    """
+
+    def __init__(self, max_queries=None, detect_n_plus_one=True, threshold=N_PLUS_ONE_THRESHOLD, engine=None):
+        self.max_queries = max_queries
+        self.detect_n_plus_one = detect_n_plus_one
+        self.threshold = threshold
+        self.engine = engine
+        self.statements = []
+        self._thread = None
+        self._engines = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        # 后台线程（训练任务worker等）的查询不计入
+        if threading.get_ident() == self._thread:
+            self.statements.append((statement, repr(parameters)))
+
+    def __enter__(self):
+        self.statements = []
+        self._thread = threading.get_ident()
+        # 默认包括只读副本等所有引擎
+        self._engines = [self.engine] if self.engine is not None else list(db.engines.values())
+        for engine in self._engines:
+            event.listen(engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._record)
+        if exc_type is None:
+            self.check()
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated_statements(self):
+        """返回 [(SELECT语句, 不同参数的执行次数)]，只包含达到N+1阈值的语句"""
+        distinct = Counter(
+            statement for statement, _ in set(self.statements) if statement.lstrip()[:6].upper() == 'SELECT'
+        )
+        return [(statement, times) for statement, times in distinct.most_common() if times >= self.threshold]
+
+    def check(self):
+        problems = []
+        if self.max_queries is not None and self.count > self.max_queries:
+            problems.append(f'{self.count} queries executed, budget is {self.max_queries}')
+        if self.detect_n_plus_one:
+            problems.extend(
+                f'N+1: statement executed {times} times with different parameters: {statement}'
+                for statement, times in self.repeated_statements()
+            )
+        if problems:
+            executed = '\n'.join(f'  {statement}' for statement, _ in self.statements)
+            raise QueryBudgetExceeded('\n'.join(problems) + f'\nStatements:\n{executed}')
@@ -0,0 +1,185 @@
+import functools
+import os
+import random
+import threading
+import time
+from flask import current_app, request
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from src.models.routing import REPLICA_INFO_KEY
+from src.models.user import db
+
+# 副本健康检查间隔（秒），期间使用上次的结果
+REPLICA_CHECK_INTERVAL = 5
+# 复制延迟超过该值（秒）的副本不再接收读请求
+REPLICA_MAX_LAG_SECONDS = 5
+# 写请求之后该客户端的读请求留在主库的时长（秒），覆盖最大延迟与检查间隔
+REPLICA_STICKY_COOKIE = 'peed_primary_until'
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+_checker_lock = threading.Lock()
+
+# PostgreSQL流复制副本的延迟；已回放全部WAL时为0（主库长时间无写入时replay时间戳会变旧）
+POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+def replica_binds(urls, engine_options=None):
+    """把副本URL列表转换为 SQLALCHEMY_BINDS 条目（replica_1, replica_2, ...）"""
+    return {
+        f'{REPLICA_BIND_PREFIX}{index}': {'url': url, **(engine_options or {})}
+        for index, url in enumerate(urls, 1)
+    }
+
+def measure_lag(connection):
+    """返回副本的复制延迟（秒）；非PostgreSQL副本视为无延迟"""
+    if connection.dialect.name == 'postgresql':
+        return float(connection.execute(POSTGRES_LAG_SQL).scalar() or 0)
+    connection.execute(text('SELECT 1'))
+    return 0.0
+
+class ReplicaRouter:
+    """按健康状况与复制延迟选择只读副本，每个应用实例一个
+
+    检查由每个服务进程的后台线程按间隔进行，请求线程只读取上次的结果，不会等待副本连接；
+    尚未检查、不可用或延迟过大的副本被跳过，全部不可用时读请求回到主库。
+    """
+
+    def __init__(self, engines, max_lag=REPLICA_MAX_LAG_SECONDS, check_interval=REPLICA_CHECK_INTERVAL):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._state = {name: {'healthy': False, 'lag': None, 'error': None} for name in engines}
+        self._checked_at = 0
+        self._check_lock = threading.Lock()
+        self.pid = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _check(self):
+        for name, engine in self.engines.items():
+            try:
+                with engine.connect() as connection:
+                    lag = measure_lag(connection)
+                self._state[name] = {'healthy': lag <= self.max_lag, 'lag': round(lag, 3), 'error': None}
+            except Exception as e:  # 副本不可达时回退到主库，不影响请求
+                self._state[name] = {'healthy': False, 'lag': None, 'error': str(e).splitlines()[0]}
+        self._checked_at = time.monotonic()
+
+    def refresh(self, force=False):
+        if not force and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        if self._check_lock.acquire(blocking=force):
+            try:
+                self._check()
+            finally:
+                self._check_lock.release()
+
+    def start(self):
+        self.pid = os.getpid()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='replica-checks', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        # 启动后立即检查一次，之后按间隔检查
+        while True:
+            self.refresh(force=True)
+            if self._stopped.wait(self.check_interval):
+                return
+
+    def choose(self):
+        """返回一个可用副本的引擎，没有时返回None（只读取上次检查的结果）"""
+        healthy = [name for name, state in self._state.items() if state['healthy']]
+        return self.engines[random.choice(healthy)] if healthy else None
+
+    def mark_failed(self, engine, error):
+        for name, candidate in self.engines.items():
+            if candidate is engine:
+                self._state[name] = {'healthy': False, 'lag': None, 'error': str(error).splitlines()[0]}
+
+    def stats(self):
+        return {name: dict(state) for name, state in self._state.items()}
+
+def get_replica_router():
+    return current_app.extensions.get('replica_router')
+
+def get_replica_stats():
+    router = get_replica_router()
+    return router.stats() if router is not None else {}
+
+def _primary_requested():
+    # 客户端最近写入过：读自己的写入
+    try:
+        return float(request.cookies.get(REPLICA_STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def replica_reads(view):
+    """只读接口：查询发往可用的只读副本
+
+    没有配置副本、客户端刚写入过或副本都不可用时使用主库；副本在请求中途失败时
+    标记为不可用并在主库上重新执行（只读接口可以安全重试）。
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        router = get_replica_router()
+        engine = router.choose() if router is not None and not _primary_requested() else None
+        if engine is None:
+            return view(*args, **kwargs)
+
+        db.session.info[REPLICA_INFO_KEY] = engine
+        try:
+            return view(*args, **kwargs)
+        except OperationalError as e:
+            if db.session.info.get(REPLICA_INFO_KEY) is not engine:
+                raise  # 已切换到主库后的错误
+            router.mark_failed(engine, e)
+            db.session.rollback()
+            db.session.info.pop(REPLICA_INFO_KEY, None)
+            return view(*args, **kwargs)
+        finally:
+            db.session.info.pop(REPLICA_INFO_KEY, None)
+    return wrapper
+
+def _mark_primary_reads(response):
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        router = get_replica_router()
+        sticky = int(router.max_lag + router.check_interval) + 1
+        response.set_cookie(REPLICA_STICKY_COOKIE, str(int(time.time()) + sticky), max_age=sticky,
+                            httponly=True, samesite='Lax')
+    return response
+
+def init_replicas(app):
+    """根据 SQLALCHEMY_BINDS 中的 replica_* 引擎创建路由器；没有副本时不做任何事"""
+    with app.app_context():
+        engines = {key: engine for key, engine in db.engines.items()
+                   if key is not None and key.startswith(REPLICA_BIND_PREFIX)}
+    if not engines:
+        return None
+
+    router = ReplicaRouter(
+        engines,
+        max_lag=app.config.get('REPLICA_MAX_LAG_SECONDS', REPLICA_MAX_LAG_SECONDS),
+        check_interval=app.config.get('REPLICA_CHECK_INTERVAL', REPLICA_CHECK_INTERVAL)
+    )
+    app.extensions['replica_router'] = router
+    app.after_request(_mark_primary_reads)
+
+    @app.before_request
+    def start_replica_checks():
+        # 每个服务进程处理第一个请求时启动检查线程（gunicorn master不启动）
+        if router.pid == os.getpid():
+            return
+        with _checker_lock:
+            if router.pid != os.getpid():
+                router.start()
+    return router
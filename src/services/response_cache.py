@@ -0,0 +1,122 @@
+import functools
+import hashlib
+import threading
+import time
+from flask import Response, current_app, make_response, request
+
+# 单个应用实例最多缓存的响应数（不同查询参数各占一条）
+MAX_CACHE_ENTRIES = 256
+
+class ResponseCache:
+    """进程内公共响应缓存：按 (命名空间, 查询参数) 保存响应体与ETag
+
+    每个gunicorn worker各有一份，写入只失效本进程的条目，
+    其他进程最多在TTL内返回旧数据，因此数据类接口的TTL保持较短。
+    """
+
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, namespace, field):
+        counters = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0})
+        counters[field] += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count(key[0], 'misses')
+                return None
+            if entry['expires_at'] <= time.monotonic():
+                del self._entries[key]
+                self._count(key[0], 'misses')
+                return None
+            self._count(key[0], 'hits')
+            return entry
+
+    def set(self, key, body, mimetype, etag, ttl):
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                # 淘汰最早写入的条目（dict保持插入顺序）
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = {
+                'body': body,
+                'mimetype': mimetype,
+                'etag': etag,
+                'expires_at': time.monotonic() + ttl
+            }
+
+    def invalidate(self, *namespaces):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in namespaces]:
+                del self._entries[key]
+            for namespace in namespaces:
+                self._count(namespace, 'invalidations')
+
+    def record_not_modified(self, namespace):
+        with self._lock:
+            self._count(namespace, 'not_modified')
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for namespace, counters in self._stats.items():
+                lookups = counters['hits'] + counters['misses']
+                result[namespace] = dict(counters, hit_ratio=round(counters['hits'] / lookups, 3) if lookups else None)
+            return {'entries': len(self._entries), 'namespaces': result}
+
+def get_response_cache():
+    """返回当前应用的响应缓存（每个应用实例一个）"""
+    app = current_app._get_current_object()
+    cache = app.extensions.get('response_cache')
+    if cache is None:
+        cache = ResponseCache(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', MAX_CACHE_ENTRIES))
+        app.extensions['response_cache'] = cache
+    return cache
+
+def invalidate_cached_responses(*namespaces):
+    """数据变更并提交后调用，清除相关命名空间的缓存响应"""
+    get_response_cache().invalidate(*namespaces)
+
+def get_cache_stats():
+    return get_response_cache().stats()
+
+def _cache_control(ttl):
+    # 浏览器与CDN都可缓存；过期后允许CDN在后台重新验证期间继续返回旧响应
+    return f'public, max-age={ttl}, s-maxage={ttl}, stale-while-revalidate={ttl}'
+
+def cached_response(namespace, ttl):
+    """缓存所有用户共享的GET接口响应（仅缓存200），附带ETag与Cache-Control并处理304"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('RESPONSE_CACHE_ENABLED', True):
+                return view(*args, **kwargs)
+
+            cache = get_response_cache()
+            key = (namespace, tuple(sorted(request.args.items(multi=True))))
+            entry = cache.get(key)
+            if entry is not None:
+                response = Response(entry['body'], mimetype=entry['mimetype'])
+                response.set_etag(entry['etag'])
+                response.headers['X-Cache'] = 'HIT'
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha256(body).hexdigest()[:32]
+                cache.set(key, body, response.mimetype, etag, ttl)
+                response.set_etag(etag)
+                response.headers['X-Cache'] = 'MISS'
+
+            response.headers['Cache-Control'] = _cache_control(ttl)
+            response = response.make_conditional(request)
+            if response.status_code == 304:
+                cache.record_not_modified(namespace)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+import codecs
+import dataclasses
+import functools
+import json
+import math
+import re
+import time
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+from src.services.metrics import record_serialization
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时使用标准库json
+    orjson = None
+
+# 列表接口按列查询时读取的字段，与对应模型 to_dict() 的键一致
+TRAINING_RECORD_COLUMNS = (
+    'id', 'user_id', 'difficulty', 'sets_completed', 'reps_completed', 'total_duration',
+    'session_date', 'created_at', 'contract_time', 'relax_time'
+)
+USER_COLUMNS = (
+    'id', 'username', 'email', 'nickname', 'bio', 'avatar_url', 'created_at', 'updated_at', 'last_login'
+)
+ACHIEVEMENT_COLUMNS = (
+    'id', 'name', 'name_en', 'description', 'description_en', 'icon', 'category', 'target_value', 'created_at'
+)
+
+def project(model, fields):
+    """返回模型的列对象列表，用于 db.session.query(*columns) 只查询需要的列"""
+    return [getattr(model, field) for field in fields]
+
+def rows_to_dicts(rows):
+    """把按列查询的结果行转换为与 to_dict() 相同的字典（日期时间转为isoformat）"""
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    return [
+        {field: value.isoformat() if isinstance(value, date) else value for field, value in zip(fields, row)}
+        for row in rows
+    ]
+
+if orjson is not None:
+    # 日期时间交给Flask的default处理（HTTP日期格式），与jsonify保持一致
+    ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+# orjson与Python的浮点数格式在 |x|<1e-4 或 |x|>=1e16 时不同（0.00001、1e16 与 1e-05、1e+16）
+_EXPONENT_FLOAT = re.compile(rb'e-?[0-9]+[,\]}]')
+_SMALL_FLOAT = re.compile(rb'0\.0000[0-9]*[,\]}]')
+_NUMBER_BYTES = b'0123456789.-'
+
+def _has_float_format_mismatch(data):
+    """是否含有两者格式不同的浮点数；字符串内容的误判只会回退到标准库"""
+    for pattern in (_EXPONENT_FLOAT, _SMALL_FLOAT):
+        for match in pattern.finditer(data):
+            start = match.start()
+            while start > 0 and data[start - 1] in _NUMBER_BYTES:
+                start -= 1
+            if start == 0 or data[start - 1] in b':,[':
+                return True
+    return False
+
+def _has_non_finite(obj):
+    """是否含有NaN/Infinity（标准库输出NaN/Infinity，orjson输出null）"""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(value) for value in obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return _has_non_finite(dataclasses.asdict(obj))
+    return False
+
+@functools.lru_cache(maxsize=4096)
+def _escape_run(run):
+    return json.dumps(run)[1:-1]
+
+def _ensure_ascii_errors(error):
+    # 编码错误处理函数，按ensure_ascii的格式转义连续的非ASCII字符
+    return _escape_run(error.object[error.start:error.end]), error.end
+
+codecs.register_error('json_ensure_ascii', _ensure_ascii_errors)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify的紧凑输出改用orjson编码，字节与标准库输出一致
+
+    只替换 response()（紧凑分隔符、sort_keys、ensure_ascii）；调试模式缩进输出、
+    orjson不支持的数据（非字符串键、超过64位的整数等）、格式不同的浮点数与NaN/Infinity回退到标准库。
+    """
+
+    def _fast_enabled(self):
+        if orjson is None or not (self.sort_keys and self.ensure_ascii):
+            return False
+        return not ((self.compact is None and self._app.debug) or self.compact is False)
+
+    def _dumps_fast(self, obj):
+        """返回紧凑JSON字节，无法保证与标准库一致时返回None"""
+        try:
+            data = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS)
+        except TypeError:  # orjson.JSONEncodeError
+            return None
+        if _has_float_format_mismatch(data):
+            return None
+        # orjson把NaN/Infinity编码为null；只有输出含null时才遍历检查
+        if b'null' in data and _has_non_finite(obj):
+            return None
+        if not data.isascii():
+            data = data.decode('utf-8').encode('ascii', 'json_ensure_ascii')
+        if b'\x7f' in data:
+            # DEL只会出现在字符串内
+            data = data.replace(b'\x7f', b'\\u007f')
+        return data
+
+    def response(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            if self._fast_enabled():
+                data = self._dumps_fast(self._prepare_response_obj(args, kwargs))
+                if data is not None:
+                    return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+            return super().response(*args, **kwargs)
+        finally:
+            record_serialization(time.perf_counter() - started)
@@ -0,0 +1,123 @@
+import os
+import re
+import threading
+import time
+from sqlalchemy import event
+
+try:
+    import fcntl
+except ImportError:  # Windows没有flock，写者锁只在进程内生效
+    fcntl = None
+
+# 调优后的连接参数，每个新连接建立时执行
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),  # 读写互不阻塞，提交只追加WAL
+    ('synchronous', 'NORMAL'),  # WAL下只在checkpoint时fsync，掉电最多丢失最后的提交，不会损坏
+    ('mmap_size', 256 * 1024 * 1024),
+    ('cache_size', -16000),  # 每个连接约16MB页缓存（负数单位为KB）
+    ('temp_store', 'MEMORY'),
+)
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_POOL_SIZE = 8
+
+# 等待其他进程释放文件锁时的轮询间隔（秒）
+LOCK_POLL_INTERVAL = 0.002
+
+_WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+def sqlite_engine_options(busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS, pool_size=DEFAULT_POOL_SIZE):
+    """文件SQLite数据库的引擎参数：线程间共享的连接池，每个读线程一个连接"""
+    return {
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+        'pool_size': pool_size,
+        'max_overflow': pool_size,
+        'connect_args': {'timeout': busy_timeout_ms / 1000, 'check_same_thread': False},
+    }
+
+class SQLiteWriterLock:
+    """单写者：写事务从第一条写语句持有到提交/回滚
+
+    SQLite同一时刻只允许一个写事务。同一进程的线程先在线程锁上排队，再对数据库旁的
+    锁文件加 flock，使多个进程（gunicorn worker）的写者同样排队，而不是各自在
+    busy_timeout内轮询数据库文件锁。没有lock_path（内存数据库）或没有fcntl时只在进程内生效。
+    读连接不受影响（WAL下读不阻塞写）。等待超过busy_timeout时不再等待，交给SQLite处理。
+    """
+
+    def __init__(self, timeout, lock_path=None):
+        self.timeout = timeout
+        self.lock_path = lock_path if fcntl is not None else None
+        self._lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+
+    def _lock_file(self):
+        # fork后的子进程重新打开：继承的描述符与父进程共享同一个flock
+        if self._pid != os.getpid():
+            self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _acquire_file(self, deadline):
+        fd = self._lock_file()
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(LOCK_POLL_INTERVAL)
+
+    def acquire(self, info):
+        if info.get('sqlite_writer'):
+            return
+        deadline = time.monotonic() + self.timeout
+        if not self._lock.acquire(timeout=self.timeout):
+            return
+        if self.lock_path is not None and not self._acquire_file(deadline):
+            self._lock.release()
+            return
+        info['sqlite_writer'] = True
+
+    def release(self, info):
+        if info.pop('sqlite_writer', False):
+            if self.lock_path is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._lock.release()
+
+def configure_sqlite_engine(engine, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS):
+    """为文件SQLite引擎注册连接钩子（PRAGMA）与单写者锁（锁文件为数据库路径加 .lock），返回写者锁"""
+    database = engine.url.database
+    lock_path = f'{database}.lock' if database and database != ':memory:' else None
+    writer = SQLiteWriterLock(busy_timeout_ms / 1000, lock_path)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout_ms)}')
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def acquire_writer(conn, cursor, statement, parameters, context, executemany):
+        # pysqlite在第一条写语句前隐式BEGIN，锁与写事务同时开始
+        if _WRITE_STATEMENT.match(statement):
+            writer.acquire(conn.info)
+
+    @event.listens_for(engine, 'commit')
+    def release_after_commit(conn):
+        writer.release(conn.info)
+
+    @event.listens_for(engine, 'rollback')
+    def release_after_rollback(conn):
+        writer.release(conn.info)
+
+    @event.listens_for(engine.pool, 'reset')
+    def release_on_reset(dbapi_connection, connection_record, reset_state):
+        # 连接未经提交/回滚直接归还连接池时
+        writer.release(connection_record.info)
+
+    return writer
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+# 与原有连续天数算法一致：相邻两个训练日最多间隔2天（允许中间休息一天）仍算连续
+STREAK_MAX_GAP = timedelta(days=2)
+
+def compute_streaks(training_dates):
+    """根据训练日期计算 (当前连续段长度, 最长连续天数, 最后训练日期)
+
+    当前连续段长度未做过期处理，读取时使用 effective_streak。
+    """
+    current = 0
+    longest = 0
+    last_date = None
+
+    for training_date in sorted(set(training_dates)):
+        if last_date is not None and training_date - last_date <= STREAK_MAX_GAP:
+            current += 1
+        else:
+            current = 1
+        longest = max(longest, current)
+        last_date = training_date
+
+    return current, longest, last_date
+
+def advance_streak(summary, session_date):
+    """把一个训练日期计入汇总的连续天数，常数时间
+
+    返回False表示日期早于最后训练日期（离线补录），需要调用方全量重算。
+    """
+    last_date = summary.last_session_date
+    if last_date is not None and session_date < last_date:
+        return False
+
+    if last_date is None:
+        summary.current_streak = 1
+    elif session_date > last_date:
+        if session_date - last_date <= STREAK_MAX_GAP:
+            summary.current_streak = (summary.current_streak or 0) + 1
+        else:
+            summary.current_streak = 1
+    summary.longest_streak = max(summary.longest_streak or 0, summary.current_streak or 0)
+    summary.last_session_date = session_date
+    return True
+
+def effective_streak(summary, today=None):
+    """读取时惰性衰减：最后训练日期早于昨天则连续天数归零"""
+    if summary is None or summary.last_session_date is None:
+        return 0
+
+    today = today or date.today()
+    if summary.last_session_date < today - timedelta(days=1):
+        return 0
+    return summary.current_streak or 0
@@ -0,0 +1,181 @@
+import csv
+import io
+import math
+import random
+from datetime import date, datetime, time, timedelta
+from src.models.user import TrainingRecord, User, db
+
+# 各难度的训练参数 (收缩秒数, 放松秒数, 每组次数, 组数, 每天次数)，与 /training/config 一致
+DIFFICULTY_PARAMS = {
+    'beginner': (5, 5, 8, 2, 2),
+    'intermediate': (8, 8, 12, 3, 3),
+    'advanced': (12, 6, 15, 4, 3),
+}
+
+# 用户偏好难度的分布
+DIFFICULTY_WEIGHTS = (('beginner', 0.5), ('intermediate', 0.35), ('advanced', 0.15))
+
+# 每个事务写入的默认行数
+DEFAULT_BATCH_SIZE = 50000
+
+USER_COLUMNS = ('username', 'nickname', 'created_at', 'updated_at')
+RECORD_COLUMNS = (
+    'user_id', 'difficulty', 'sets_completed', 'reps_completed', 'total_duration',
+    'session_date', 'created_at', 'contract_time', 'relax_time'
+)
+
+class SyntheticPopulation:
+    """可复现（固定seed）的模拟用户群体
+
+    每个用户的活跃度服从对数正态分布（少数重度用户、大量轻度用户），训练日由
+    交替出现的连续训练段与中断段组成，段长服从几何分布，均值由用户的坚持程度决定。
+    """
+
+    def __init__(self, users, sessions_per_user, days=365, seed=0, prefix='synthetic', today=None):
+        self.users = users
+        self.sessions_per_user = sessions_per_user
+        self.days = days
+        self.seed = seed
+        self.prefix = prefix
+        self.today = today or date.today()
+
+    def user_rows(self):
+        """产出用户行（注册时间早于第一次训练）"""
+        rng = random.Random(self.seed)
+        for index in range(self.users):
+            created_at = datetime.combine(self.today - timedelta(days=self.days), time()) \
+                - timedelta(seconds=rng.randrange(86400 * 30))
+            yield (f'{self.prefix}_{index}', f'Synthetic {index}', created_at, created_at)
+
+    def record_rows(self, user_ids):
+        """按用户依次产出训练记录行，user_ids与user_rows()的顺序一致"""
+        rng = random.Random(self.seed + 1)
+        # 对数正态分布的均值为 exp(sigma^2/2)，归一化后平均每人 sessions_per_user 次
+        sigma = 1.0
+        scale = self.sessions_per_user / math.exp(sigma ** 2 / 2)
+        for user_id in user_ids:
+            target = int(round(scale * rng.lognormvariate(0, sigma)))
+            if target:
+                yield from self._user_sessions(rng, user_id, target)
+
+    def _user_sessions(self, rng, user_id, target):
+        preferred = rng.choices([d for d, _ in DIFFICULTY_WEIGHTS], [w for _, w in DIFFICULTY_WEIGHTS])[0]
+        consistency = rng.random()
+        mean_run = 2 + consistency * 20  # 连续训练段平均天数
+        mean_gap = 1 + (1 - consistency) * 10  # 中断段平均天数
+        # 连续训练中每天1到daily_sessions次
+        max_daily = DIFFICULTY_PARAMS[preferred][4]
+
+        # 从最近的训练日往前生成，直到次数达到目标或超出日期范围；约一半用户当前仍在连续训练中
+        day = self.today if rng.random() < 0.5 else self.today - timedelta(days=2 + int(rng.expovariate(1 / mean_gap)))
+        earliest = self.today - timedelta(days=self.days - 1)
+        produced = 0
+        while produced < target and day >= earliest:
+            run = 1 + int(rng.expovariate(1 / mean_run))
+            for _ in range(run):
+                if produced >= target or day < earliest:
+                    break
+                for _ in range(min(rng.randint(1, max_daily), target - produced)):
+                    yield self._session(rng, user_id, day, preferred)
+                    produced += 1
+                day -= timedelta(days=1)
+            # 中断至少2天，连续天数重新计算
+            day -= timedelta(days=2 + int(rng.expovariate(1 / mean_gap)))
+
+    @staticmethod
+    def _session(rng, user_id, day, preferred):
+        difficulty = preferred if rng.random() < 0.85 else rng.choice(list(DIFFICULTY_PARAMS))
+        contract, relax, reps_per_set, sets_count, _ = DIFFICULTY_PARAMS[difficulty]
+        # 约五分之一的训练未完成全部组数
+        sets = sets_count if rng.random() < 0.8 else rng.randint(1, sets_count)
+        reps = sets * reps_per_set
+        created_at = datetime.combine(day, time(rng.randrange(6, 23), rng.randrange(60), rng.randrange(60)))
+        return (user_id, difficulty, sets, reps, reps * (contract + relax), day, created_at, contract, relax)
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _copy_rows(connection, table, columns, chunk):
+    # PostgreSQL：COPY FROM STDIN（CSV），比逐行INSERT快一个数量级
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(chunk)
+    buffer.seek(0)
+    preparer = db.engine.dialect.identifier_preparer
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {preparer.format_table(table)} ({', '.join(preparer.quote(c) for c in columns)}) "
+            f"FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+
+def bulk_load(table, columns, rows, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """按后端最快的方式批量写入行，每批一个事务，返回写入行数
+
+    PostgreSQL使用COPY；SQLite使用executemany，写入期间关闭同步刷盘（synchronous=OFF）。
+    """
+    raw = db.engine.raw_connection()
+    postgres = db.engine.dialect.name == 'postgresql'
+    preparer = db.engine.dialect.identifier_preparer
+    insert_sql = f"INSERT INTO {preparer.format_table(table)} ({', '.join(preparer.quote(c) for c in columns)}) " \
+                 f"VALUES ({', '.join('?' for _ in columns)})"
+    total = 0
+    try:
+        if not postgres:
+            convert = _sqlite_converter(table, columns)
+            cursor = raw.cursor()
+            synchronous = cursor.execute('PRAGMA synchronous').fetchone()[0]
+            cursor.execute('PRAGMA synchronous = OFF')
+        for chunk in _chunks(rows, batch_size):
+            if postgres:
+                _copy_rows(raw, table, columns, chunk)
+            else:
+                cursor.executemany(insert_sql, [convert(row) for row in chunk])
+            raw.commit()
+            total += len(chunk)
+            if progress:
+                progress(total)
+    finally:
+        if not postgres:
+            cursor.execute(f'PRAGMA synchronous = {synchronous}')
+            cursor.close()
+        raw.close()
+    return total
+
+def _sqlite_converter(table, columns):
+    """返回把行中的日期/时间转换为SQLAlchemy在SQLite中保存的文本格式的函数"""
+    positions = []
+    for index, column in enumerate(columns):
+        column_type = table.c[column].type
+        if isinstance(column_type, db.DateTime):
+            positions.append((index, lambda value: value.isoformat(' ', 'microseconds')))
+        elif isinstance(column_type, db.Date):
+            positions.append((index, date.isoformat))
+
+    def convert(row):
+        row = list(row)
+        for index, to_text in positions:
+            if row[index] is not None:
+                row[index] = to_text(row[index])
+        return row
+    return convert
+
+def load_population(population, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """写入模拟用户与训练记录，返回 (用户数, 训练记录数)；汇总表需随后重建"""
+    users = bulk_load(User.__table__, USER_COLUMNS, population.user_rows(), batch_size)
+
+    # 按生成顺序取回用户ID
+    ids = dict(db.session.query(User.username, User.id)
+               .filter(User.username.like(f'{population.prefix}%')).all())
+    db.session.commit()
+    user_ids = [ids[username] for username, *_ in population.user_rows()]
+
+    records = bulk_load(TrainingRecord.__table__, RECORD_COLUMNS, population.record_rows(user_ids),
+                        batch_size, progress)
+    return users, records
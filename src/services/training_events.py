@@ -0,0 +1,40 @@
+from sqlalchemy import text
+from src.models.user import UserTrainingSummary, db
+from src.services.training_summary import apply_training_records
+from src.services.leaderboard import apply_leaderboard_records
+from src.services.daily_stats import apply_daily_records
+from src.services.global_stats import apply_global_records
+from src.services.achievements import achievement_metrics, evaluate_achievements, queue_achievement_notifications
+
+# 同一用户的汇总更新互斥（pg_advisory_xact_lock的第一个键，第二个键为用户ID）
+USER_AGGREGATE_LOCK_NAMESPACE = 0x61676772  # 'aggr'
+
+def lock_user_aggregates(user_id, wait=True):
+    """PostgreSQL上持有该用户的事务级advisory锁直到提交或回滚，返回是否拿到锁
+
+    同一用户的两个事务（两个worker或两个同步请求）不会基于同一份旧汇总推进连续天数、
+    重复计算首次活跃日期；wait=False时锁被占用直接返回False。其他数据库的写事务本身串行。
+    同一事务内可重复获取。
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return True
+    function = 'pg_advisory_xact_lock' if wait else 'pg_try_advisory_xact_lock'
+    acquired = db.session.execute(text(f'SELECT {function}(:namespace, :user_id)'),
+                                  {'namespace': USER_AGGREGATE_LOCK_NAMESPACE, 'user_id': user_id}).scalar()
+    return wait or bool(acquired)
+
+def apply_recorded_sessions(user_id, records):
+    """训练记录写入后，在同一事务内更新所有增量汇总与成就
+
+    新解锁的成就同时写入待下发通知，返回本次新解锁的成就列表。
+    """
+    lock_user_aggregates(user_id)
+    previous_summary = db.session.get(UserTrainingSummary, user_id)
+    previous = achievement_metrics(previous_summary)
+    summary = apply_training_records(user_id, records)
+    apply_leaderboard_records(user_id, records, from_scratch=previous_summary is None)
+    first_active_dates = apply_daily_records(user_id, records, from_scratch=previous_summary is None)
+    apply_global_records(records, first_active_dates)
+    unlocked = evaluate_achievements(user_id, achievement_metrics(summary), previous)
+    queue_achievement_notifications(user_id, unlocked)
+    return unlocked
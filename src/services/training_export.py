@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from sqlalchemy import select
+from src.models.user import TrainingRecord, db
+from src.services.serialization import TRAINING_RECORD_COLUMNS, project, rows_to_dicts
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+# 每批从数据库读取并写出的行数；PostgreSQL上使用服务端游标，内存占用与总行数无关
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def _export_rows(user_id, start_date=None, end_date=None):
+    """按 (created_at, id) 顺序分批产出训练记录行"""
+    statement = select(*project(TrainingRecord, TRAINING_RECORD_COLUMNS))\
+        .where(TrainingRecord.user_id == user_id)
+    if start_date:
+        statement = statement.where(TrainingRecord.session_date >= start_date)
+    if end_date:
+        statement = statement.where(TrainingRecord.session_date <= end_date)
+    statement = statement.order_by(TrainingRecord.created_at, TrainingRecord.id)
+
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+def _ndjson_chunks(partitions):
+    for rows in partitions:
+        records = rows_to_dicts(rows)
+        if orjson is not None:
+            yield b''.join(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in records)
+        else:
+            yield ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n' for record in records).encode()
+
+def _csv_chunks(partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TRAINING_RECORD_COLUMNS)
+    for rows in partitions:
+        writer.writerows(
+            [value.isoformat() if hasattr(value, 'isoformat') else value for value in row] for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # 没有记录时也输出表头
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def export_training_records(user_id, export_format, start_date=None, end_date=None):
+    """返回导出内容的字节块生成器（NDJSON每行一条记录，字段与训练历史接口一致）"""
+    partitions = _export_rows(user_id, start_date, end_date)
+    if export_format == 'csv':
+        return _csv_chunks(partitions)
+    return _ndjson_chunks(partitions)
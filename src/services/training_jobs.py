@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func
+from src.models.user import TrainingJob, TrainingRecord, UserTrainingSummary, db
+from src.services.training_events import apply_recorded_sessions, lock_user_aggregates
+from src.services.response_cache import invalidate_cached_responses
+
+# 单个任务最多尝试次数，超过后标记failed，需 flask run-jobs --retry-failed 手动重试
+MAX_JOB_ATTEMPTS = 5
+
+# 重试退避基数（秒），第n次失败后等待 RETRY_BASE_DELAY * 2^(n-1)
+RETRY_BASE_DELAY = 5
+
+# 没有新任务通知时worker轮询队列的间隔（秒）
+JOB_POLL_INTERVAL = 2.0
+
+# 汇总更新后需要失效的公共响应缓存
+AGGREGATE_CACHES = ('global_stats', 'leaderboard')
+
+_workers_lock = threading.Lock()
+
+def async_training_enabled():
+    return current_app.config.get('ASYNC_TRAINING_JOBS', False)
+
+def record_sessions(user_id, records):
+    """训练记录写入后的处理入口，需在记录所在事务内调用
+
+    异步模式只在同一事务内写入任务并返回None，汇总、连续天数、排行榜与成就由worker更新；
+    否则同步更新并返回新解锁的成就列表。
+    """
+    if not async_training_enabled():
+        return apply_recorded_sessions(user_id, records)
+
+    db.session.flush()  # 获取记录ID
+    db.session.add(TrainingJob(user_id=user_id, record_ids=json.dumps([record.id for record in records])))
+    return None
+
+def _pending_filter(query, now):
+    return query.filter(TrainingJob.failed.is_(False), TrainingJob.available_at <= now)
+
+def process_user_jobs(user_id):
+    """在一个事务内认领并处理某用户所有到期任务，返回处理的任务数
+
+    先取得该用户的汇总锁（被其他worker持有时返回0，由run_pending_jobs跳过该用户），
+    同一用户的任务因此不会被两个worker同时处理。认领方式是删除任务行，
+    失败时回滚使任务行恢复，保证每条记录恰好汇总一次。
+    用户还没有汇总行时汇总从全部原始记录重建，已包含其余任务（退避中、已失败）的记录，
+    因此一并认领该用户的全部任务。
+    """
+    if not lock_user_aggregates(user_id, wait=False):
+        db.session.rollback()
+        return 0
+
+    now = datetime.utcnow()
+    query = TrainingJob.query.filter(TrainingJob.user_id == user_id)
+    if db.session.get(UserTrainingSummary, user_id) is not None:
+        query = _pending_filter(query, now)
+    jobs = query.order_by(TrainingJob.id).with_for_update(skip_locked=True).all()
+    if not jobs:
+        db.session.rollback()
+        return 0
+
+    job_ids = [job.id for job in jobs]
+    record_ids = [record_id for job in jobs for record_id in json.loads(job.record_ids)]
+    try:
+        claimed = db.session.execute(
+            delete(TrainingJob).where(TrainingJob.id.in_(job_ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed != len(job_ids):
+            # 其他worker已处理其中部分任务，交给下一轮
+            db.session.rollback()
+            return 0
+
+        records = TrainingRecord.query.filter(TrainingRecord.id.in_(record_ids))\
+            .order_by(TrainingRecord.id).all()
+        if records:
+            apply_recorded_sessions(user_id, records)
+        db.session.commit()
+        invalidate_cached_responses(*AGGREGATE_CACHES)
+        return len(job_ids)
+    except Exception as e:
+        db.session.rollback()
+        _record_failure(job_ids, e)
+        raise
+
+def _record_failure(job_ids, error):
+    now = datetime.utcnow()
+    for job in TrainingJob.query.filter(TrainingJob.id.in_(job_ids)).all():
+        job.attempts += 1
+        job.last_error = f'{type(error).__name__}: {error}'[:1000]
+        job.failed = job.attempts >= MAX_JOB_ATTEMPTS
+        job.available_at = now + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (job.attempts - 1))
+    db.session.commit()
+
+def run_pending_jobs(max_users=None):
+    """处理队列中到期的任务直到队列为空（或处理了max_users个用户），返回处理的任务数
+
+    某用户的任务正被其他worker处理或刚失败退避时跳过该用户，继续处理其他用户的任务。
+    """
+    processed = 0
+    users = 0
+    skipped = set()
+    while max_users is None or users < max_users:
+        query = _pending_filter(db.session.query(TrainingJob.user_id), datetime.utcnow())
+        if skipped:
+            query = query.filter(TrainingJob.user_id.notin_(skipped))
+        next_job = query.order_by(TrainingJob.id).first()
+        if next_job is None:
+            break
+        try:
+            count = process_user_jobs(next_job.user_id)
+        except Exception as e:
+            current_app.logger.exception('Training job for user %s failed: %s', next_job.user_id, e)
+            count = 0
+        if count == 0:
+            # 留给下一轮轮询
+            skipped.add(next_job.user_id)
+            continue
+        processed += count
+        users += 1
+    return processed
+
+def retry_failed_jobs():
+    """把超过重试次数的任务重新放回队列，返回任务数"""
+    count = TrainingJob.query.filter(TrainingJob.failed.is_(True)).update(
+        {'failed': False, 'attempts': 0, 'available_at': datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+    return count
+
+def get_queue_stats():
+    """按是否失败分组计数待处理与失败的任务（一次查询）"""
+    counts = dict(db.session.query(TrainingJob.failed, func.count()).group_by(TrainingJob.failed).all())
+    return {'pending': counts.get(False, 0), 'failed': counts.get(True, 0)}
+
+class TrainingJobWorkers:
+    """进程内worker线程池；各gunicorn worker进程各自运行，通过删除任务行认领避免重复处理"""
+
+    def __init__(self, app, size):
+        self.app = app
+        self.size = size
+        self.pid = os.getpid()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.size):
+            thread = threading.Thread(target=self._run, name=f'training-jobs-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self):
+        self._wakeup.set()
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(JOB_POLL_INTERVAL)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    run_pending_jobs()
+                except Exception as e:
+                    self.app.logger.exception('Training job worker error: %s', e)
+                finally:
+                    db.session.remove()
+
+def init_training_jobs(app):
+    """异步模式下在每个进程处理第一个请求时启动worker线程池（gunicorn master不启动）"""
+    @app.before_request
+    def start_training_job_workers():
+        if not app.config.get('ASYNC_TRAINING_JOBS', False):
+            return
+        workers = app.extensions.get('training_job_workers')
+        if workers is not None and workers.pid == os.getpid():
+            return
+        with _workers_lock:
+            workers = app.extensions.get('training_job_workers')
+            if workers is None or workers.pid != os.getpid():
+                workers = TrainingJobWorkers(app, app.config.get('TRAINING_JOB_WORKERS', 2))
+                app.extensions['training_job_workers'] = workers
+                workers.start()
+
+def notify_job_workers():
+    """提交训练记录后唤醒本进程的worker，避免等待轮询间隔"""
+    workers = current_app.extensions.get('training_job_workers')
+    if workers is not None:
+        workers.notify()
@@ -0,0 +1,243 @@
+from datetime import datetime
+from src.models.user import TrainingRecord, UserTrainingSummary, UserDifficultySummary, db
+from src.services.streaks import advance_streak, compute_streaks
+from sqlalchemy import bindparam, func
+from sqlalchemy.exc import IntegrityError
+
+def compute_training_summary(user_id):
+    """从原始训练记录计算用户汇总（不写入数据库）"""
+    totals = db.session.query(
+        func.count(TrainingRecord.id),
+        func.sum(TrainingRecord.total_duration),
+        func.sum(TrainingRecord.sets_completed),
+        func.sum(TrainingRecord.reps_completed),
+        func.max(TrainingRecord.session_date)
+    ).filter(TrainingRecord.user_id == user_id).one()
+
+    summary = UserTrainingSummary(
+        user_id=user_id,
+        total_sessions=totals[0] or 0,
+        total_duration=totals[1] or 0,
+        total_sets=totals[2] or 0,
+        total_reps=totals[3] or 0,
+        last_session_date=totals[4]
+    )
+    refresh_streaks(summary)
+
+    difficulty_rows = db.session.query(
+        TrainingRecord.difficulty,
+        func.count(TrainingRecord.id),
+        func.sum(TrainingRecord.sets_completed),
+        func.sum(TrainingRecord.reps_completed),
+        func.sum(TrainingRecord.total_duration)
+    ).filter(TrainingRecord.user_id == user_id).group_by(TrainingRecord.difficulty).all()
+
+    difficulty_summaries = [
+        UserDifficultySummary(
+            user_id=user_id,
+            difficulty=difficulty,
+            session_count=count,
+            total_sets=sets or 0,
+            total_reps=reps or 0,
+            total_duration=duration or 0
+        ) for difficulty, count, sets, reps, duration in difficulty_rows
+    ]
+
+    return summary, difficulty_summaries
+
+def get_training_summary(user_id, summary=None):
+    """获取用户训练汇总及难度明细
+
+    已预加载的汇总行可通过summary传入以省去一次查询。
+    汇总行不存在时（如尚未执行重建的历史用户）从原始记录临时计算，不写入数据库。
+    """
+    if summary is None:
+        summary = db.session.get(UserTrainingSummary, user_id)
+    if summary is None:
+        return compute_training_summary(user_id)
+
+    difficulty_summaries = UserDifficultySummary.query.filter_by(user_id=user_id)\
+        .order_by(UserDifficultySummary.difficulty).all()
+    return summary, difficulty_summaries
+
+def apply_training_records(user_id, records):
+    """把同一用户的一批新训练记录计入汇总，需在记录所在事务内调用"""
+    # 先刷新，保证汇总行缺失时的重建能看到本批记录
+    db.session.flush()
+
+    summary = db.session.get(UserTrainingSummary, user_id)
+    if summary is None:
+        summary, difficulty_summaries = compute_training_summary(user_id)
+        try:
+            # 同一用户的首次训练并发写入时，后写入的一方主键冲突，改为在对方的汇总行上自增
+            with db.session.begin_nested():
+                db.session.add(summary)
+                db.session.add_all(difficulty_summaries)
+            return summary
+        except IntegrityError:
+            summary = db.session.get(UserTrainingSummary, user_id)
+
+    # 使用SQL表达式自增，避免并发写入时丢失更新
+    summary.total_sessions = UserTrainingSummary.total_sessions + len(records)
+    summary.total_duration = UserTrainingSummary.total_duration + sum(r.total_duration for r in records)
+    summary.total_sets = UserTrainingSummary.total_sets + sum(r.sets_completed for r in records)
+    summary.total_reps = UserTrainingSummary.total_reps + sum(r.reps_completed for r in records)
+    # 连续天数按日期顺序常数时间推进，遇到补录的旧日期时全量重算
+    for session_date in sorted({r.session_date for r in records}):
+        if not advance_streak(summary, session_date):
+            refresh_streaks(summary)
+            break
+    summary.updated_at = datetime.utcnow()
+
+    by_difficulty = {}
+    for record in records:
+        by_difficulty.setdefault(record.difficulty, []).append(record)
+
+    existing = {
+        row.difficulty: row
+        for row in UserDifficultySummary.query.filter(
+            UserDifficultySummary.user_id == user_id,
+            UserDifficultySummary.difficulty.in_(list(by_difficulty))
+        ).all()
+    }
+
+    for difficulty, group in by_difficulty.items():
+        difficulty_summary = existing.get(difficulty)
+        if difficulty_summary is None:
+            db.session.add(UserDifficultySummary(
+                user_id=user_id,
+                difficulty=difficulty,
+                session_count=len(group),
+                total_sets=sum(r.sets_completed for r in group),
+                total_reps=sum(r.reps_completed for r in group),
+                total_duration=sum(r.total_duration for r in group)
+            ))
+            continue
+
+        difficulty_summary.session_count = UserDifficultySummary.session_count + len(group)
+        difficulty_summary.total_sets = UserDifficultySummary.total_sets + sum(r.sets_completed for r in group)
+        difficulty_summary.total_reps = UserDifficultySummary.total_reps + sum(r.reps_completed for r in group)
+        difficulty_summary.total_duration = UserDifficultySummary.total_duration + sum(r.total_duration for r in group)
+
+    db.session.flush()
+    return summary
+
+def refresh_streaks(summary):
+    """从用户所有训练日期重算连续天数"""
+    training_dates = db.session.query(TrainingRecord.session_date)\
+        .filter(TrainingRecord.user_id == summary.user_id)\
+        .distinct().all()
+    current, longest, last_date = compute_streaks(d for (d,) in training_dates)
+    summary.current_streak = current
+    summary.longest_streak = longest
+    summary.last_session_date = last_date
+
+def iter_user_training_dates(user_id=None):
+    """按用户流式返回 (user_id, 训练日期列表)"""
+    query = db.session.query(TrainingRecord.user_id, TrainingRecord.session_date).distinct()
+    if user_id is not None:
+        query = query.filter(TrainingRecord.user_id == user_id)
+    query = query.order_by(TrainingRecord.user_id, TrainingRecord.session_date)
+
+    current_user_id = None
+    dates = []
+    for uid, session_date in query.yield_per(5000):
+        if uid != current_user_id:
+            if current_user_id is not None:
+                yield current_user_id, dates
+            current_user_id = uid
+            dates = []
+        dates.append(session_date)
+    if current_user_id is not None:
+        yield current_user_id, dates
+
+def backfill_streaks(user_id=None, batch_size=500):
+    """为已有汇总行回填连续天数，返回更新的用户数"""
+    updates = []
+    updated = 0
+    for uid, dates in iter_user_training_dates(user_id):
+        current, longest, _ = compute_streaks(dates)
+        updates.append({'b_user_id': uid, 'b_current_streak': current, 'b_longest_streak': longest})
+        if len(updates) >= batch_size:
+            updated += _write_streaks(updates)
+            updates = []
+    if updates:
+        updated += _write_streaks(updates)
+    db.session.commit()
+    return updated
+
+def _write_streaks(updates):
+    table = UserTrainingSummary.__table__
+    db.session.execute(
+        table.update().where(table.c.user_id == bindparam('b_user_id')).values(
+            current_streak=bindparam('b_current_streak'),
+            longest_streak=bindparam('b_longest_streak')
+        ),
+        updates
+    )
+    return len(updates)
+
+def rebuild_training_summaries(user_id=None):
+    """从原始训练记录重建汇总表，user_id为空时重建全部用户"""
+    summary_query = UserTrainingSummary.query
+    difficulty_query = UserDifficultySummary.query
+    if user_id is not None:
+        summary_query = summary_query.filter_by(user_id=user_id)
+        difficulty_query = difficulty_query.filter_by(user_id=user_id)
+    summary_query.delete(synchronize_session=False)
+    difficulty_query.delete(synchronize_session=False)
+
+    totals_query = db.session.query(
+        TrainingRecord.user_id,
+        func.count(TrainingRecord.id),
+        func.sum(TrainingRecord.total_duration),
+        func.sum(TrainingRecord.sets_completed),
+        func.sum(TrainingRecord.reps_completed),
+        func.max(TrainingRecord.session_date)
+    )
+    difficulty_rows_query = db.session.query(
+        TrainingRecord.user_id,
+        TrainingRecord.difficulty,
+        func.count(TrainingRecord.id),
+        func.sum(TrainingRecord.sets_completed),
+        func.sum(TrainingRecord.reps_completed),
+        func.sum(TrainingRecord.total_duration)
+    )
+    if user_id is not None:
+        totals_query = totals_query.filter(TrainingRecord.user_id == user_id)
+        difficulty_rows_query = difficulty_rows_query.filter(TrainingRecord.user_id == user_id)
+
+    streaks = {uid: compute_streaks(dates) for uid, dates in iter_user_training_dates(user_id)}
+
+    summaries = [
+        {
+            'user_id': uid,
+            'total_sessions': count,
+            'total_duration': duration or 0,
+            'total_sets': sets or 0,
+            'total_reps': reps or 0,
+            'last_session_date': last_date,
+            'current_streak': streaks.get(uid, (0, 0, None))[0],
+            'longest_streak': streaks.get(uid, (0, 0, None))[1],
+            'updated_at': datetime.utcnow()
+        } for uid, count, duration, sets, reps, last_date in totals_query.group_by(TrainingRecord.user_id)
+    ]
+    difficulty_summaries = [
+        {
+            'user_id': uid,
+            'difficulty': difficulty,
+            'session_count': count,
+            'total_sets': sets or 0,
+            'total_reps': reps or 0,
+            'total_duration': duration or 0
+        } for uid, difficulty, count, sets, reps, duration
+        in difficulty_rows_query.group_by(TrainingRecord.user_id, TrainingRecord.difficulty)
+    ]
+
+    if summaries:
+        db.session.execute(UserTrainingSummary.__table__.insert(), summaries)
+    if difficulty_summaries:
+        db.session.execute(UserDifficultySummary.__table__.insert(), difficulty_summaries)
+    db.session.commit()
+
+    return len(summaries)
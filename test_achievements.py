@@ -0,0 +1,31 @@
+from src.models.user import db, UserAchievement
+from src.services.query_budget import QueryBudget
+
+def test_record_only_touches_crossed_achievements(client, make_user, record_training):
+    user_id = make_user('achiever')
+    record_training(client, user_id)
+
+    first_steps = UserAchievement.query.filter_by(user_id=user_id, achievement_id=1).one()
+    assert first_steps.unlocked and first_steps.progress == 1
+
+    # 第二次训练：目录已缓存，不再查询成就表，也不按行懒加载成就
+    with QueryBudget() as budget:
+        record_training(client, user_id)
+    statements = [statement for statement, _ in budget.statements]
+    assert not any('FROM achievement' in s for s in statements)
+    user_achievement_selects = [s for s in statements if s.lstrip().startswith('SELECT') and 'FROM user_achievement' in s]
+    assert len(user_achievement_selects) == 1
+
+    progress = {ua.achievement_id: ua.progress for ua in UserAchievement.query.filter_by(user_id=user_id)}
+    assert progress == {1: 1, 2: 1, 3: 2, 4: 0}
+
+def test_manual_check_matches_incremental(client, make_user, record_training):
+    user_id = make_user('checker')
+    record_training(client, user_id, times=3)
+    before = {ua.achievement_id: (ua.progress, ua.unlocked) for ua in UserAchievement.query.filter_by(user_id=user_id)}
+
+    response = client.post(f'/api/tigang/achievements/check/{user_id}')
+    assert response.get_json()['updated_count'] == 0
+    db.session.expire_all()
+    after = {ua.achievement_id: (ua.progress, ua.unlocked) for ua in UserAchievement.query.filter_by(user_id=user_id)}
+    assert before == after
@@ -0,0 +1,114 @@
+import base64
+import io
+import os
+import pytest
+from src.models.user import db, User
+from src.services import avatar_store
+from src.services.avatar_store import AvatarStore, Image, migrate_inline_avatars
+
+def _png_data_uri(size=300, color=(200, 30, 30)):
+    if Image is None:
+        # 1x1透明PNG
+        raw = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==')
+    else:
+        output = io.BytesIO()
+        Image.new('RGB', (size, size), color).save(output, 'PNG')
+        raw = output.getvalue()
+    return 'data:image/png;base64,' + base64.b64encode(raw).decode()
+
+def test_upload_stores_blob_and_serves_with_etag(client, make_user):
+    user_id = make_user('avatar_user')
+    response = client.post(f'/api/profile/{user_id}/avatar', json={'avatar_data': _png_data_uri()})
+    assert response.status_code == 200
+    data = response.get_json()
+    url = data['avatar_url']
+    assert url.startswith('/api/avatars/') and len(url) < 100
+
+    profile = client.get(f'/api/profile/{user_id}').get_json()
+    assert profile['avatar_url'] == url
+
+    image = client.get(url)
+    assert image.status_code == 200
+    assert image.mimetype == 'image/png'
+    assert 'immutable' in image.headers['Cache-Control']
+    assert image.headers['X-Content-Type-Options'] == 'nosniff'
+    etag = image.headers['ETag']
+
+    cached = client.get(url, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    if Image is not None:
+        thumb = client.get(data['thumbnails']['64'])
+        assert Image.open(io.BytesIO(thumb.data)).size == (64, 64)
+
+def test_list_payloads_serve_the_small_thumbnail(client, make_user, record_training):
+    user_id = make_user('thumb_user')
+    record_training(client, user_id)
+    uploaded = client.post(f'/api/profile/{user_id}/avatar', json={'avatar_data': _png_data_uri()}).get_json()
+
+    profile = client.get(f'/api/profile/{user_id}').get_json()
+    board = client.get('/api/tigang/training/leaderboard').get_json()['leaderboard']
+    assert profile['avatar_thumbnail_url'] == board[0]['avatar_thumbnail_url']
+    if Image is not None:
+        assert profile['avatar_thumbnail_url'] == uploaded['thumbnails']['64']
+        thumb = client.get(profile['avatar_thumbnail_url'])
+        assert Image.open(io.BytesIO(thumb.data)).size == (64, 64)
+
+    # 外部URL没有缩略图
+    client.put(f'/api/profile/{user_id}', json={'avatar_url': 'https://example.com/a.png'})
+    assert client.get(f'/api/profile/{user_id}').get_json()['avatar_thumbnail_url'] is None
+
+def test_missing_thumbnail_redirects_to_original(client, make_user, monkeypatch):
+    monkeypatch.setattr(avatar_store, 'Image', None)
+    user_id = make_user('no_pillow_user')
+    uploaded = client.post(f'/api/profile/{user_id}/avatar', json={'avatar_data': _png_data_uri()}).get_json()
+    assert uploaded['thumbnails'] == {}
+
+    thumbnail_url = client.get(f'/api/profile/{user_id}').get_json()['avatar_thumbnail_url']
+    response = client.get(thumbnail_url)
+    assert response.status_code == 302
+    assert response.headers['Location'] == uploaded['avatar_url']
+    assert client.get(thumbnail_url.replace('_64', '_999')).status_code == 302
+    assert client.get('/api/avatars/' + '0' * 64 + '_64.png').status_code == 404
+
+@pytest.mark.skipif(Image is None, reason='Pillow not installed')
+def test_oversized_dimensions_rejected_before_decoding(app, client, make_user, monkeypatch):
+    monkeypatch.setattr(avatar_store, 'MAX_AVATAR_PIXELS', 200 * 200)
+    monkeypatch.setattr(Image.Image, 'thumbnail', lambda *args: pytest.fail('decoded an oversized image'))
+    user_id = make_user('bomb_user')
+    response = client.post(f'/api/profile/{user_id}/avatar', json={'avatar_data': _png_data_uri(size=300)})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Image dimensions too large'
+    # 拒绝时不写入任何内容
+    assert not os.path.exists(app.config['AVATAR_STORAGE_DIR'])
+
+def test_invalid_avatar_rejected(client, make_user):
+    user_id = make_user('bad_avatar_user')
+    assert client.post(f'/api/profile/{user_id}/avatar', json={'avatar_data': 'data:text/plain;base64,AAAA'}).status_code == 400
+    assert client.post(f'/api/profile/{user_id}/avatar', json={'avatar_data': 'data:image/png;base64,@@@'}).status_code == 400
+    # 声明为图片但内容不是（如HTML/脚本）
+    html = base64.b64encode(b'<html><script>alert(1)</script></html>').decode()
+    assert client.post(f'/api/profile/{user_id}/avatar', json={'avatar_data': f'data:image/png;base64,{html}'}).status_code == 400
+    assert client.post(f'/api/profile/{user_id}/avatar', json={'avatar_data': _png_data_uri().replace('image/png', 'image/gif')}).status_code == 400
+    assert client.get('/api/avatars/../../etc/passwd').status_code == 404
+
+def test_migrate_inline_avatars(app, make_user):
+    user_ids = [make_user(f'inline_{index}') for index in range(5)]
+    for index, user_id in enumerate(user_ids):
+        db.session.get(User, user_id).avatar_url = _png_data_uri(color=(index * 40, 0, 0))
+    db.session.get(User, user_ids[-1]).avatar_url = 'data:image/png;base64,@@@'
+    db.session.commit()
+
+    assert migrate_inline_avatars(batch_size=2) == (4, 1)
+    urls = [db.session.get(User, user_id).avatar_url for user_id in user_ids[:-1]]
+    assert all(url.startswith('/api/avatars/') for url in urls)
+    assert len(set(urls)) == 4
+
+def test_store_backends_must_implement_interface():
+    class Incomplete(AvatarStore):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,31 @@
+import json
+from benchmarks.run import compare, percentile, summarize
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.99) == 7
+    assert percentile([], 0.5) is None
+
+def test_summarize_reports_latency_and_queries():
+    result = summarize([0.004, 0.001, 0.002, 0.003], [2, 4], errors=1, elapsed=2.0)
+    assert result['requests'] == 4
+    assert result['errors'] == 1
+    assert result['throughput_rps'] == 2.0
+    assert result['p50_ms'] == 2.0
+    assert result['p99_ms'] == 4.0
+    assert result['queries_mean'] == 3.0
+    assert result['queries_max'] == 4
+
+def test_compare_prints_relative_change(tmp_path, capsys):
+    base = {'meta': {'commit': 'aaa'}, 'endpoints': {'profile': {'p50_ms': 10.0, 'queries_mean': 6.0}}}
+    new = {'meta': {'commit': 'bbb'}, 'endpoints': {'profile': {'p50_ms': 5.0, 'queries_mean': 6.0}}}
+    (tmp_path / 'base.json').write_text(json.dumps(base))
+    (tmp_path / 'new.json').write_text(json.dumps(new))
+
+    compare(tmp_path / 'base.json', tmp_path / 'new.json')
+    lines = capsys.readouterr().out.splitlines()
+    assert any('p50_ms' in line and '-50.0%' in line for line in lines)
+    assert any('queries_mean' in line and '+0.0%' in line for line in lines)
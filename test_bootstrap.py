@@ -0,0 +1,119 @@
+import os
+import runpy
+import subprocess
+import sys
+from datetime import date, timedelta
+from types import SimpleNamespace
+import pytest
+from src.models.user import db, User, Achievement, UserAchievement, TrainingRecord, LeaderboardScore, SchemaMeta
+from src.services.query_budget import QueryBudget
+from src.services.bootstrap import DEFAULT_ACHIEVEMENTS, SAMPLE_USERS, get_schema_state, is_up_to_date, run_migrations
+
+def _counts():
+    return tuple(model.query.count() for model in (User, Achievement, UserAchievement, TrainingRecord))
+
+def test_migrations_are_idempotent(app):
+    assert not is_up_to_date()
+
+    timings = run_migrations()
+    assert [name for name, _, _ in timings] == [
+        'create_tables', 'create_indexes', 'daily_stats', 'leaderboards', 'global_stats', 'drop_materialized_views', 'seed_achievements', 'seed_sample_users', 'write_versions'
+    ]
+    assert is_up_to_date()
+    assert Achievement.query.count() == len(DEFAULT_ACHIEVEMENTS)
+    assert User.query.count() == len(SAMPLE_USERS)
+    assert UserAchievement.query.count() == len(SAMPLE_USERS) * len(DEFAULT_ACHIEVEMENTS)
+
+    before = _counts()
+    run_migrations()
+    assert _counts() == before
+
+def test_up_to_date_boot_is_one_query(app):
+    run_migrations()
+
+    with QueryBudget(1):
+        assert is_up_to_date()
+
+def test_missing_marker_table_means_outdated(app):
+    SchemaMeta.__table__.drop(db.engine)
+    assert get_schema_state() == {}
+    assert not is_up_to_date()
+    # 会话回滚后仍可正常使用
+    assert Achievement.query.count() > 0
+
+def test_upgrade_from_pre_series_database_backfills_rollups(app, client, record_training):
+    """旧数据库只有原始表：迁移后排行榜等汇总从历史训练记录初始化，新训练在其上累加"""
+    baseline = {'user', 'training_record', 'achievement', 'user_achievement'}
+    for table in reversed(db.metadata.sorted_tables):
+        if table.name not in baseline:
+            table.drop(db.engine)
+    UserAchievement.query.delete()
+    Achievement.query.delete()
+    user = User(username='veteran')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add_all([
+        TrainingRecord(user_id=user.id, difficulty='beginner', sets_completed=2, reps_completed=16,
+                       total_duration=160, contract_time=5, relax_time=5,
+                       session_date=date.today() - timedelta(days=days_ago))
+        for days_ago in range(6)
+    ])
+    db.session.commit()
+
+    run_migrations()
+    board = client.get('/api/tigang/training/leaderboard?period=all_time').get_json()['leaderboard']
+    assert [(entry['user_id'], entry['session_count']) for entry in board] == [(user.id, 6)]
+
+    record_training(client, user.id)
+    board = client.get('/api/tigang/training/leaderboard?period=all_time').get_json()['leaderboard']
+    assert board[0]['session_count'] == 7
+    assert client.get('/api/tigang/stats/global').get_json()['total_training_sessions'] == 7
+
+def test_user_without_summary_rebuilds_leaderboard_on_next_record(app, client, record_training):
+    user = User(username='legacy')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add_all([
+        TrainingRecord(user_id=user.id, difficulty='beginner', sets_completed=2, reps_completed=16,
+                       total_duration=160, contract_time=5, relax_time=5, session_date=date.today())
+        for _ in range(6)
+    ])
+    db.session.commit()
+
+    record_training(client, user.id)
+    assert {score.period_type: score.session_count for score in LeaderboardScore.query} == \
+        {'week': 7, 'month': 7, 'all_time': 7}
+
+STARTUP_SCRIPT = '''
+import sys
+sys.argv = ['flask'] + sys.argv[1:]
+import main
+from src.services.bootstrap import is_up_to_date
+with main.app.app_context():
+    print(is_up_to_date())
+'''
+
+@pytest.mark.parametrize('command, initialized', [('run', 'True'), ('migrate', 'False')])
+def test_flask_cli_initializes_database_except_for_migrate(tmp_path, command, initialized):
+    env = dict(os.environ, USE_POSTGRES='false', SQLITE_DATABASE_PATH=str(tmp_path / 'cli.db'),
+               FLASK_RUN_FROM_CLI='true', PEED_SKIP_STARTUP_INIT='false', METRICS_ENABLED='false')
+    result = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, '--app', 'main', command], env=env,
+                            cwd=os.path.dirname(__file__), capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == initialized
+
+def test_gunicorn_refuses_to_start_when_init_fails(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path / 'metrics'))
+    monkeypatch.setenv('PEED_SKIP_STARTUP_INIT', 'true')
+    config = runpy.run_path(os.path.join(os.path.dirname(__file__), 'gunicorn.conf.py'))
+    errors = []
+    server = SimpleNamespace(log=SimpleNamespace(error=lambda *args: errors.append(args)))
+
+    monkeypatch.setattr(subprocess, 'run', lambda *args, **kwargs: subprocess.CompletedProcess(args, 0))
+    config['on_starting'](server)
+    assert errors == []
+
+    monkeypatch.setattr(subprocess, 'run', lambda *args, **kwargs: subprocess.CompletedProcess(args, 3))
+    with pytest.raises(SystemExit) as excinfo:
+        config['on_starting'](server)
+    assert excinfo.value.code == 3
+    assert errors
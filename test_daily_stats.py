@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+from src.models.user import db, TrainingRecord, UserDailyStats
+from src.services.daily_stats import count_sessions, rebuild_daily_stats
+
+def _days_ago(days):
+    return (date.today() - timedelta(days=days)).isoformat()
+
+def _snapshot():
+    return sorted(
+        (row.user_id, row.stat_date, row.difficulty, row.session_count, row.total_duration, row.total_sets, row.total_reps)
+        for row in UserDailyStats.query.all()
+    )
+
+def test_stats_from_rollup_match_raw_records(client, make_user, record_batch, record_training):
+    user_id = make_user('daily_user')
+    sessions = [{'user_id': user_id, 'difficulty': difficulty, 'session_date': _days_ago(days_ago)}
+                for days_ago in (0, 0, 1, 6, 12, 29, 45)
+                for difficulty in ('beginner', 'advanced')]
+    record_batch(client, sessions)
+    record_training(client, user_id)
+
+    stats = client.get(f'/api/tigang/training/stats/{user_id}').get_json()
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    records = TrainingRecord.query.filter_by(user_id=user_id).all()
+
+    assert stats['weekly_sessions'] == sum(1 for r in records if r.session_date >= week_start)
+    assert stats['monthly_sessions'] == sum(1 for r in records if r.session_date >= month_start)
+    expected_daily = {}
+    for r in records:
+        if r.session_date >= today - timedelta(days=30):
+            expected_daily[r.session_date.isoformat()] = expected_daily.get(r.session_date.isoformat(), 0) + 1
+    assert {row['date']: row['session_count'] for row in stats['daily_stats']} == expected_daily
+
+    profile_stats = client.get(f'/api/stats/{user_id}').get_json()
+    assert profile_stats['weekly_progress'] == stats['weekly_sessions']
+    assert count_sessions(user_id, difficulty='advanced') == 7
+
+    incremental = _snapshot()
+    rebuild_daily_stats()
+    assert _snapshot() == incremental
+
+def test_legacy_user_rollup_is_built_on_next_record(client, make_user, record_training):
+    user_id = make_user('legacy_daily_user')
+    yesterday = date.today() - timedelta(days=1)
+    db.session.add(TrainingRecord(user_id=user_id, difficulty='beginner', sets_completed=2, reps_completed=16,
+                                  total_duration=160, contract_time=5, relax_time=5, session_date=yesterday))
+    db.session.commit()
+
+    record_training(client, user_id)
+    assert count_sessions(user_id) == 2
+    assert count_sessions(user_id, yesterday, yesterday) == 1
@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+import pytest
+from src.models.user import GlobalDailyStats, UserTrainingSummary, db
+from src.services import global_stats
+from src.services.global_stats import _increment, load_global_series, load_global_stats, reconcile_global_stats
+
+def _snapshot():
+    return sorted(
+        (row.stat_date, row.session_count, row.total_duration, row.active_users, row.new_users)
+        for row in GlobalDailyStats.query.all()
+    )
+
+def test_incremental_rollup_matches_reconcile(client, make_user, record_batch, record_training):
+    first = make_user('global_1')
+    second = make_user('global_2')
+    make_user('global_3')
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+
+    for _ in range(2):
+        record_training(client, first)
+    record_training(client, second)
+    record_batch(client, [
+        {'user_id': first, 'session_date': yesterday},
+        {'user_id': second, 'session_date': yesterday},
+        {'user_id': second, 'session_date': yesterday},
+    ])
+
+    stats = client.get('/api/tigang/stats/global').get_json()
+    assert stats['total_users'] == 3
+    assert stats['total_training_sessions'] == 6
+    assert stats['today_active_users'] == 2
+    assert stats['total_duration_hours'] == round(6 * 160 / 3600, 1)
+
+    incremental = _snapshot()
+    reconcile_global_stats()
+    assert _snapshot() == incremental
+
+def test_series_is_zero_filled(client, make_user, record_training):
+    user_id = make_user('series_user')
+    record_training(client, user_id)
+
+    start = (date.today() - timedelta(days=6)).isoformat()
+    body = client.get(f'/api/tigang/stats/global/daily?start_date={start}').get_json()
+    assert len(body['days']) == 7
+    assert body['days'][-1]['session_count'] == 1
+    assert body['days'][-1]['active_users'] == 1
+    assert body['days'][-1]['new_users'] == 1
+    assert all(day['session_count'] == 0 for day in body['days'][:-1])
+
+    assert client.get('/api/tigang/stats/global/daily?start_date=bad').status_code == 400
+    assert client.get(f'/api/tigang/stats/global/daily?start_date={date.today().isoformat()}'
+                      f'&end_date={start}').status_code == 400
+
+def test_deleting_user_updates_totals(client, make_user, record_training):
+    user_id = make_user('deleted_user')
+    make_user('kept_user')
+    record_training(client, user_id)
+
+    assert client.delete(f'/api/users/{user_id}').status_code == 200
+    stats = load_global_stats()
+    assert stats['total_users'] == 1
+    assert stats['total_training_sessions'] == 0
+
+def test_deleting_legacy_user_without_summary(client, make_user, record_training):
+    user_id = make_user('legacy_deleted')
+    record_training(client, user_id, times=2)
+    # 尚未回填汇总的历史用户
+    UserTrainingSummary.query.filter_by(user_id=user_id).delete()
+    db.session.commit()
+
+    assert client.delete(f'/api/users/{user_id}').status_code == 200
+    stats = load_global_stats()
+    assert stats['total_users'] == 0
+    assert stats['total_training_sessions'] == 0
+    assert stats['total_duration_hours'] == 0
+
+@pytest.mark.parametrize('upsert', [True, False], ids=['on_conflict', 'portable'])
+def test_increment_upserts_missing_row(app, monkeypatch, upsert):
+    if not upsert:
+        # 没有 ON CONFLICT 的数据库走 UPDATE，然后 INSERT
+        monkeypatch.setattr(global_stats, '_upsert_insert', lambda: None)
+    # 两个写入方都没看到该日期的行：第二次插入在已有行上自增，而不是主键冲突
+    day = date(2024, 3, 1)
+    _increment(day, sessions=1, duration=100, active_users=1)
+    _increment(day, sessions=2, duration=50, new_users=1)
+    db.session.commit()
+
+    row = db.session.get(GlobalDailyStats, day)
+    assert (row.session_count, row.total_duration, row.active_users, row.new_users) == (3, 150, 1, 1)
@@ -0,0 +1,42 @@
+from src.models.user import db, User, TrainingJob
+from src.services import health_stats
+from src.services.health_stats import check_database, get_cached_queue_stats, get_health_stats, invalidate_health_stats
+from src.services.query_budget import QueryBudget
+
+def test_stats_are_cached_between_refreshes(app, make_user):
+    invalidate_health_stats()
+    make_user('health_user')
+    stats = get_health_stats()
+    assert stats['total_users'] == 1
+    assert stats['total_achievements'] == 4
+    assert stats['estimated'] is False
+
+    # 刷新间隔内新增数据不触发重新计数
+    db.session.add(User(username='health_user_2'))
+    db.session.commit()
+    assert get_health_stats()['total_users'] == 1
+
+    health_stats._stats['loaded_at'] -= health_stats.STATS_REFRESH_SECONDS
+    assert get_health_stats()['total_users'] == 2
+    invalidate_health_stats()
+
+def test_check_database_reports_pool(app):
+    status = check_database()
+    assert 'pool' in status
+
+def test_queue_stats_are_cached_with_health_stats(app, make_user):
+    invalidate_health_stats()
+    user_id = make_user('queue_user')
+    db.session.add_all([TrainingJob(user_id=user_id, record_ids='[]'), TrainingJob(user_id=user_id, record_ids='[]', failed=True)])
+    db.session.commit()
+    assert get_cached_queue_stats() == {'pending': 1, 'failed': 1}
+
+    # 就绪检查在刷新间隔内不再对任务表计数
+    db.session.add(TrainingJob(user_id=user_id, record_ids='[]'))
+    db.session.commit()
+    with QueryBudget(0):
+        assert get_cached_queue_stats() == {'pending': 1, 'failed': 1}
+
+    health_stats._stats['loaded_at'] -= health_stats.STATS_REFRESH_SECONDS
+    assert get_cached_queue_stats() == {'pending': 2, 'failed': 1}
+    invalidate_health_stats()
@@ -0,0 +1,51 @@
+import random
+from datetime import date, timedelta
+from sqlalchemy import func
+from src.models.user import db, TrainingRecord, LeaderboardScore
+from src.services.leaderboard import get_leaderboard, get_period_start, rebuild_leaderboards
+from src.services.training_events import apply_recorded_sessions
+
+def _raw_leaderboard(period):
+    """旧实现：直接聚合原始训练记录"""
+    query = db.session.query(TrainingRecord.user_id, func.count(TrainingRecord.id), func.sum(TrainingRecord.total_duration))
+    if period != 'all_time':
+        query = query.filter(TrainingRecord.session_date >= get_period_start(period))
+    return {user_id: (count, duration) for user_id, count, duration in query.group_by(TrainingRecord.user_id)}
+
+def _seed(make_user, rng):
+    for index in range(8):
+        user_id = make_user(f'board_user_{index}')
+        records = []
+        for _ in range(rng.randint(1, 15)):
+            record = TrainingRecord(
+                user_id=user_id, difficulty='beginner', sets_completed=2, reps_completed=16,
+                total_duration=rng.randint(60, 600), contract_time=5, relax_time=5,
+                session_date=date.today() - timedelta(days=rng.randint(0, 90))
+            )
+            db.session.add(record)
+            records.append(record)
+        apply_recorded_sessions(user_id, records)
+        db.session.commit()
+
+def _board(period):
+    return {row.id: (row.session_count, row.total_time) for row in get_leaderboard(period, limit=100)}
+
+def test_rollups_match_raw_aggregate_and_rebuild(app, make_user):
+    _seed(make_user, random.Random(42))
+
+    for period in ('week', 'month', 'all_time'):
+        assert _board(period) == _raw_leaderboard(period)
+
+    incremental = {(s.period_type, s.period_start, s.user_id): s.session_count for s in LeaderboardScore.query}
+    rebuild_leaderboards()
+    rebuilt = {(s.period_type, s.period_start, s.user_id): s.session_count for s in LeaderboardScore.query}
+    assert incremental == rebuilt
+
+def test_leaderboard_endpoint_orders_by_session_count(client, make_user, record_training):
+    first = make_user('board_first')
+    second = make_user('board_second')
+    record_training(client, first, times=3)
+    record_training(client, second)
+
+    data = client.get('/api/tigang/training/leaderboard?period=week').get_json()
+    assert [(e['rank'], e['user_id'], e['session_count']) for e in data['leaderboard']] == [(1, first, 3), (2, second, 1)]
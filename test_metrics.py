@@ -0,0 +1,86 @@
+import os
+import re
+import subprocess
+import sys
+import textwrap
+from src.services.metrics import init_metrics
+
+def test_server_timing_reports_queries_and_durations(app, client, make_user):
+    init_metrics(app)
+    user_id = make_user('timing')
+
+    response = client.get(f'/api/tigang/training/history/{user_id}')
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    match = re.fullmatch(r'db;dur=([\d.]+);desc="(\d+) queries", serialize;dur=([\d.]+), total;dur=([\d.]+)', timing)
+    assert match, timing
+    db_ms, queries, serialize_ms, total_ms = float(match[1]), int(match[2]), float(match[3]), float(match[4])
+    assert queries >= 1
+    assert serialize_ms > 0
+    assert db_ms + serialize_ms <= total_ms
+
+def test_metrics_endpoint_exposes_per_endpoint_histograms(app, client, make_user):
+    app.config['METRICS_TOKEN'] = 'scrape-token'
+    init_metrics(app)
+    user_id = make_user('metrics')
+    client.get(f'/api/tigang/training/stats/{user_id}')
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    labels = 'endpoint="tigang.get_training_stats",method="GET"'
+    assert re.search(r'peed_request_db_queries_count\{%s\} [1-9]' % labels, body)
+    assert 'peed_request_db_duration_seconds_bucket{endpoint="tigang.get_training_stats",le="+Inf",method="GET"}' in body
+    assert f'peed_request_serialization_duration_seconds_sum{{{labels}}}' in body
+    assert f'peed_request_duration_seconds_count{{{labels},status="200"}}' in body
+
+def test_metrics_endpoint_requires_token(app, client):
+    init_metrics(app)
+    # 未配置令牌时不开放
+    assert client.get('/metrics').status_code == 404
+
+def test_metrics_endpoint_rejects_wrong_token(app, client):
+    app.config['METRICS_TOKEN'] = 'scrape-token'
+    init_metrics(app)
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+def test_metrics_disabled(app, client):
+    app.config['METRICS_ENABLED'] = False
+    init_metrics(app)
+    assert 'Server-Timing' not in client.get('/api/tigang/achievements').headers
+    assert client.get('/metrics').status_code == 404
+
+WORKER_SCRIPT = textwrap.dedent('''
+    import sys
+    from flask import Flask
+    from src.models.user import db
+    from src.services.metrics import init_metrics
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', METRICS_TOKEN='scrape-token')
+    db.init_app(app)
+
+    @app.route('/ping')
+    def ping():
+        return {'pong': db.session.execute(db.text('SELECT 1')).scalar()}
+
+    init_metrics(app)
+    client = app.test_client()
+    if sys.argv[1] == 'request':
+        assert client.get('/ping').status_code == 200
+    else:
+        sys.stdout.write(client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'}).get_data(as_text=True))
+''')
+
+def test_metrics_are_aggregated_across_processes(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    run = lambda mode: subprocess.run([sys.executable, '-c', WORKER_SCRIPT, mode], env=env, cwd=os.path.dirname(__file__),
+                                      capture_output=True, text=True, check=True).stdout
+    run('request')
+    run('request')
+
+    body = run('render')
+    assert 'peed_request_db_queries_count{endpoint="ping",method="GET"} 2.0' in body
+    assert 'peed_request_db_queries_sum{endpoint="ping",method="GET"} 2.0' in body
@@ -0,0 +1,25 @@
+from src.services.query_budget import QueryBudget
+
+# 个人资料接口的固定查询预算，与训练记录数、成就数无关
+PROFILE_QUERY_BUDGET = 6
+
+def _get_profile(client, user_id):
+    with QueryBudget(PROFILE_QUERY_BUDGET) as budget:
+        response = client.get(f'/api/profile/{user_id}')
+    assert response.status_code == 200
+    return response.get_json(), budget.count
+
+def test_profile_uses_fixed_query_count(client, make_user, record_training):
+    user_id = make_user('profile_user')
+    record_training(client, user_id)
+    _, few = _get_profile(client, user_id)
+
+    for difficulty in ('intermediate', 'advanced', 'beginner'):
+        record_training(client, user_id, times=5, difficulty=difficulty)
+    profile, many = _get_profile(client, user_id)
+
+    assert many == few
+    assert profile['stats']['total_exercises'] == 16
+    assert len(profile['recent_training']) == 10
+    assert all(a['achievement'] is not None for a in profile['achievements'])
+    assert profile['achievements'][0]['unlocked']
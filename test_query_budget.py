@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import textwrap
+from datetime import date, timedelta
+import pytest
+from src.models.user import User, TrainingRecord, db
+from src.services.query_budget import QueryBudget, QueryBudgetExceeded
+from src.services.training_jobs import run_pending_jobs
+
+# 各接口在种子数据上的查询预算，与用户数、训练记录数无关
+ENDPOINT_BUDGETS = {
+    '/api/profile/{user_id}': 6,
+    '/api/stats/{user_id}': 4,
+    '/api/users': 1,
+    '/api/tigang/training/history/{user_id}': 2,
+    '/api/tigang/training/history/{user_id}?cursor=': 1,
+    '/api/tigang/training/stats/{user_id}': 5,
+    '/api/tigang/training/leaderboard?period=week': 1,
+    '/api/tigang/training/leaderboard?period=all_time': 1,
+    '/api/tigang/achievements': 1,
+    '/api/tigang/achievements/{user_id}': 2,
+    '/api/tigang/stats/global': 1,
+}
+RECORD_BUDGET = 21
+# 异步模式：请求只写入记录与任务，汇总由worker处理
+ASYNC_RECORD_BUDGET = 5
+JOB_BUDGET = 21
+
+@pytest.fixture
+def seeded(client, make_user, record_batch):
+    """几个用户，训练记录覆盖多个难度与日期"""
+    user_ids = [make_user(f'budget_{index}') for index in range(4)]
+    sessions = [
+        {'user_id': user_id, 'difficulty': difficulty,
+         'session_date': (date.today() - timedelta(days=offset)).isoformat()}
+        for user_id in user_ids
+        for offset, difficulty in enumerate(('beginner', 'intermediate', 'advanced', 'beginner', 'beginner'))
+    ]
+    record_batch(client, sessions)
+    return user_ids
+
+@pytest.mark.parametrize('url, budget', ENDPOINT_BUDGETS.items())
+def test_read_endpoints_stay_within_budget(client, seeded, url, budget):
+    with QueryBudget(budget):
+        response = client.get(url.format(user_id=seeded[0]))
+    assert response.status_code == 200
+
+def test_record_endpoint_stays_within_budget(app, client, seeded, record_training):
+    if not app.config['ASYNC_TRAINING_JOBS']:
+        with QueryBudget(RECORD_BUDGET):
+            record_training(client, seeded[0])
+        return
+
+    client.drain_jobs = False
+    with QueryBudget(ASYNC_RECORD_BUDGET):
+        record_training(client, seeded[0])
+    with QueryBudget(JOB_BUDGET):
+        assert run_pending_jobs() == 1
+
+def test_detects_n_plus_one(app, seeded):
+    with pytest.raises(QueryBudgetExceeded, match='N\\+1'):
+        with QueryBudget():
+            # 逐条懒加载用户
+            [record.user.username for record in TrainingRecord.query.all()]
+
+    # 同一语句相同参数重复执行不算N+1
+    with QueryBudget() as budget:
+        for _ in range(5):
+            db.session.execute(db.select(User.username).where(User.id == seeded[0])).all()
+    assert budget.count == 5
+
+def test_budget_as_decorator(app, seeded):
+    @QueryBudget(1)
+    def list_users():
+        return User.query.all() + User.query.all()
+
+    with pytest.raises(QueryBudgetExceeded, match='2 queries executed, budget is 1'):
+        list_users()
+
+# peed-project有自己的src包，在子进程中加载；QueryBudget按文件路径导入并绑定其db
+PEED_PROJECT_SCRIPT = textwrap.dedent('''
+    import importlib.util, os, sys
+    from datetime import date
+    sys.path.insert(0, os.path.join(sys.argv[1], 'peed-project'))
+    import src.models.tigang
+    import main
+    from src.models.tigang import TigangUser, CommunityPost, Leaderboard, db
+
+    spec = importlib.util.spec_from_file_location('query_budget', os.path.join(sys.argv[1], 'src', 'services', 'query_budget.py'))
+    query_budget = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(query_budget)
+
+    with main.app.app_context():
+        users = [TigangUser(username=f'budget_{index}') for index in range(5)]
+        db.session.add_all(users)
+        db.session.flush()
+        for rank, user in enumerate(users, 1):
+            db.session.add(CommunityPost(user_id=user.id, content='hi'))
+            db.session.add(Leaderboard(user_id=user.id, period_type='weekly', period_date=date.today(),
+                                       rank_position=rank, score=10 - rank))
+        db.session.commit()
+        db.session.remove()
+
+        client = main.app.test_client()
+        for url, budget in (('/api/tigang/community/posts', 2), ('/api/tigang/leaderboard/weekly', 1)):
+            with query_budget.QueryBudget(budget):
+                response = client.get(url)
+            assert response.status_code == 200, url
+            assert response.get_json(), url
+''')
+
+def test_peed_project_list_endpoints_have_no_n_plus_one(tmp_path):
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'peed.db'}")
+    result = subprocess.run([sys.executable, '-c', PEED_PROJECT_SCRIPT, root], env=env, cwd=tmp_path,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
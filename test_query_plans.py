@@ -0,0 +1,109 @@
+import os
+import re
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import create_engine, event
+from src.models.user import db
+
+# 每个端点的请求，以及允许整表扫描的表（按设计需要读全表的接口）
+ENDPOINTS = [
+    ('POST', '/api/tigang/training/record', set()),
+    ('GET', '/api/tigang/training/history/{user_id}', set()),
+    ('GET', '/api/tigang/training/history/{user_id}?difficulty=beginner&start_date={start}', set()),
+    ('GET', '/api/tigang/training/history/{user_id}?cursor=&include_total=true', set()),
+    ('GET', '/api/tigang/training/stats/{user_id}', set()),
+    ('GET', '/api/tigang/training/leaderboard?period=week', set()),
+    ('GET', '/api/tigang/training/leaderboard?period=month', set()),
+    ('GET', '/api/tigang/training/leaderboard?period=all_time', set()),
+    ('GET', '/api/tigang/stats/global', set()),
+    ('GET', '/api/tigang/stats/global/daily?start_date={start}', set()),
+    ('GET', '/api/tigang/achievements', {'achievement'}),
+    ('GET', '/api/tigang/achievements/{user_id}', set()),
+    ('POST', '/api/tigang/achievements/check/{user_id}', set()),
+    ('GET', '/api/profile/{user_id}', set()),
+    ('GET', '/api/stats/{user_id}', set()),
+    ('POST', '/api/wallet/{user_id}', set()),
+    ('GET', '/api/users', {'user'}),
+]
+
+def _sqlite_full_scans(connection, statement, parameters):
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    scans = set()
+    for row in rows:
+        match = re.match(r'SCAN (\w+)( AS \w+)?$', row[-1])
+        if match:
+            scans.add(match.group(1))
+    return scans
+
+def _postgres_full_scans(connection, statement, parameters):
+    rows = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).fetchall()
+    return {match.group(1).strip('"') for (line,) in rows for match in [re.search(r'Seq Scan on (\S+)', line)] if match}
+
+def _collect_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements, lambda: event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def _seed(client, make_user, record_training):
+    user_id = make_user('plan_user')
+    make_user('plan_user_2')
+    record_training(client, user_id, times=3)
+    return user_id
+
+def _check_endpoints(app, client, user_id, explain, training_payload):
+    start = (date.today() - timedelta(days=7)).isoformat()
+    failures = []
+    for method, url_template, allowed in ENDPOINTS:
+        url = url_template.format(user_id=user_id, start=start)
+        statements, stop = _collect_statements(db.engine)
+        try:
+            if method == 'POST' and 'training/record' in url:
+                response = client.post(url, json={'user_id': user_id, **training_payload})
+            elif method == 'POST' and '/wallet/' in url:
+                response = client.post(url, json={'wallet_address': f'addr-{user_id}', 'wallet_type': 'phantom'})
+            else:
+                response = client.open(url, method=method)
+        finally:
+            stop()
+        assert response.status_code < 400, (url, response.status_code)
+
+        with db.engine.connect() as connection:
+            for statement, parameters in statements:
+                # 只关心真实数据表，子查询/临时结果的扫描不算
+                scans = (explain(connection, statement, parameters) & set(db.metadata.tables)) - allowed
+                if scans:
+                    failures.append(f'{method} {url_template}: full scan on {sorted(scans)}\n    {statement}')
+    assert not failures, '\n'.join(failures)
+
+def test_sqlite_endpoints_use_indexes(app, client, make_user, training_payload, record_training):
+    user_id = _seed(client, make_user, record_training)
+    _check_endpoints(app, client, user_id, _sqlite_full_scans, training_payload)
+
+@pytest.mark.skipif(not os.getenv('PEED_TEST_POSTGRES_URL'), reason='PEED_TEST_POSTGRES_URL not set')
+def test_postgres_endpoints_use_indexes(app, client, make_user, training_payload, record_training):
+    """在PostgreSQL上运行同一检查；关闭seqscan后仍出现Seq Scan说明没有可用索引"""
+    engine = create_engine(os.environ['PEED_TEST_POSTGRES_URL'])
+
+    @event.listens_for(engine, 'connect')
+    def disable_seqscan(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('SET enable_seqscan = off')
+        cursor.close()
+
+    original_engine = db.engines[None]
+    db.engines[None] = engine
+    try:
+        db.drop_all()
+        db.create_all()
+        user_id = _seed(client, make_user, record_training)
+        _check_endpoints(app, client, user_id, _postgres_full_scans, training_payload)
+    finally:
+        db.session.remove()
+        db.drop_all()
+        db.engines[None] = original_engine
+        engine.dispose()
@@ -0,0 +1,132 @@
+import threading
+import time
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from src.models.user import AchievementNotification, TrainingRecord, User, db
+from src.routes.user import user_bp
+from src.routes.tigang import tigang_bp
+from src.services import replicas
+from src.services.achievements import invalidate_achievement_catalogue
+from src.services.replicas import REPLICA_STICKY_COOKIE, get_replica_router, init_replicas, replica_binds
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """主库与一个落后的只读副本（两个SQLite文件）"""
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+        SQLALCHEMY_BINDS=replica_binds([f"sqlite:///{tmp_path / 'replica.db'}"]),
+        REPLICA_CHECK_INTERVAL=60,
+    )
+    db.init_app(app)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(tigang_bp, url_prefix='/api/tigang')
+    init_replicas(app)
+
+    with app.app_context():
+        db.create_all()
+        replica = db.engines['replica_1']
+        db.metadata.create_all(replica)
+        invalidate_achievement_catalogue()
+        yield app
+        get_replica_router().stop()
+        db.session.remove()
+        db.drop_all()
+        db.metadata.drop_all(replica)
+    # init_app为每个bind创建了（空的）metadata，其他测试应用没有这个bind
+    db.metadatas.pop('replica_1', None)
+
+def _replicate(app):
+    """把主库的用户复制到副本（训练记录不复制，模拟复制延迟），并等待一次副本检查"""
+    with db.engines['replica_1'].begin() as replica:
+        for user in User.query.all():
+            replica.execute(User.__table__.insert(), {'id': user.id, 'username': user.username})
+    get_replica_router().refresh(force=True)
+
+def test_read_only_endpoints_use_replica(replica_app, record_training):
+    client = replica_app.test_client()
+    user_id = client.post('/api/auth/register', json={'username': 'reader'}).get_json()['id']
+    record_training(client, user_id)
+    _replicate(replica_app)
+    assert TrainingRecord.query.count() == 1
+
+    # 新客户端（没有写入标记）读副本：副本上还没有训练记录
+    reader = replica_app.test_client()
+    assert reader.get(f'/api/tigang/training/history/{user_id}').get_json()['total'] == 0
+    assert get_replica_router().stats()['replica_1']['healthy']
+
+def test_client_reads_its_own_writes_from_primary(replica_app, record_training):
+    client = replica_app.test_client()
+    user_id = client.post('/api/auth/register', json={'username': 'writer'}).get_json()['id']
+    _replicate(replica_app)
+
+    response = record_training(client, user_id)
+    assert REPLICA_STICKY_COOKIE in response.headers['Set-Cookie']
+    assert client.get(f'/api/tigang/training/history/{user_id}').get_json()['total'] == 1
+
+def test_notifications_are_read_from_replica_and_acknowledged_on_primary(replica_app, record_training):
+    client = replica_app.test_client()
+    user_id = client.post('/api/auth/register', json={'username': 'notified'}).get_json()['id']
+    record_training(client, user_id)
+    db.session.add(AchievementNotification(user_id=user_id, achievement_id=1))
+    db.session.commit()
+    _replicate(replica_app)
+
+    # 统计接口只读副本，不在主库删除通知
+    url = f'/api/tigang/training/stats/{user_id}'
+    for _ in range(2):
+        assert replica_app.test_client().get(url).status_code == 200
+    db.session.expire_all()
+    assert AchievementNotification.query.filter_by(user_id=user_id).count() == 1
+
+    # 确认在主库执行
+    response = replica_app.test_client().post(f'/api/tigang/achievements/notifications/{user_id}/ack')
+    assert response.get_json() == {'acknowledged': 1}
+    assert AchievementNotification.query.filter_by(user_id=user_id).count() == 0
+
+def test_lagging_or_failed_replica_falls_back_to_primary(replica_app, record_training, monkeypatch):
+    client = replica_app.test_client()
+    user_id = client.post('/api/auth/register', json={'username': 'fallback'}).get_json()['id']
+    record_training(client, user_id)
+    _replicate(replica_app)
+    router = get_replica_router()
+    url = f'/api/tigang/training/history/{user_id}'
+
+    monkeypatch.setattr(replicas, 'measure_lag', lambda connection: 30.0)
+    router.refresh(force=True)
+    assert router.stats()['replica_1'] == {'healthy': False, 'lag': 30.0, 'error': None}
+    assert replica_app.test_client().get(url).get_json()['total'] == 1
+
+    # 检查时可用、请求中途失败的副本：标记为不可用并在主库上重试
+    monkeypatch.setattr(replicas, 'measure_lag', lambda connection: 0.0)
+    router.refresh(force=True)
+    with db.engines['replica_1'].begin() as replica:
+        replica.execute(text('DROP TABLE training_record'))
+    assert replica_app.test_client().get(url).get_json()['total'] == 1
+    assert not router.stats()['replica_1']['healthy']
+
+def test_requests_never_wait_for_replica_checks(replica_app, monkeypatch):
+    router = get_replica_router()
+    router.stop()
+    checking = threading.Event()
+    release = threading.Event()
+    def slow_lag(connection):
+        checking.set()
+        release.wait(5)
+        return 0.0
+    monkeypatch.setattr(replicas, 'measure_lag', slow_lag)
+
+    # 后台检查卡在副本连接上时，请求沿用上次结果（尚未检查：读主库）立即返回
+    router.pid = None
+    started = time.monotonic()
+    response = replica_app.test_client().get('/api/tigang/achievements')
+    assert time.monotonic() - started < 1
+    assert response.status_code == 200
+    assert checking.wait(5)
+    assert not router.stats()['replica_1']['healthy']
+    assert router.choose() is None
+    release.set()
+    router.stop()
+    assert router.stats()['replica_1']['healthy']
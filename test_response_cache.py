@@ -0,0 +1,54 @@
+from src.services.response_cache import get_cache_stats
+
+def test_hit_etag_and_304(app, client):
+    first = client.get('/api/tigang/training/config')
+    assert first.status_code == 200
+    assert first.headers['X-Cache'] == 'MISS'
+    assert 'public' in first.headers['Cache-Control']
+    assert 's-maxage=' in first.headers['Cache-Control']
+    etag = first.headers['ETag']
+
+    second = client.get('/api/tigang/training/config')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.headers['ETag'] == etag
+    assert second.data == first.data
+
+    not_modified = client.get('/api/tigang/training/config', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+    with app.app_context():
+        counters = get_cache_stats()['namespaces']['training_config']
+    assert counters['misses'] == 1
+    assert counters['hits'] == 2
+    assert counters['not_modified'] == 1
+
+def test_query_args_are_separate_entries(client, make_user):
+    make_user('cache_user')
+    week = client.get('/api/tigang/training/leaderboard?period=week')
+    month = client.get('/api/tigang/training/leaderboard?period=month')
+    assert week.get_json()['period'] == 'week'
+    assert month.get_json()['period'] == 'month'
+    assert month.headers['X-Cache'] == 'MISS'
+
+def test_training_write_invalidates_stats_and_leaderboard(client, make_user, record_training):
+    user_id = make_user('cache_writer')
+    before = client.get('/api/tigang/stats/global').get_json()
+    client.get('/api/tigang/training/leaderboard?period=all_time')
+    assert client.get('/api/tigang/stats/global').headers['X-Cache'] == 'HIT'
+
+    response = record_training(client, user_id)
+    assert response.status_code == 201
+
+    stats = client.get('/api/tigang/stats/global')
+    assert stats.headers['X-Cache'] == 'MISS'
+    assert stats.get_json()['total_training_sessions'] == before['total_training_sessions'] + 1
+
+    leaderboard = client.get('/api/tigang/training/leaderboard?period=all_time').get_json()['leaderboard']
+    assert [row['user_id'] for row in leaderboard] == [user_id]
+
+def test_cache_can_be_disabled(app, client):
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    client.get('/api/tigang/achievements')
+    response = client.get('/api/tigang/achievements')
+    assert 'X-Cache' not in response.headers
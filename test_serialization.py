@@ -0,0 +1,57 @@
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+from src.models.user import Achievement, TrainingRecord, User, db
+from src.services.serialization import (
+    ACHIEVEMENT_COLUMNS, TRAINING_RECORD_COLUMNS, USER_COLUMNS, FastJSONProvider, project, rows_to_dicts
+)
+
+SAMPLES = [
+    {'b': 1, 'a': [1, 2.5, None, True, False], 'nested': {'z': 'x', 'y': []}},
+    {'name': '初试身手', 'emoji': '🔥', 'del': 'a\x7fb', 'control': '\x00\x1f\n\t"\\/'},
+    {'when': datetime(2024, 1, 2, 3, 4, 5, 678), 'day': date(2024, 1, 2), 'amount': Decimal('1.50')},
+    {'floats': [0.1, 1 / 3, 123456.7, -0.0, 10.00001], 'id': uuid.UUID(int=1)},
+    {'small': [1e-05, -2.5e-07], 'large': {'x': 1e16}, 'text': 'e5,1e16]'},
+    {'big': 2 ** 70},
+    {'nan': float('nan'), 'inf': [float('inf'), -float('inf')], 'none': None},
+    [{'ratio': float('nan')}, (1.5, float('-inf'))],
+    {10: 'int keys', 9: 'sorted numerically'},
+    [],
+    'plain string',
+]
+
+@pytest.mark.parametrize('payload', SAMPLES)
+def test_fast_provider_matches_default_bytes(app, payload):
+    with app.test_request_context():
+        fast = jsonify(payload).get_data()
+        app.json = DefaultJSONProvider(app)
+        expected = jsonify(payload).get_data()
+    assert fast == expected
+
+def test_debug_mode_keeps_indented_output(app):
+    app.debug = True
+    with app.test_request_context():
+        assert jsonify({'a': 1}).get_data() == b'{\n  "a": 1\n}\n'
+
+def test_projected_rows_match_to_dict(app, client, make_user, record_training):
+    user_id = make_user('projection_user')
+    record_training(client, user_id)
+
+    for model, fields in ((User, USER_COLUMNS), (TrainingRecord, TRAINING_RECORD_COLUMNS), (Achievement, ACHIEVEMENT_COLUMNS)):
+        objects = model.query.order_by(model.id).all()
+        rows = db.session.query(*project(model, fields)).order_by(model.id).all()
+        assert rows_to_dicts(rows) == [obj.to_dict() for obj in objects]
+
+def test_list_endpoints_are_byte_identical(app, client, make_user, record_training):
+    user_id = make_user('用户')
+    for _ in range(3):
+        record_training(client, user_id)
+    urls = ['/api/users', '/api/tigang/achievements', f'/api/tigang/training/history/{user_id}',
+            f'/api/tigang/training/history/{user_id}?cursor=&per_page=2', '/api/tigang/training/leaderboard']
+
+    fast = [client.get(url).get_data() for url in urls]
+    app.json = DefaultJSONProvider(app)
+    assert [client.get(url).get_data() for url in urls] == fast
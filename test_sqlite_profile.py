@@ -0,0 +1,114 @@
+import multiprocessing
+import threading
+from sqlalchemy import create_engine, text
+from src.services.sqlite_profile import SQLiteWriterLock, configure_sqlite_engine, sqlite_engine_options
+
+def _tuned_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}", **sqlite_engine_options(busy_timeout_ms=2000, pool_size=4))
+    return engine, configure_sqlite_engine(engine, busy_timeout_ms=2000)
+
+def test_connections_use_tuned_pragmas(tmp_path):
+    engine, _ = _tuned_engine(tmp_path)
+    with engine.connect() as connection:
+        pragma = lambda name: connection.execute(text(f'PRAGMA {name}')).scalar()
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1  # NORMAL
+        assert pragma('busy_timeout') == 2000
+        assert pragma('temp_store') == 2  # MEMORY
+        assert pragma('cache_size') == -16000
+    engine.dispose()
+
+def test_writer_lock_is_held_until_commit_or_rollback(tmp_path):
+    engine, writer = _tuned_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)'))
+        connection.execute(text('INSERT INTO counter VALUES (1, 0)'))
+    assert not writer._lock.locked()
+
+    with engine.connect() as connection:
+        connection.execute(text('SELECT value FROM counter')).all()
+        assert not writer._lock.locked()  # 读不占用写者锁
+        connection.execute(text('UPDATE counter SET value = value + 1'))
+        assert writer._lock.locked()
+        connection.rollback()
+        assert not writer._lock.locked()
+
+    # 未提交直接归还连接池也会释放
+    with engine.connect() as connection:
+        connection.execute(text('UPDATE counter SET value = value + 1'))
+    assert not writer._lock.locked()
+    engine.dispose()
+
+def test_concurrent_read_then_write_transactions(tmp_path):
+    engine, _ = _tuned_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)'))
+        connection.execute(text('INSERT INTO counter VALUES (1, 0)'))
+
+    errors = []
+
+    def work():
+        try:
+            for _ in range(25):
+                with engine.begin() as connection:
+                    connection.execute(text('SELECT value FROM counter WHERE id = 1')).scalar()
+                    connection.execute(text('UPDATE counter SET value = value + 1 WHERE id = 1'))
+        except Exception as e:  # 测试中收集所有线程的错误
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with engine.connect() as connection:
+        assert connection.execute(text('SELECT value FROM counter')).scalar() == 200
+    engine.dispose()
+
+def test_writer_lock_excludes_other_processes(tmp_path):
+    # 两个实例各自打开锁文件，与两个进程的情况相同
+    lock_path = str(tmp_path / 'tuned.db.lock')
+    first, second = SQLiteWriterLock(1, lock_path), SQLiteWriterLock(0.05, lock_path)
+    first_info, second_info = {}, {}
+
+    first.acquire(first_info)
+    assert first_info['sqlite_writer']
+    second.acquire(second_info)
+    assert 'sqlite_writer' not in second_info  # 超时后交给SQLite的busy_timeout
+    assert not second._lock.locked()
+
+    first.release(first_info)
+    second.acquire(second_info)
+    assert second_info['sqlite_writer']
+    second.release(second_info)
+
+def _hold_lock(writer, acquired, done):
+    info = {}
+    writer.acquire(info)
+    acquired.put(info.get('sqlite_writer', False))
+    done.wait(5)
+    writer.release(info)
+
+def test_forked_worker_reopens_lock_file(tmp_path):
+    # gunicorn preload时worker继承父进程打开的锁文件；共用同一个打开的文件时flock互不排斥
+    writer = SQLiteWriterLock(0.05, str(tmp_path / 'tuned.db.lock'))
+    info = {}
+    writer.acquire(info)
+    writer.release(info)
+
+    context = multiprocessing.get_context('fork')
+    acquired, done = context.Queue(), context.Event()
+    process = context.Process(target=_hold_lock, args=(writer, acquired, done))
+    process.start()
+    try:
+        assert acquired.get(timeout=5) is True
+        writer.acquire(info)
+        assert 'sqlite_writer' not in info
+    finally:
+        done.set()
+        process.join()
+    writer.acquire(info)
+    assert info['sqlite_writer']
+    writer.release(info)
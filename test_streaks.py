@@ -0,0 +1,109 @@
+import random
+from datetime import date, timedelta
+from sqlalchemy import insert
+from src.models.user import db, TrainingRecord, UserTrainingSummary
+from src.services import training_summary
+from src.services.streaks import effective_streak
+from src.services.training_summary import apply_training_records, backfill_streaks, get_training_summary
+
+def _add_sessions(user_id, session_dates):
+    records = []
+    for session_date in session_dates:
+        record = TrainingRecord(
+            user_id=user_id, difficulty='beginner', sets_completed=2, reps_completed=16,
+            total_duration=160, contract_time=5, relax_time=5, session_date=session_date
+        )
+        db.session.add(record)
+        records.append(record)
+    apply_training_records(user_id, records)
+    db.session.commit()
+
+def _full_scan_streak(user_id):
+    """参考实现：扫描用户全部训练日期，计算截止今天或昨天的连续天数"""
+    training_dates = sorted({d for (d,) in db.session.query(TrainingRecord.session_date).filter_by(user_id=user_id)},
+                            reverse=True)
+    streak = 0
+    current_date = date.today()
+    for training_date in training_dates:
+        if training_date == current_date or training_date == current_date - timedelta(days=1):
+            streak += 1
+            current_date = training_date - timedelta(days=1)
+        else:
+            break
+    return streak
+
+def _random_history(rng):
+    """生成带随机间隔的训练日期，最近一天可能是今天、昨天或更早"""
+    today = date.today()
+    current = today - timedelta(days=rng.randint(0, 4))
+    dates = []
+    for _ in range(rng.randint(1, 40)):
+        dates.extend([current] * rng.randint(1, 3))
+        current -= timedelta(days=rng.choice([1, 1, 1, 2, 2, 3, 5]))
+    return dates
+
+def test_incremental_streak_matches_full_scan(app, make_user):
+    rng = random.Random(20240710)
+    for index in range(60):
+        user_id = make_user(f'streak_user_{index}')
+        history = _random_history(rng)
+
+        # 按时间顺序逐次记录，偶尔打乱以覆盖离线补录
+        ordered = sorted(history)
+        if index % 5 == 0:
+            rng.shuffle(ordered)
+        for session_date in ordered:
+            _add_sessions(user_id, [session_date])
+
+        summary, _ = get_training_summary(user_id)
+        expected = _full_scan_streak(user_id)
+        assert effective_streak(summary) == expected
+        assert summary.longest_streak >= expected
+
+def test_streak_decays_lazily_when_day_missed(app, make_user):
+    user_id = make_user('decay_user')
+    _add_sessions(user_id, [date.today() - timedelta(days=4), date.today() - timedelta(days=3)])
+
+    summary, _ = get_training_summary(user_id)
+    assert summary.current_streak == 2
+    assert summary.longest_streak == 2
+    assert effective_streak(summary) == 0
+    assert effective_streak(summary, today=date.today() - timedelta(days=2)) == 2
+
+def test_backfill_matches_full_scan(app, make_user):
+    rng = random.Random(7)
+    user_ids = []
+    for index in range(10):
+        user_id = make_user(f'backfill_user_{index}')
+        _add_sessions(user_id, _random_history(rng))
+        user_ids.append(user_id)
+
+    UserTrainingSummary.query.update({'current_streak': 0, 'longest_streak': 0})
+    db.session.commit()
+
+    assert backfill_streaks() == len(user_ids)
+    db.session.expire_all()
+    for user_id in user_ids:
+        summary = db.session.get(UserTrainingSummary, user_id)
+        assert effective_streak(summary) == _full_scan_streak(user_id)
+
+def test_concurrent_first_session_increments_existing_summary(app, make_user, monkeypatch):
+    user_id = make_user('racing_user')
+    original = training_summary.compute_training_summary
+
+    def competing_insert(uid):
+        # 模拟另一请求在本次读取汇总行之后、写入之前提交了首次训练的汇总
+        result = original(uid)
+        db.session.execute(insert(UserTrainingSummary).values(
+            user_id=uid, total_sessions=1, total_duration=100, total_sets=1, total_reps=8,
+            current_streak=1, longest_streak=1, last_session_date=date.today()
+        ))
+        return result
+
+    monkeypatch.setattr(training_summary, 'compute_training_summary', competing_insert)
+    _add_sessions(user_id, [date.today()])
+
+    db.session.expire_all()
+    summary = db.session.get(UserTrainingSummary, user_id)
+    assert summary.total_sessions == 2
+    assert summary.total_duration == 260
@@ -0,0 +1,29 @@
+from datetime import datetime
+from src.cli import register_commands
+from src.models.user import TrainingRecord, User, UserTrainingSummary, db
+from src.services.global_stats import load_global_stats
+from src.services.synthetic_data import SyntheticPopulation
+
+def test_population_is_reproducible():
+    first = list(SyntheticPopulation(5, 20, days=60, seed=7).record_rows(range(5)))
+    second = list(SyntheticPopulation(5, 20, days=60, seed=7).record_rows(range(5)))
+    assert first == second
+    assert first != list(SyntheticPopulation(5, 20, days=60, seed=8).record_rows(range(5)))
+
+def test_generate_data_loads_records_and_rollups(app):
+    register_commands(app)
+    result = app.test_cli_runner().invoke(args=[
+        'generate-data', '--users', '30', '--sessions', '20', '--days', '90', '--batch-size', '100'
+    ])
+    assert result.exit_code == 0, result.output
+
+    db.session.expire_all()
+    assert User.query.filter(User.username.like('synthetic_%')).count() == 30
+    record_count = TrainingRecord.query.count()
+    assert record_count > 0
+    assert isinstance(TrainingRecord.query.first().created_at, datetime)
+
+    summaries = UserTrainingSummary.query.all()
+    assert sum(summary.total_sessions for summary in summaries) == record_count
+    assert any(summary.longest_streak > 1 for summary in summaries)
+    assert load_global_stats()['total_training_sessions'] == record_count
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+from src.models.user import db, TrainingRecord, UserAchievement
+from src.services.streaks import effective_streak
+from src.services.training_summary import get_training_summary
+
+def test_batch_records_sessions_for_many_users(client, make_user, training_payload):
+    first = make_user('batch_first')
+    second = make_user('batch_second')
+    sessions = [
+        {'user_id': first, **training_payload, 'session_date': (date.today() - timedelta(days=offset)).isoformat()}
+        for offset in (3, 0, 2, 1)
+    ] + [
+        {'user_id': second, **training_payload, 'created_at': '2024-05-01T08:00:00Z'},
+        {'user_id': 9999, **training_payload},
+        {'user_id': second, 'difficulty': 'beginner'},
+        {'user_id': second, **training_payload, 'session_date': (date.today() + timedelta(days=1)).isoformat()},
+    ]
+
+    response = client.post('/api/tigang/training/records/batch', json={'sessions': sessions})
+    assert response.status_code == 207
+    data = response.get_json()
+    assert data['created'] == 5
+    assert [r['status'] for r in data['results']] == ['created'] * 5 + ['error'] * 3
+    assert data['results'][5]['error'] == 'User not found'
+
+    assert TrainingRecord.query.filter_by(user_id=first).count() == 4
+    summary, _ = get_training_summary(first)
+    assert summary.total_sessions == 4
+    assert effective_streak(summary) == 4  # 今天起连续4天
+
+    unlocked = UserAchievement.query.filter_by(user_id=second, unlocked=True).count()
+    assert unlocked == 1
+
+def test_batch_rejects_empty_and_all_invalid(client, make_user):
+    assert client.post('/api/tigang/training/records/batch', json={'sessions': []}).status_code == 400
+    response = client.post('/api/tigang/training/records/batch', json={'sessions': [{'user_id': 1}]})
+    assert response.status_code == 400
+    assert response.get_json()['failed'] == 1
+
+def test_batch_rejects_bool_user_id_and_unknown_difficulty(client, make_user, training_payload):
+    user_id = make_user('batch_validated')
+    sessions = [
+        {'user_id': user_id, **training_payload},
+        {**training_payload, 'user_id': True},
+        {'user_id': user_id, **training_payload, 'difficulty': 'legendary'},
+        {'user_id': user_id, **training_payload, 'difficulty': ['beginner']},
+    ]
+
+    response = client.post('/api/tigang/training/records/batch', json={'sessions': sessions})
+    assert response.status_code == 207
+    assert [(r['status'], r.get('error')) for r in response.get_json()['results']] == [
+        ('created', None), ('error', 'Invalid user_id'), ('error', 'Invalid difficulty'), ('error', 'Invalid difficulty')
+    ]
+    assert TrainingRecord.query.count() == 1
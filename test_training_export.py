@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+from src.models.user import TrainingRecord
+from src.services import training_export
+
+def test_ndjson_export_streams_all_records_in_chunks(client, make_user, seed_records, monkeypatch):
+    monkeypatch.setattr(training_export, 'EXPORT_CHUNK_SIZE', 4)
+    user_id = make_user('export_user')
+    seed_records(user_id, 10)
+
+    response = client.get(f'/api/tigang/training/export/{user_id}', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'attachment' in response.headers['Content-Disposition']
+    chunks = list(response.response)
+    response.close()
+    assert len(chunks) == 3
+
+    lines = b''.join(chunks).decode().splitlines()
+    expected = TrainingRecord.query.filter_by(user_id=user_id)\
+        .order_by(TrainingRecord.created_at, TrainingRecord.id).all()
+    assert [json.loads(line) for line in lines] == [record.to_dict() for record in expected]
+
+def test_csv_export_with_date_filter(client, make_user, seed_records):
+    user_id = make_user('csv_export_user')
+    seed_records(user_id, 10)
+
+    response = client.get(f'/api/tigang/training/export/{user_id}?format=csv&start_date=2024-01-03&end_date=2024-01-04')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 4
+    assert all('2024-01-03' <= row['session_date'] <= '2024-01-04' for row in rows)
+
+    empty = client.get(f'/api/tigang/training/export/{user_id}?format=csv&start_date=2030-01-01')
+    assert empty.get_data(as_text=True).splitlines() == [','.join(training_export.TRAINING_RECORD_COLUMNS)]
+
+def test_export_validates_parameters(client, make_user):
+    user_id = make_user('export_params_user')
+    assert client.get(f'/api/tigang/training/export/{user_id}?format=xml').status_code == 400
+    assert client.get(f'/api/tigang/training/export/{user_id}?start_date=bad').status_code == 400
+    assert client.get('/api/tigang/training/export/999').status_code == 404
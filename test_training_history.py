@@ -0,0 +1,59 @@
+def _walk(client, url):
+    records = []
+    cursor = ''
+    pages = 0
+    while cursor is not None:
+        response = client.get(f'{url}&cursor={cursor}')
+        assert response.status_code == 200
+        data = response.get_json()
+        records.extend(data['training_records'])
+        cursor = data['next_cursor']
+        pages += 1
+    return records, pages
+
+def test_cursor_pages_match_offset_order(client, make_user, seed_records):
+    user_id = make_user('history_user')
+    seed_records(user_id, 25)
+
+    records, pages = _walk(client, f'/api/tigang/training/history/{user_id}?per_page=10')
+    assert pages == 3
+    assert len({r['id'] for r in records}) == 25
+
+    keys = [(r['created_at'], r['id']) for r in records]
+    assert keys == sorted(keys, reverse=True)
+
+def test_cursor_keeps_filters_and_counts_total(client, make_user, seed_records, record_training):
+    user_id = make_user('history_filter_user')
+    seed_records(user_id, 12)
+    record_training(client, user_id, difficulty='advanced', sets_completed=4, reps_completed=60,
+                    total_duration=600, contract_time=12, relax_time=6)
+
+    records, _ = _walk(client, f'/api/tigang/training/history/{user_id}?per_page=2&difficulty=advanced')
+    assert records and all(r['difficulty'] == 'advanced' for r in records)
+
+    data = client.get(f'/api/tigang/training/history/{user_id}?cursor=&include_total=true&difficulty=advanced').get_json()
+    assert data['total'] == len(records)
+    data = client.get(f'/api/tigang/training/history/{user_id}?cursor=&include_total=true').get_json()
+    assert data['total'] == 13
+    data = client.get(f'/api/tigang/training/history/{user_id}?cursor=&include_total=true&start_date=2024-01-03').get_json()
+    assert all(r['session_date'] >= '2024-01-03' for r in data['training_records'])
+    filtered, _ = _walk(client, f'/api/tigang/training/history/{user_id}?per_page=5&start_date=2024-01-03')
+    assert data['total'] == len(filtered)
+    paged = client.get(f'/api/tigang/training/history/{user_id}?start_date=2024-01-03&difficulty=beginner').get_json()
+    assert paged['total'] == sum(1 for r in filtered if r['difficulty'] == 'beginner')
+
+def test_page_total_matches_paginated_records(client, make_user, seed_records):
+    user_id = make_user('history_total_user')
+    # 直接写入原始记录，不经过汇总表：总数必须与实际可翻页的记录一致
+    seed_records(user_id, 7)
+
+    data = client.get(f'/api/tigang/training/history/{user_id}?per_page=3').get_json()
+    assert (data['total'], data['pages']) == (7, 3)
+    last = client.get(f'/api/tigang/training/history/{user_id}?per_page=3&page=3').get_json()
+    assert len(last['training_records']) == 1
+    data = client.get(f'/api/tigang/training/history/{user_id}?cursor=&include_total=true').get_json()
+    assert data['total'] == 7
+
+def test_invalid_cursor_rejected(client, make_user):
+    user_id = make_user('history_bad_cursor')
+    assert client.get(f'/api/tigang/training/history/{user_id}?cursor=not-a-cursor').status_code == 400
@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from src.models.user import (
+    AchievementNotification, GlobalDailyStats, TrainingJob, TrainingRecord, User, UserTrainingSummary, db
+)
+from src.services import training_events, training_jobs
+from src.services.achievements import invalidate_achievement_catalogue
+from src.services.leaderboard import ALL_TIME_START
+from src.services.training_jobs import MAX_JOB_ATTEMPTS, process_user_jobs, retry_failed_jobs, run_pending_jobs
+
+# 只在异步模式下运行
+pytestmark = pytest.mark.parametrize('app', ['async'], indirect=True)
+
+@pytest.fixture
+def async_app(app, client):
+    # 测试中不启动worker线程，也不在请求后自动处理，由测试显式处理队列
+    client.drain_jobs = False
+    return app
+
+def _summary(user_id):
+    db.session.expire_all()
+    summary = db.session.get(UserTrainingSummary, user_id)
+    return (summary.total_sessions, summary.total_duration) if summary else None
+
+def test_async_write_defers_aggregates_until_processed(async_app, client, make_user, record_batch, record_training):
+    user_id = make_user('async_user')
+    record_training(client, user_id)
+    record_batch(client, [{'user_id': user_id}, {'user_id': user_id}])
+
+    assert TrainingRecord.query.filter_by(user_id=user_id).count() == 3
+    assert TrainingJob.query.count() == 2
+    assert _summary(user_id) is None
+
+    assert run_pending_jobs() == 2
+    assert TrainingJob.query.count() == 0
+    assert _summary(user_id) == (3, 480)
+
+    stats = client.get(f'/api/tigang/training/stats/{user_id}').get_json()
+    assert stats['total_sessions'] == 3
+    assert [a['name_en'] for a in stats['new_achievements']] == ['First Steps']
+    # 读取不删除通知：重试或预取的GET不会丢失，确认后才不再下发
+    assert client.get(f'/api/tigang/training/stats/{user_id}').get_json()['new_achievements'] == stats['new_achievements']
+    profile = client.get(f'/api/profile/{user_id}').get_json()
+    assert profile['new_achievements'] == stats['new_achievements']
+    assert profile['achievements'][0]['unlocked']
+
+    notification_id = stats['new_achievements'][0]['notification_id']
+    response = client.post(f'/api/tigang/achievements/notifications/{user_id}/ack', json={'up_to': notification_id})
+    assert response.get_json() == {'acknowledged': 1}
+    assert client.get(f'/api/tigang/training/stats/{user_id}').get_json()['new_achievements'] == []
+    assert client.get(f'/api/profile/{user_id}').get_json()['new_achievements'] == []
+
+def test_acknowledge_keeps_notifications_newer_than_up_to(client, make_user):
+    user_id = make_user('ack_user')
+    first = AchievementNotification(user_id=user_id, achievement_id=1)
+    db.session.add(first)
+    db.session.commit()
+    up_to = first.id
+    # 客户端读取之后才解锁的成就不会被确认掉
+    db.session.add(AchievementNotification(user_id=user_id, achievement_id=2))
+    db.session.commit()
+
+    url = f'/api/tigang/achievements/notifications/{user_id}/ack'
+    assert client.post(url, json={'up_to': 'all'}).status_code == 400
+    assert client.post(url, json={'up_to': up_to}).get_json() == {'acknowledged': 1}
+    remaining = client.get(f'/api/tigang/training/stats/{user_id}').get_json()['new_achievements']
+    assert [a['name_en'] for a in remaining] == ['7-Day Streak']
+    assert client.post(url).get_json() == {'acknowledged': 1}
+    assert client.post('/api/tigang/achievements/notifications/999/ack').status_code == 404
+
+def test_claimed_jobs_are_not_applied_twice(async_app, client, make_user, record_training):
+    user_id = make_user('claim_user')
+    record_training(client, user_id)
+
+    assert process_user_jobs(user_id) == 1
+    # 已认领（删除）的任务不会再次计入
+    assert process_user_jobs(user_id) == 0
+    assert _summary(user_id) == (1, 160)
+
+def test_failed_job_backs_off_and_is_marked_failed(async_app, client, make_user, record_training, monkeypatch):
+    user_id = make_user('failing_user')
+    record_training(client, user_id)
+
+    def broken(user_id, records):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(training_jobs, 'apply_recorded_sessions', broken)
+
+    for attempt in range(1, MAX_JOB_ATTEMPTS + 1):
+        with pytest.raises(RuntimeError):
+            process_user_jobs(user_id)
+        job = TrainingJob.query.one()
+        assert job.attempts == attempt
+        assert job.available_at > datetime.utcnow()
+        # 退避期内不会被轮询处理
+        assert run_pending_jobs() == 0
+        job.available_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+    assert job.failed and 'boom' in job.last_error
+    assert json.loads(job.record_ids)
+    assert _summary(user_id) is None
+
+    monkeypatch.undo()
+    assert retry_failed_jobs() == 1
+    assert run_pending_jobs() == 1
+    assert _summary(user_id) == (1, 160)
+
+def test_busy_and_failing_users_do_not_block_others(async_app, client, make_user, record_training, monkeypatch):
+    busy, failing, idle = make_user('busy_user'), make_user('failing_user'), make_user('idle_user')
+    for user_id in (busy, failing, idle):
+        record_training(client, user_id)
+
+    # busy的任务由另一个worker持有（skip_locked看不到），failing的汇总更新抛出异常
+    process, apply = training_jobs.process_user_jobs, training_jobs.apply_recorded_sessions
+    def other_worker_holds_busy(user_id):
+        if user_id == busy:
+            db.session.rollback()
+            return 0
+        return process(user_id)
+    def broken_for_failing(user_id, records):
+        if user_id == failing:
+            raise RuntimeError('boom')
+        return apply(user_id, records)
+    monkeypatch.setattr(training_jobs, 'process_user_jobs', other_worker_holds_busy)
+    monkeypatch.setattr(training_jobs, 'apply_recorded_sessions', broken_for_failing)
+
+    assert run_pending_jobs() == 1
+    assert _summary(idle) == (1, 160)
+    assert _summary(busy) is None and _summary(failing) is None
+
+    monkeypatch.undo()
+    # 另一个worker完成后，下一轮轮询处理剩余用户（failing仍在退避期）
+    assert run_pending_jobs() == 1
+    assert _summary(busy) == (1, 160)
+    assert TrainingJob.query.filter_by(user_id=failing).count() == 1
+
+def test_first_processing_claims_jobs_covered_by_rebuild(async_app, client, make_user, record_training):
+    user_id = make_user('rebuild_user')
+    record_training(client, user_id, times=2)
+    # 第二个任务在退避中：首次处理从全部原始记录重建汇总，已包含它的记录
+    job = TrainingJob.query.order_by(TrainingJob.id.desc()).first()
+    job.available_at = datetime.utcnow() + timedelta(hours=1)
+    db.session.commit()
+
+    assert process_user_jobs(user_id) == 2
+    assert TrainingJob.query.count() == 0
+    assert _summary(user_id) == (2, 320)
+
+@pytest.mark.skipif(not os.getenv('PEED_TEST_POSTGRES_URL'), reason='PEED_TEST_POSTGRES_URL not set')
+def test_concurrent_workers_serialize_per_user_on_postgres(async_app, monkeypatch):
+    engine = create_engine(os.environ['PEED_TEST_POSTGRES_URL'])
+    original_engine = db.engines[None]
+    db.engines[None] = engine
+    try:
+        db.drop_all()
+        db.create_all()
+        invalidate_achievement_catalogue()
+        user = User(username='two_workers')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        today = date.today()
+
+        def add_session(session_date, available_at):
+            record = TrainingRecord(user_id=user_id, difficulty='beginner', sets_completed=2, reps_completed=16,
+                                    total_duration=160, contract_time=5, relax_time=5, session_date=session_date)
+            db.session.add(record)
+            db.session.flush()
+            db.session.add(TrainingJob(user_id=user_id, record_ids=json.dumps([record.id]), available_at=available_at))
+            db.session.commit()
+
+        # 已有汇总（前天），之后昨天的任务已到期、今天的任务尚未到期
+        add_session(today - timedelta(days=2), datetime.utcnow())
+        assert process_user_jobs(user_id) == 1
+        add_session(today - timedelta(days=1), datetime.utcnow())
+        add_session(today, datetime.utcnow() + timedelta(hours=1))
+
+        # 第一个worker认领昨天的任务后停在汇总更新中
+        first_inside, release = threading.Event(), threading.Event()
+        apply = training_events.apply_training_records
+        def paused_apply(uid, records):
+            if threading.current_thread().name == 'first':
+                first_inside.set()
+                release.wait(5)
+            return apply(uid, records)
+        monkeypatch.setattr(training_events, 'apply_training_records', paused_apply)
+
+        results = {}
+        def worker():
+            with async_app.app_context():
+                try:
+                    results[threading.current_thread().name] = process_user_jobs(user_id)
+                finally:
+                    db.session.remove()
+
+        first = threading.Thread(target=worker, name='first')
+        first.start()
+        assert first_inside.wait(5)
+        # 今天的任务到期（昨天的任务行被第一个worker锁住，不更新它）
+        TrainingJob.query.filter(TrainingJob.available_at > datetime.utcnow()).update({'available_at': datetime.utcnow()})
+        db.session.commit()
+        # 第二个worker拿不到该用户的锁，不会基于旧汇总处理今天的任务
+        second = threading.Thread(target=worker, name='second')
+        second.start()
+        second.join(10)
+        release.set()
+        first.join(10)
+        assert results == {'first': 1, 'second': 0}
+
+        assert run_pending_jobs() == 1
+        db.session.expire_all()
+        summary = db.session.get(UserTrainingSummary, user_id)
+        assert (summary.total_sessions, summary.current_streak, summary.longest_streak) == (3, 3, 3)
+        active = {row.stat_date: row.active_users for row in GlobalDailyStats.query.all()}
+        assert [active[today - timedelta(days=offset)] for offset in range(3)] == [1, 1, 1]
+        assert db.session.get(GlobalDailyStats, ALL_TIME_START).session_count == 3
+    finally:
+        db.session.remove()
+        db.drop_all()
+        db.engines[None] = original_engine
+        engine.dispose()
+        invalidate_achievement_catalogue()
@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+from sqlalchemy import func
+from src.models.user import TrainingRecord, UserDifficultySummary, UserTrainingSummary, db
+from src.services.streaks import effective_streak
+from src.services.training_summary import rebuild_training_summaries
+
+def _raw_aggregates(user_id):
+    """直接从原始训练记录计算的期望值"""
+    total_sessions, total_duration = db.session.query(
+        func.count(TrainingRecord.id), func.coalesce(func.sum(TrainingRecord.total_duration), 0)
+    ).filter(TrainingRecord.user_id == user_id).one()
+    by_difficulty = dict(db.session.query(TrainingRecord.difficulty, func.count(TrainingRecord.id))
+                         .filter(TrainingRecord.user_id == user_id).group_by(TrainingRecord.difficulty).all())
+    dates = sorted({d for (d,) in db.session.query(TrainingRecord.session_date).filter(TrainingRecord.user_id == user_id)})
+
+    # 逐日扫描：最长连续段，以及截止今天或昨天的当前连续段
+    longest = run = 0
+    previous = None
+    for day in dates:
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    current = run if dates and date.today() - dates[-1] <= timedelta(days=1) else 0
+    return {
+        'total_sessions': total_sessions,
+        'total_duration': total_duration,
+        'by_difficulty': by_difficulty,
+        'current_streak': current,
+        'longest_streak': longest,
+        'last_session_date': dates[-1] if dates else None,
+    }
+
+def _seed(client, make_user, record_batch):
+    today = date.today()
+    plans = {
+        # 今天、昨天、前天连续（当前3天），更早有一段4天
+        'summary_active': [(0, 'beginner'), (0, 'advanced'), (1, 'intermediate'), (2, 'beginner'),
+                           (6, 'beginner'), (7, 'advanced'), (8, 'beginner'), (9, 'beginner')],
+        # 最近一次在3天前：当前连续为0，最长为2
+        'summary_lapsed': [(3, 'intermediate'), (4, 'intermediate'), (4, 'beginner')],
+        'summary_empty': [],
+    }
+    user_ids = {}
+    for username, sessions in plans.items():
+        user_id = make_user(username)
+        user_ids[username] = user_id
+        if sessions:
+            record_batch(client, [
+                {'user_id': user_id, 'difficulty': difficulty,
+                 'total_duration': 100 + offset * 10, 'session_date': (today - timedelta(days=offset)).isoformat()}
+                for offset, difficulty in sessions
+            ])
+    return user_ids
+
+def _assert_endpoints_match_raw(client, user_id):
+    expected = _raw_aggregates(user_id)
+
+    stats = client.get(f'/api/tigang/training/stats/{user_id}').get_json()
+    assert stats['total_sessions'] == expected['total_sessions']
+    assert stats['total_duration_minutes'] == round(expected['total_duration'] / 60, 1)
+    assert stats['streak_days'] == expected['current_streak']
+    assert {row['difficulty']: row['session_count'] for row in stats['difficulty_breakdown']} == expected['by_difficulty']
+
+    user_stats = client.get(f'/api/stats/{user_id}').get_json()
+    assert user_stats['total_exercises'] == expected['total_sessions']
+    assert user_stats['total_time_hours'] == round(expected['total_duration'] / 3600, 1)
+    assert user_stats['current_streak'] == expected['current_streak']
+    assert user_stats['longest_streak'] == expected['longest_streak']
+    assert {name: row['count'] for name, row in user_stats['difficulty_breakdown'].items()} == expected['by_difficulty']
+    last_session = expected['last_session_date']
+    assert user_stats['last_training'] == (last_session.isoformat() if last_session else None)
+
+def test_summary_endpoints_match_raw_records(client, make_user, record_batch):
+    user_ids = _seed(client, make_user, record_batch)
+    for user_id in user_ids.values():
+        _assert_endpoints_match_raw(client, user_id)
+
+    active = _raw_aggregates(user_ids['summary_active'])
+    assert (active['current_streak'], active['longest_streak']) == (3, 4)
+
+def test_rebuild_restores_drifted_summaries(client, make_user, record_batch):
+    user_ids = _seed(client, make_user, record_batch)
+
+    # 汇总表与原始记录不一致（如手工修改或丢失的增量更新）
+    UserTrainingSummary.query.update({'total_sessions': 999, 'total_duration': 1, 'current_streak': 42, 'longest_streak': 42})
+    UserDifficultySummary.query.filter_by(difficulty='beginner').delete()
+    db.session.commit()
+
+    assert rebuild_training_summaries() == 2
+    db.session.expire_all()
+    for user_id in user_ids.values():
+        expected = _raw_aggregates(user_id)
+        summary = db.session.get(UserTrainingSummary, user_id)
+        if expected['total_sessions'] == 0:
+            assert summary is None
+        else:
+            # 存储的当前连续天数在读取时惰性衰减
+            assert (summary.total_sessions, summary.total_duration, effective_streak(summary),
+                    summary.longest_streak, summary.last_session_date) == (
+                expected['total_sessions'], expected['total_duration'], expected['current_streak'],
+                expected['longest_streak'], expected['last_session_date'])
+            rows = UserDifficultySummary.query.filter_by(user_id=user_id).all()
+            assert {row.difficulty: row.session_count for row in rows} == expected['by_difficulty']
+        _assert_endpoints_match_raw(client, user_id)
+
+    # 只重建单个用户
+    db.session.get(UserTrainingSummary, user_ids['summary_lapsed']).total_sessions = 0
+    db.session.commit()
+    assert rebuild_training_summaries(user_ids['summary_lapsed']) == 1
+    _assert_endpoints_match_raw(client, user_ids['summary_lapsed'])
@@ -0,0 +1,16 @@
+"""
+Production WSGI entry point for PEED
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Each worker imports this module and builds its own app and connection
+pool (gunicorn runs with preload_app = False and its master never imports
+the app). Table creation and seeding are NOT run here; gunicorn runs
+`flask --app main init-db` once in a child process before forking workers
+(see gunicorn.conf.py), other servers should run it once per deploy.
+"""
+import os
+
+os.environ.setdefault('PEED_SKIP_STARTUP_INIT', 'true')
+
+from main import app  # noqa: E402